@@ -0,0 +1,87 @@
+# Benchmark for the nightly coverage statistics computation.
+#
+# Generates synthetic patients and completed doses in memory (5M doses by
+# default), runs vaccine.coverage.compute_coverage on them and, for reference,
+# a per-dose Python loop over a sample, extrapolated to the full size.
+#
+#   python benchmarks/bench_coverage_stats.py --doses 5000000 --patients 1500000
+
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vaccineapp.settings')
+
+
+def synthetic_data(n_patients, n_doses, n_vaccines, n_centers, seed):
+    from vaccine.coverage import DoseArrays, PatientArrays
+
+    rng = np.random.default_rng(seed)
+    patients = PatientArrays(
+        ids=rng.permutation(np.arange(1, n_patients + 1, dtype=np.int64)),
+        cohorts=rng.integers(2000, 2026, n_patients, dtype=np.int32),
+        sexes=rng.integers(0, 2, n_patients, dtype=np.int8),
+    )
+    doses = DoseArrays(
+        patient_ids=rng.integers(1, n_patients + 1, n_doses, dtype=np.int64),
+        vaccine_ids=rng.integers(1, n_vaccines + 1, n_doses, dtype=np.int64),
+        center_ids=rng.integers(0, n_centers + 1, n_doses, dtype=np.int64),
+        dates=rng.integers(738000, 740000, n_doses, dtype=np.int32),
+    )
+    return patients, doses
+
+
+def python_loop(patients, doses, sample):
+    # What a per-row implementation does: dict lookups for every dose
+    cohort = dict(zip(patients.ids.tolist(), patients.cohorts.tolist()))
+    home, latest = {}, {}
+    vaccinated = defaultdict(set)
+    for patient, vaccine, center, day in zip(doses.patient_ids[:sample].tolist(), doses.vaccine_ids[:sample].tolist(),
+                                            doses.center_ids[:sample].tolist(), doses.dates[:sample].tolist()):
+        vaccinated[patient].add(vaccine)
+        if center and day >= latest.get(patient, -1):
+            latest[patient], home[patient] = day, center
+    counts = defaultdict(int)
+    for patient, vaccines in vaccinated.items():
+        for vaccine in vaccines:
+            counts[(cohort[patient], vaccine, home.get(patient))] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--doses', type=int, default=5_000_000)
+    parser.add_argument('--patients', type=int, default=1_500_000)
+    parser.add_argument('--vaccines', type=int, default=41)
+    parser.add_argument('--centers', type=int, default=60)
+    parser.add_argument('--sample', type=int, default=500_000, help='Doses used for the Python loop reference')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from vaccine.coverage import compute_coverage
+
+    patients, doses = synthetic_data(args.patients, args.doses, args.vaccines, args.centers, args.seed)
+    print(f"{args.patients} patients, {args.doses} doses, {args.vaccines} vaccines, {args.centers} centers")
+
+    start = time.perf_counter()
+    result = compute_coverage(patients, doses)
+    elapsed = time.perf_counter() - start
+    print(f"numpy compute_coverage: {elapsed:.2f}s -> matrix {result.vaccinated.shape} "
+          f"(cohort x sex x vaccine x center), {int(result.vaccinated.sum())} patient-vaccine pairs")
+
+    sample = min(args.sample, args.doses)
+    start = time.perf_counter()
+    python_loop(patients, doses, sample)
+    loop = (time.perf_counter() - start) * args.doses / sample
+    print(f"python loop (extrapolated from {sample} doses): {loop:.2f}s | x{loop / elapsed:.1f}")
+
+
+if __name__ == '__main__':
+    main()
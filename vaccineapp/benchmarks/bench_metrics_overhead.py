@@ -0,0 +1,63 @@
+# Overhead of vaccine.metrics.MetricsMiddleware.
+#
+# Measures the fixed cost the middleware adds to a request (wrapping every
+# connection, timing, recording into the registry) and the cost its
+# execute_wrapper adds to each SQL statement, then expresses both as a share
+# of a request with the given latency and query count.
+#
+#   python benchmarks/bench_metrics_overhead.py --latency-ms 20 --queries 10
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vaccineapp.settings')
+
+
+def per_call(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=50000)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Typical request wall time')
+    parser.add_argument('--queries', type=int, default=10, help='Typical SQL statements per request')
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from vaccine.metrics import MetricsMiddleware, QueryTimer, registry
+
+    response = HttpResponse(b'x' * 2000)
+    request = RequestFactory().get('/vaccines/')
+    bare = per_call(lambda: response, args.n)
+    middleware = MetricsMiddleware(lambda r: response)
+    wrapped = per_call(lambda: middleware(request), args.n)
+    registry.clear()
+
+    def execute(sql, params, many, context):
+        return None
+
+    timer = QueryTimer()
+    direct = per_call(lambda: execute('SELECT 1', (), False, None), args.n)
+    timed = per_call(lambda: timer(execute, 'SELECT 1', (), False, None), args.n)
+
+    request_cost = wrapped - bare
+    query_cost = timed - direct
+    total = request_cost + args.queries * query_cost
+    print(f"fixed overhead per request: {request_cost * 1e6:.1f} us")
+    print(f"overhead per SQL statement: {query_cost * 1e6:.2f} us")
+    print(f"request of {args.latency_ms:g} ms with {args.queries} queries: "
+          f"+{total * 1e6:.1f} us = {total / (args.latency_ms / 1000) * 100:.3f}%")
+
+
+if __name__ == '__main__':
+    main()
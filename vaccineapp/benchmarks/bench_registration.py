@@ -0,0 +1,94 @@
+# Throughput benchmark for password hashing during registration bursts.
+#
+# In-process mode hashes N passwords for each configured hasher, first one
+# after another on the request thread (what the sync views do), then through
+# the bounded hashing pool with CONCURRENCY callers (the async register/ view),
+# and reports registrations/sec. Hashers whose library is missing are skipped.
+#
+#   python benchmarks/bench_registration.py -n 200 -c 32
+#
+# With --url it instead POSTs N registrations to a running server, e.g.
+#   python benchmarks/bench_registration.py --url http://127.0.0.1:8000/register/ -n 200 -c 32
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vaccineapp.settings')
+
+
+def bench_hashers(n, concurrency, workers):
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.contrib.auth.hashers import make_password
+    from django.utils.module_loading import import_string
+    from vaccine import passwords
+
+    settings.PASSWORD_HASHING_WORKERS = workers
+    print(f'{n} registrations, {concurrency} concurrent callers, {workers} hashing workers')
+    for hasher in settings.PASSWORD_HASHERS:
+        algorithm = import_string(hasher).algorithm
+        try:
+            make_password('probe', hasher=algorithm)
+        except ValueError as e:
+            print(f'{algorithm:>14}: skipped ({e})')
+            continue
+
+        start = time.perf_counter()
+        for i in range(n):
+            make_password(f'password-{i}', hasher=algorithm)
+        serial = n / (time.perf_counter() - start)
+
+        passwords._executor = None
+        with ThreadPoolExecutor(max_workers=concurrency) as callers:
+            start = time.perf_counter()
+            list(callers.map(lambda i: passwords.get_executor().submit(
+                make_password, f'password-{i}', None, algorithm).result(), range(n)))
+            pooled = n / (time.perf_counter() - start)
+        print(f'{algorithm:>14}: serial {serial:8.1f}/s | pooled {pooled:8.1f}/s')
+
+
+def bench_server(url, n, concurrency):
+    import requests
+
+    def register(i):
+        name = f'bench-{uuid.uuid4().hex[:12]}'
+        start = time.perf_counter()
+        response = requests.post(url, json={
+            'username': name, 'email': f'{name}@example.com', 'password': f'password-{i}',
+            'first_name': 'Bench', 'last_name': str(i),
+        }, timeout=60)
+        return response.status_code, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(register, range(n)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    ok = sum(1 for code, _ in results if code == 201)
+    print(f'{ok}/{n} registered in {elapsed:.2f}s -> {n / elapsed:.1f}/s, '
+          f'p50 {statistics.median(latencies) * 1e3:.0f}ms, p95 {latencies[int(len(latencies) * 0.95) - 1] * 1e3:.0f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=100)
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--url')
+    args = parser.parse_args()
+    if args.url:
+        bench_server(args.url, args.n, args.concurrency)
+    else:
+        bench_hashers(args.n, args.concurrency, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Requests/sec of one API endpoint with and without database connection reuse.
+#
+# Each configuration starts its own server process (single-threaded WSGI, so
+# a persistent connection really is reused by the next request) with the DB_*
+# variables of vaccineapp/env.py overridden, then sends --requests sequential
+# requests over one keep-alive session:
+#
+#   python benchmarks/conn_reuse.py --token <access token> --path vaccine-types/
+#   python benchmarks/conn_reuse.py --pool          # also DB_POOL=1 (MySQL only)
+#
+# Without --token the first patient token from benchmarks/bench_tokens.json
+# (generate_synthetic_data --tokens-out) is used. The database is whatever the
+# DB_* environment points at; the difference is largest on a MySQL server
+# over the network, where each new connection costs a TCP + auth round trip.
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+
+CONFIGS = [
+    ('no reuse', {'DB_CONN_MAX_AGE': '0', 'DB_CONN_HEALTH_CHECKS': '0'}),
+    ('persistent', {'DB_CONN_MAX_AGE': '600', 'DB_CONN_HEALTH_CHECKS': '0'}),
+    ('persistent + health checks', {'DB_CONN_MAX_AGE': '600', 'DB_CONN_HEALTH_CHECKS': '1'}),
+]
+POOL_CONFIG = ('pool', {'DB_POOL': '1'})
+
+
+def serve(port):
+    # Child process: plain single-threaded WSGI server around the project
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vaccineapp.settings')
+    from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    make_server('127.0.0.1', port, get_wsgi_application(), handler_class=QuietHandler).serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('server exited during startup')
+        try:
+            requests.get(base_url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def run(name, overrides, args):
+    port = free_port()
+    env = {**os.environ, **overrides}
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)], env=env)
+    base_url = f'http://127.0.0.1:{port}/'
+    try:
+        wait_ready(base_url, process)
+        session = requests.Session()
+        headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+        url = base_url + args.path.lstrip('/')
+        for _ in range(args.warmup):
+            session.get(url, headers=headers, timeout=30)
+
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            t = time.perf_counter()
+            status = session.get(url, headers=headers, timeout=30).status_code
+            latencies.append(time.perf_counter() - t)
+            errors += status >= 400
+        elapsed = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+
+    latencies.sort()
+    return {
+        'config': name,
+        'env': overrides,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def default_token():
+    path = os.path.join(BENCH_DIR, 'bench_tokens.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        patients = json.load(f)['tokens']['patient']
+    return patients[0]['token'] if patients else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--path', default='vaccine-types/')
+    parser.add_argument('--token')
+    parser.add_argument('-n', '--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--pool', action='store_true', help='Also run with DB_POOL=1')
+    parser.add_argument('--out', help='Write the results as JSON')
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    args.token = args.token or default_token()
+    results = []
+    for name, overrides in CONFIGS + ([POOL_CONFIG] if args.pool else []):
+        print(f"running {name}...", flush=True)
+        results.append(run(name, overrides, args))
+
+    baseline = results[0]['throughput']
+    print(f"{'config':<28}{'req/s':>9}{'p50':>10}{'p95':>10}{'errors':>8}{'vs no reuse':>13}")
+    for r in results:
+        print(f"{r['config']:<28}{r['throughput']:>9.1f}{r['p50_ms']:>8.2f}ms{r['p95_ms']:>8.2f}ms"
+              f"{r['errors']:>8}{(r['throughput'] / baseline - 1) * 100:>+12.0f}%")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'path': args.path, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+# Load test for the core API flows against a running server.
+#
+# 1. Seed the database and write the bench users' access tokens:
+#      python manage.py generate_synthetic_data --users 2000 --tokens-out benchmarks/bench_tokens.json
+# 2. Start the server (runserver, gunicorn, ...) and run:
+#      python benchmarks/loadtest.py --base-url http://127.0.0.1:8000/ -c 16 -d 30
+# 3. Compare two runs (e.g. before/after a commit):
+#      python benchmarks/loadtest.py --compare benchmarks/results/A.json benchmarks/results/B.json
+#
+# Each scenario runs for --duration seconds with --concurrency workers and
+# reports throughput and p50/p95/p99 latency. Results are written as JSON to
+# benchmarks/results/<timestamp>-<commit>.json.
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SEARCH_TERMS = ['hexa', 'rota', 'cúm', 'viêm gan', 'sởi', 'phế cầu', 'bcg', 'thủy đậu', 'dại', 'HPV']
+
+
+class Worker:
+    # One HTTP session per worker thread, authenticated as a random bench user
+    def __init__(self, base_url, data, rng):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.data = data
+        self.rng = rng
+        self.session = requests.Session()
+        self.patient = rng.choice(data['tokens']['patient'])
+        self.staff = rng.choice(data['tokens']['staff']) if data['tokens']['staff'] else None
+        self.admin_logged_in = False
+
+    def get(self, path, token=None, **kwargs):
+        return self.session.get(self.base_url + path, headers=self.auth(token), timeout=30, **kwargs)
+
+    def post(self, path, payload, token=None):
+        return self.session.post(self.base_url + path, json=payload, headers=self.auth(token), timeout=30)
+
+    def auth(self, token):
+        return {'Authorization': f'Bearer {token}'} if token else {}
+
+    def login_admin(self):
+        # Session login through the admin form, done once per worker
+        login_url = self.base_url + 'admin/login/'
+        page = self.session.get(login_url, timeout=30)
+        csrf = self.session.cookies.get('csrftoken') or re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page.text).group(1)
+        self.session.post(login_url, data={
+            'username': self.staff['username'], 'password': self.data['password'],
+            'csrfmiddlewaretoken': csrf, 'next': '/admin/',
+        }, headers={'Referer': login_url}, timeout=30)
+        self.admin_logged_in = True
+
+
+def scenario_vaccine_search(worker):
+    return worker.get('vaccines/', worker.patient['token'], params={'q': worker.rng.choice(SEARCH_TERMS)})
+
+
+def scenario_appointment_list(worker):
+    return worker.get('appointments/all/', worker.patient['token'])
+
+
+def scenario_booking(worker):
+    patient = worker.patient
+    if not patient['informations']:
+        return worker.get('appointments/', patient['token'])
+    return worker.post('appointments/', {
+        'date': (date.today() + timedelta(days=worker.rng.randrange(1, 60))).isoformat(),
+        'information': worker.rng.choice(patient['informations']),
+        'health_centre': worker.rng.choice(worker.data['centers']),
+        'time': worker.rng.choice(worker.data['times']),
+        'appointment_details': [{'vaccine': v} for v in worker.rng.sample(worker.data['vaccines'], 2)],
+    }, patient['token'])
+
+
+def scenario_campaign_burst(worker):
+    # Many patients registering for the same few campaigns at once
+    patient = worker.rng.choice(worker.data['tokens']['patient'])
+    return worker.post('attendant-communications/register/', {
+        'communication': worker.rng.choice(worker.data['campaigns'][:3]),
+        'quantity': 1,
+        'registration_type': 'patient',
+    }, patient['token'])
+
+
+def scenario_statistics(worker):
+    path = worker.rng.choice(['total-vaccinated', 'completion-rate', 'popular-vaccines'])
+    return worker.get(f'statistics/{path}/', worker.patient['token'], params={'year': date.today().year})
+
+
+def scenario_admin_stats(worker):
+    if not worker.admin_logged_in:
+        worker.login_admin()
+    return worker.get('admin/cate-stats/', params={'time_filter': worker.rng.choice(['month', 'quarter', 'year']),
+                                                   'year': date.today().year})
+
+
+SCENARIOS = {
+    'vaccine_search': scenario_vaccine_search,
+    'appointment_list': scenario_appointment_list,
+    'booking': scenario_booking,
+    'campaign_burst': scenario_campaign_burst,
+    'statistics': scenario_statistics,
+    'admin_stats': scenario_admin_stats,
+}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(name, base_url, data, concurrency, duration, seed):
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def loop(worker_id):
+        worker = Worker(base_url, data, random.Random(f'{seed}-{name}-{worker_id}'))
+        local_latencies, local_statuses = [], Counter()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = SCENARIOS[name](worker).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[status] += 1
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(loop, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ok = sum(n for status, n in statuses.items() if isinstance(status, int) and status < 400)
+    return {
+        'requests': len(latencies),
+        'ok': ok,
+        'errors': len(latencies) - ok,
+        'statuses': {str(status): n for status, n in statuses.items()},
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_table(results):
+    print(f"{'scenario':<18}{'req':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['requests']:>8}{r['errors']:>6}{r['throughput']:>9.1f}"
+              f"{r['p50_ms']:>8.1f}ms{r['p95_ms']:>7.1f}ms{r['p99_ms']:>7.1f}ms")
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"{old['commit']} -> {new['commit']}")
+    print(f"{'scenario':<18}{'req/s':>18}{'p95':>22}{'p99':>22}")
+    for name in new['scenarios']:
+        if name not in old['scenarios']:
+            continue
+        a, b = old['scenarios'][name], new['scenarios'][name]
+        cells = []
+        for key, fmt in (('throughput', '{:.1f}'), ('p95_ms', '{:.1f}'), ('p99_ms', '{:.1f}')):
+            change = (b[key] - a[key]) / a[key] * 100 if a[key] else 0.0
+            cells.append(f"{fmt.format(a[key])}->{fmt.format(b[key])} ({change:+.0f}%)")
+        print(f"{name:<18}{cells[0]:>18}{cells[1]:>22}{cells[2]:>22}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000/')
+    parser.add_argument('--tokens', default=os.path.join(BENCH_DIR, 'bench_tokens.json'))
+    parser.add_argument('-s', '--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run (repeatable); all by default')
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('-d', '--duration', type=float, default=20.0, help='Seconds per scenario')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='Result file (default benchmarks/results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    with open(args.tokens, encoding='utf-8') as f:
+        data = json.load(f)
+    results = {}
+    for name in args.scenario or list(SCENARIOS):
+        print(f"running {name} ({args.concurrency} workers, {args.duration:g}s)...", flush=True)
+        results[name] = run_scenario(name, args.base_url, data, args.concurrency, args.duration, args.seed)
+    print_table(results)
+
+    commit = git_commit()
+    out = args.out or os.path.join(BENCH_DIR, 'results', f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'base_url': args.base_url,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'seed': args.seed,
+            'scenarios': results,
+        }, f, indent=2)
+    print(f"results written to {out}")
+
+
+if __name__ == '__main__':
+    main()
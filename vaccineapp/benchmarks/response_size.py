@@ -0,0 +1,116 @@
+# Render time and bytes on the wire of the largest API payloads.
+#
+# Serializes vaccines (long descriptions) and appointments (nested
+# AppointmentReadSerializer) from the configured database, then compares:
+#   - render time of DRF's JSONRenderer and vaccine.renderers.ORJSONRenderer
+#   - body size plain, gzip (COMPRESSION_GZIP_LEVEL) and brotli (if installed)
+#   - the same with a ?fields= sparse fieldset, as a mobile list would ask
+#
+#   python benchmarks/response_size.py --limit 500 --repeat 50
+#
+# Fill the database first (manage.py generate_synthetic_data) for sizes close
+# to production.
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vaccineapp.settings')
+
+SPARSE_FIELDS = {
+    'vaccines': 'id,name,price,imgUrl',
+    'appointments': 'id,date,status,health_centre,time',
+}
+
+
+def datasets(limit):
+    from vaccine.models import Appointment, Vaccine
+    from vaccine.serializers import AppointmentReadSerializer, VaccineSerializer
+
+    vaccines = Vaccine.objects.filter(active=True).select_related('vaccine_type', 'country_produce')[:limit]
+    appointments = (Appointment.objects.select_related('information', 'health_centre', 'time')
+                    .prefetch_related('appointment_details__vaccine__vaccine_type',
+                                      'appointment_details__vaccine__country_produce')
+                    .order_by('-pk')[:limit])
+    return [('vaccines', VaccineSerializer, list(vaccines)), ('appointments', AppointmentReadSerializer, list(appointments))]
+
+
+def serialize(serializer_class, objects, fields=None):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    request = Request(APIRequestFactory().get('/', {'fields': fields} if fields else {}))
+    return serializer_class(objects, many=True, context={'request': request}).data
+
+
+def render_ms(renderer, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        renderer.render(data)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def sizes(body):
+    from django.conf import settings
+
+    from vaccine.compression import brotli
+
+    result = {
+        'plain': len(body),
+        'gzip': len(gzip.compress(body, compresslevel=getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6), mtime=0)),
+    }
+    if brotli is not None:
+        result['br'] = len(brotli.compress(body, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--limit', type=int, default=500, help='Objects per list')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--out', help='Write the results as JSON')
+    args = parser.parse_args()
+
+    import django
+    django.setup()
+    from rest_framework.renderers import JSONRenderer
+
+    from vaccine.renderers import ORJSONRenderer
+
+    results = []
+    for name, serializer_class, objects in datasets(args.limit):
+        data = serialize(serializer_class, objects)
+        sparse = serialize(serializer_class, objects, SPARSE_FIELDS[name])
+        body = ORJSONRenderer().render(data)
+        assert body == JSONRenderer().render(data), 'renderers disagree'
+        results.append({
+            'dataset': name,
+            'objects': len(objects),
+            'json_ms': render_ms(JSONRenderer(), data, args.repeat),
+            'orjson_ms': render_ms(ORJSONRenderer(), data, args.repeat),
+            'full': sizes(body),
+            'sparse_fields': SPARSE_FIELDS[name],
+            'sparse': sizes(ORJSONRenderer().render(sparse)),
+        })
+
+    print(f"{'dataset':<14}{'objects':>8}{'json':>10}{'orjson':>10}{'speedup':>9}"
+          f"{'plain':>10}{'gzip':>9}{'br':>9}{'sparse':>10}{'+gzip':>9}")
+    for r in results:
+        full, sparse = r['full'], r['sparse']
+        print(f"{r['dataset']:<14}{r['objects']:>8}{r['json_ms']:>8.2f}ms{r['orjson_ms']:>8.2f}ms"
+              f"{r['json_ms'] / r['orjson_ms']:>8.1f}x{full['plain']:>10}{full['gzip']:>9}{full.get('br', '-'):>9}"
+              f"{sparse['plain']:>10}{sparse['gzip']:>9}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'limit': args.limit, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,39 +1,50 @@
-import csv
-import json
-import os
 import re
 import logging
 import requests
-from typing import Any, Text, Dict, List, Optional
+from typing import Any, Text, Dict, List, Optional, Tuple
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet, UserUtteranceReverted, AllSlotsReset
 from rasa_sdk.forms import FormValidationAction
+from collections import namedtuple
 from functools import lru_cache
+from types import MappingProxyType
 from fuzzywuzzy import process
 from pyvi import ViTokenizer
+from .knowledge import KnowledgeFile, LookupTable
+from .query_log import OutOfScopeQueryLog
+from .relevance import RELATED_INTENTS, RelevanceClassifier
+from .symptoms import SymptomIndex, normalize_term
 
 logger = logging.getLogger(__name__)
 
 DJANGO_API_BASE_URL = "http://192.168.1.12:8000/"
-
-# Load vaccine_data.json for side effects and age ranges
-def load_vaccine_data(file_path: str = "vaccine_data.json") -> Dict:
-    try:
-        file_path = os.path.join(os.path.dirname(__file__), file_path)
-        logger.debug(f"Loading vaccine_data.json from: {file_path}")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        for vaccine in data:
-            if isinstance(data[vaccine]["side_effects"], str):
-                data[vaccine]["side_effects"] = [
-                    effect.strip() for effect in data[vaccine]["side_effects"].split(",")
-                ]
-        logger.debug(f"Loaded vaccines: {list(data.keys())}")
-        return data
-    except Exception as e:
-        logger.error(f"Error loading vaccine_data.json: {str(e)}")
-        return {}
+NEAREST_CENTER_RADIUS_KM = 20
+
+OUT_OF_SCOPE_QUERY_LOG = OutOfScopeQueryLog()
+
+# Side effects and age ranges from vaccine_data.json, pre-split into an
+# immutable snapshot that is swapped in whenever the file changes on disk
+VaccineFacts = namedtuple("VaccineFacts", ["age_range", "side_effects"])
+VaccineKnowledge = namedtuple("VaccineKnowledge", ["vaccines", "default", "symptoms"])
+
+def parse_vaccine_facts(entry: Dict[Text, Any]) -> VaccineFacts:
+    side_effects = entry.get("side_effects", [])
+    if isinstance(side_effects, str):
+        side_effects = side_effects.split(",")
+    return VaccineFacts(
+        age_range=entry.get("age_range", "Không rõ"),
+        side_effects=tuple(effect.strip() for effect in side_effects if effect.strip())
+    )
+
+def build_vaccine_knowledge(data: Dict[Text, Any]) -> VaccineKnowledge:
+    vaccines = {name: parse_vaccine_facts(entry) for name, entry in data.items() if name != "default"}
+    logger.debug(f"Loaded vaccines: {list(vaccines.keys())}")
+    return VaccineKnowledge(
+        vaccines=MappingProxyType(vaccines),
+        default=parse_vaccine_facts(data.get("default", {})),
+        symptoms=SymptomIndex({name: facts.side_effects for name, facts in vaccines.items()}, SYMPTOM_TO_VACCINE)
+    )
 
 # Static data for fallback and non-API fields
 VACCINE_STATIC_DATA = {
@@ -81,15 +92,6 @@ VACCINE_STATIC_DATA = {
     "Avaxim": {"description": "Phòng viêm gan A.", "origin": "Pháp", "price": 450000}
 }
 
-# Load vaccine_data.json and merge with VACCINE_STATIC_DATA
-VACCINE_JSON_DATA = load_vaccine_data()
-for vaccine in VACCINE_JSON_DATA:
-    if vaccine != "default" and vaccine in VACCINE_STATIC_DATA:
-        VACCINE_STATIC_DATA[vaccine].update({
-            "age_range": VACCINE_JSON_DATA[vaccine]["age_range"],
-            "side_effects": VACCINE_JSON_DATA[vaccine]["side_effects"]
-        })
-
 # Synonyms for vaccine names
 SYNONYMS = {
     "6 trong 1": ["Infanrix Hexa", "Hexaxim"],
@@ -105,6 +107,11 @@ SYNONYMS = {
     "phế cầu người lớn": ["Pneumovax 23"]
 }
 
+# Domain keywords plus every vaccine name and synonym, compiled once
+RELEVANCE_CLASSIFIER = RelevanceClassifier(
+    list(VACCINE_STATIC_DATA) + list(SYNONYMS) + [name for names in SYNONYMS.values() for name in names]
+)
+
 # Vaccination schedule by age
 VACCINATION_SCHEDULE = {
     "trẻ sơ sinh": ["BCG", "Gene Hbvax A"],
@@ -128,6 +135,9 @@ SYMPTOM_TO_VACCINE = {
     "nổi hạch": ["BCG"]
 }
 
+VACCINE_KNOWLEDGE = KnowledgeFile("vaccine_data.json", build_vaccine_knowledge)
+VACCINE_KNOWLEDGE.get()
+
 AGE_SYNONYMS = {
     "trẻ sơ_sinh": "trẻ sơ sinh",
     "tre so sinh": "trẻ sơ sinh",
@@ -172,6 +182,19 @@ def normalize_input(value: Text) -> Text:
     # Apply synonym mapping again after tokenization
     return AGE_SYNONYMS.get(value, value)
 
+# Disease and condition answers, normalized once per version of the file
+DiseaseKnowledge = namedtuple("DiseaseKnowledge", ["version", "diseases", "conditions"])
+
+def build_disease_knowledge(data: Dict[Text, Any]) -> DiseaseKnowledge:
+    return DiseaseKnowledge(
+        version=data.get("version", 0),
+        diseases=LookupTable(data.get("diseases", {}), normalize_input),
+        conditions=LookupTable(data.get("conditions", {}), normalize_input)
+    )
+
+DISEASE_KNOWLEDGE = KnowledgeFile("disease_condition_data.json", build_disease_knowledge)
+DISEASE_KNOWLEDGE.get()
+
 def resolve_synonym(vaccine_name: Text) -> Text:
     if not vaccine_name:
         return ""
@@ -353,9 +376,11 @@ class ActionGetVaccinationAge(Action):
             return []
 
         vaccine_name = resolve_synonym(vaccine_name)
-        age_range = VACCINE_STATIC_DATA.get(vaccine_name, {}).get("age_range", "Không rõ")
+        knowledge = VACCINE_KNOWLEDGE.get()
+        facts = knowledge.vaccines.get(vaccine_name)
+        age_range = facts.age_range if facts else "Không rõ"
         if age_range == "Không rõ":
-            age_range = VACCINE_JSON_DATA.get("default", {}).get("age_range", "Không rõ")
+            age_range = knowledge.default.age_range
 
         if age_range != "Không rõ":
             msg = (
@@ -393,7 +418,8 @@ class ActionGetSideEffects(Action):
             return []
 
         vaccine_name = resolve_synonym(vaccine_name)
-        side_effects = VACCINE_STATIC_DATA.get(vaccine_name, {}).get("side_effects", ["Không rõ"])
+        facts = VACCINE_KNOWLEDGE.get().vaccines.get(vaccine_name)
+        side_effects = list(facts.side_effects) if facts and facts.side_effects else ["Không rõ"]
 
         if side_effects != ["Không rõ"]:
             msg = (
@@ -424,13 +450,28 @@ class ActionGetSideEffectsBySymptom(Action):
 
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         symptom = tracker.get_slot("symptom")
-        if not symptom or symptom.lower() == "bỏ qua":
+        entity_symptoms = [
+            entity.get("value") for entity in tracker.latest_message.get("entities", [])
+            if entity.get("entity") == "symptom" and entity.get("value")
+        ]
+        if symptom and symptom.lower() == "bỏ qua":
+            symptom = None
+        if not symptom and not entity_symptoms:
             dispatcher.utter_message(response="utter_request_symptom")
             return []
 
-        symptom = normalize_input(symptom)
-        vaccines = SYMPTOM_TO_VACCINE.get(symptom, [])
-        if vaccines:
+        # Every symptom mentioned in the message counts, not only the slot value
+        index = VACCINE_KNOWLEDGE.get().symptoms
+        symptoms = index.extract([symptom, *entity_symptoms, tracker.latest_message.get("text", "")])
+        if not symptoms:
+            symptoms = [normalize_term(symptom or entity_symptoms[0])]
+        ranked = index.rank(symptoms)
+        symptom = ", ".join(symptoms)
+        if ranked:
+            if len(symptoms) > 1:
+                vaccines = [f"{vaccine} ({len(matched)}/{len(symptoms)})" for vaccine, matched in ranked[:10]]
+            else:
+                vaccines = [vaccine for vaccine, _ in ranked[:10]]
             msg = (
                 f"🚨 **Triệu chứng '{symptom}'** có thể liên quan đến: {', '.join(vaccines)}.\n"
                 f"- **Hướng dẫn**: Theo dõi 24-48 giờ, liên hệ bác sĩ nếu nghiêm trọng.\n"
@@ -527,13 +568,26 @@ class ActionGetVaccinationLocation(Action):
 
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         vaccine_name = tracker.get_slot("vaccine_name")
+        coordinates = self._get_coordinates(tracker)
         try:
-            response = requests.get(f"{DJANGO_API_BASE_URL}health-centers/", timeout=5)
+            if coordinates:
+                lat, lon = coordinates
+                response = requests.get(
+                    f"{DJANGO_API_BASE_URL}health-centers/nearest/",
+                    params={"lat": lat, "lon": lon, "radius": NEAREST_CENTER_RADIUS_KM, "limit": 5},
+                    timeout=5,
+                )
+            else:
+                response = requests.get(f"{DJANGO_API_BASE_URL}health-centers/", timeout=5)
             response.raise_for_status()
             locations = response.json().get("results", [])
             if locations:
-                message = self._format_multiple_locations(locations, vaccine_name)
+                message = self._format_multiple_locations(locations, vaccine_name, nearby=bool(coordinates))
                 dispatcher.utter_message(text=message)
+            elif coordinates:
+                dispatcher.utter_message(
+                    text=f"⚠️ Không tìm thấy địa điểm tiêm nào trong bán kính {NEAREST_CENTER_RADIUS_KM} km quanh bạn."
+                )
             else:
                 dispatcher.utter_message(text="⚠️ Hiện tại không có địa điểm tiêm nào trong hệ thống.")
         except requests.exceptions.RequestException as e:
@@ -543,12 +597,30 @@ class ActionGetVaccinationLocation(Action):
             )
         return []
 
-    def _format_multiple_locations(self, locations: List[Dict], vaccine_name: Optional[Text] = None) -> Text:
+    def _get_coordinates(self, tracker: Tracker) -> Optional[Tuple[float, float]]:
+        # Clients may send the user's position as message metadata, either flat
+        # ({"lat", "lon"}) or nested under "location"
+        metadata = tracker.latest_message.get("metadata") or {}
+        location = metadata.get("location") or metadata
+        try:
+            lat = float(location.get("lat", location.get("latitude")))
+            lon = float(location.get("lon", location.get("longitude")))
+        except (AttributeError, TypeError, ValueError):
+            return None
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lat, lon
+        return None
+
+    def _format_multiple_locations(self, locations: List[Dict], vaccine_name: Optional[Text] = None, nearby: bool = False) -> Text:
         vaccine_info = f" {vaccine_name}" if vaccine_name else ""
-        message = f"📍 Dưới đây là các địa điểm tiêm{vaccine_info} bạn có thể tham khảo:\n\n"
+        if nearby:
+            message = f"📍 Các địa điểm tiêm{vaccine_info} gần bạn nhất:\n\n"
+        else:
+            message = f"📍 Dưới đây là các địa điểm tiêm{vaccine_info} bạn có thể tham khảo:\n\n"
         for i, loc in enumerate(locations[:5], 1):
+            distance = f" ({loc['distance_km']} km)" if loc.get("distance_km") is not None else ""
             message += (
-                f"{i}. **{loc['name']}**\n"
+                f"{i}. **{loc['name']}**{distance}\n"
                 f"   - Địa chỉ: {loc['address']}\n\n"
             )
         message += "📞 Vui lòng liên hệ trực tiếp các trung tâm để biết tình trạng vaccine hiện tại."
@@ -601,49 +673,17 @@ class ActionOutOfScope(Action):
         entities = tracker.latest_message.get("entities", [])
         timestamp = tracker.latest_message.get("timestamp", "")
 
-        file_path = os.path.join(os.path.dirname(__file__), "out_of_scope_queries.csv")
-        file_exists = os.path.isfile(file_path)
-
-        related_intents = ["ask_vaccine_for_new_disease", "ask_vaccine_for_special_condition"]
-        related_keywords = [
-            r"vaccine", r"vắc[-\s]?xin", r"tiêm", r"bệnh", r"phòng", r"viêm", r"virus",
-            r"cúm", r"sởi", r"uốn ván", r"bạch hầu", r"phế cầu", r"hpv", r"thủy đậu"
-        ]
-        is_related = (
-                intent in related_intents or
-                any(re.search(keyword, user_input.lower(), re.IGNORECASE) for keyword in related_keywords)
-        )
+        is_related = RELEVANCE_CLASSIFIER.is_related(user_input, intent)
 
         if not is_related:
             logger.info(f"Skipping unrelated out-of-scope query: {user_input}")
             dispatcher.utter_message(response="utter_out_of_scope")
             return [UserUtteranceReverted()]
 
-        is_duplicate = False
-        if file_exists:
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    reader = csv.reader(f)
-                    next(reader, None)
-                    for row in reader:
-                        if row and row[0] == user_input:
-                            is_duplicate = True
-                            break
-                if is_duplicate:
-                    logger.info(f"Duplicate out-of-scope query found, not saving: {user_input}")
-            except Exception as e:
-                logger.error(f"Error reading CSV file {file_path} for duplicate check: {str(e)}")
-
-        if not is_duplicate:
-            try:
-                with open(file_path, "a", newline="", encoding="utf-8") as f:
-                    writer = csv.writer(f)
-                    if not file_exists:
-                        writer.writerow(["user_input", "intent", "entities", "timestamp"])
-                    writer.writerow([user_input, intent, str(entities), timestamp])
-                logger.info(f"Saved out-of-scope query to CSV: {user_input}")
-            except Exception as e:
-                logger.error(f"Error writing to CSV file {file_path}: {str(e)}")
+        if OUT_OF_SCOPE_QUERY_LOG.record(user_input, intent, entities, timestamp):
+            logger.info(f"Queued out-of-scope query for CSV: {user_input}")
+        else:
+            logger.info(f"Duplicate out-of-scope query found, not saving: {user_input}")
 
         dispatcher.utter_message(response="utter_out_of_scope")
         return [UserUtteranceReverted()]
@@ -661,24 +701,9 @@ class ActionGetVaccineForDisease(Action):
             return []
 
         disease = normalize_input(disease)
-        disease_vaccine_info = {
-            "viêm gan c": "Hiện tại, chưa có vaccine phòng viêm gan C. Bạn nên tham khảo bác sĩ về các biện pháp phòng ngừa như tránh tiếp xúc với máu nhiễm bệnh hoặc sử dụng bao cao su khi quan hệ tình dục.",
-            "zika": "Hiện không có vaccine phòng Zika được phê duyệt rộng rãi. WHO khuyến nghị tránh muỗi đốt và tham khảo ý kiến bác sĩ nếu bạn ở khu vực có nguy cơ cao.",
-            "dengue": "Vaccine phòng sốt xuất huyết (Dengvaxia) có sẵn ở một số quốc gia, nhưng chỉ khuyến nghị cho những người đã từng nhiễm dengue trước đó. Vui lòng tham khảo bác sĩ để đánh giá phù hợp.",
-            "omicron": "Không có vaccine riêng cho biến thể Omicron, nhưng các vaccine COVID-19 hiện tại (như Pfizer, Moderna) cung cấp bảo vệ một phần. Bạn nên tiêm nhắc lại theo khuyến cáo của Bộ Y tế.",
-            "hiv": "Hiện chưa có vaccine phòng HIV. Các biện pháp phòng ngừa bao gồm sử dụng bao cao su và kiểm tra sức khỏe định kỳ.",
-            "sốt xuất huyết": "Vaccine phòng sốt xuất huyết (Dengvaxia) có sẵn ở một số quốc gia, nhưng chỉ khuyến nghị cho những người đã từng nhiễm dengue trước đó. Vui lòng tham khảo bác sĩ để đánh giá phù hợp.",
-            "ebola": "Vaccine phòng Ebola (rVSV-ZEBOV) được sử dụng trong các đợt bùng phát, nhưng không phổ biến tại Việt Nam. Liên hệ cơ quan y tế để biết thêm chi tiết.",
-            "viêm phổi do virus": "Không có vaccine cụ thể cho viêm phổi do virus nói chung, nhưng vaccine cúm (Vaxigrip Tetra) và phế cầu (Prevenar 13) có thể phòng một số nguyên nhân gây viêm phổi.",
-            "sars-cov-2": "Các vaccine COVID-19 (như Pfizer, Moderna, AstraZeneca) được sử dụng rộng rãi. Bạn nên tiêm nhắc lại theo khuyến cáo của Bộ Y tế.",
-            "lyme": "Hiện không có vaccine phòng bệnh Lyme cho con người. Biện pháp phòng ngừa bao gồm tránh bị bọ chét cắn khi ở khu vực có nguy cơ.",
-            "sốt rét": "Hiện chưa có vaccine phòng sốt rét được sử dụng rộng rãi tại Việt Nam. Vaccine RTS,S/AS01 được thử nghiệm ở một số khu vực, nhưng cần tham khảo bác sĩ.",
-            "lao": "Vaccine BCG được sử dụng để phòng lao, đặc biệt cho trẻ sơ sinh. Tuy nhiên, hiệu quả bảo vệ ở người lớn có thể hạn chế.",
-            "viêm màng não": "Vaccine phòng viêm màng não (như Menactra, Menveo) có sẵn cho một số chủng vi khuẩn. Tham khảo bác sĩ để chọn loại phù hợp."
-        }
-
-        response = disease_vaccine_info.get(disease,
-                                            f"Không có thông tin về vaccine cho {disease}. Bạn có thể hỏi về các bệnh khác hoặc tham khảo ý kiến bác sĩ.")
+
+        response = DISEASE_KNOWLEDGE.get().diseases.lookup(disease) or (
+            f"Không có thông tin về vaccine cho {disease}. Bạn có thể hỏi về các bệnh khác hoặc tham khảo ý kiến bác sĩ.")
         dispatcher.utter_message(
             text=response,
             buttons=[
@@ -701,27 +726,9 @@ class ActionGetVaccineForCondition(Action):
             return []
 
         condition = normalize_input(condition)
-        condition_vaccine_info = {
-            "dị ứng penicillin": "Hầu hết vaccine (như Infanrix Hexa, Hexaxim) không chứa penicillin, nhưng bạn nên kiểm tra với bác sĩ để đảm bảo an toàn, đặc biệt với các vaccine có thành phần phức tạp.",
-            "suy giảm miễn dịch": "Người suy giảm miễn dịch (ví dụ: HIV, ung thư) có thể cần tránh một số vaccine sống (như MMR II, Varivax). Vaccine bất hoạt (như Vaxigrip Tetra) thường an toàn hơn, nhưng cần tư vấn bác sĩ.",
-            "phụ nữ mang thai": "Một số vaccine như cúm (Vaxigrip Tetra) và bạch hầu-ho gà-uốn ván (Boostrix) được khuyến nghị cho phụ nữ mang thai. Tuy nhiên, vaccine sống (như MMR II) nên tránh. Vui lòng tham khảo bác sĩ.",
-            "dị ứng thuốc": "Nếu bạn dị ứng với thuốc, hãy cung cấp thông tin chi tiết cho bác sĩ trước khi tiêm vaccine để kiểm tra thành phần (ví dụ: kháng sinh, chất bảo quản).",
-            "trẻ dị ứng sữa": "Hầu hết vaccine không chứa thành phần từ sữa, nhưng bạn nên xác nhận với bác sĩ, đặc biệt với các vaccine như Rotateq hoặc Rotarix.",
-            "bệnh tiểu đường": "Người bệnh tiểu đường có thể tiêm hầu hết vaccine (như Vaxigrip Tetra, Pneumovax 23) nếu sức khỏe ổn định. Tham khảo bác sĩ để đảm bảo an toàn.",
-            "trẻ tự kỷ": "Trẻ tự kỷ có thể tiêm vaccine theo lịch tiêm chủng thông thường. Không có bằng chứng vaccine gây tự kỷ. Tham khảo bác sĩ nếu có lo ngại.",
-            "dị ứng hải sản": "Hầu hết vaccine không chứa thành phần từ hải sản, nhưng bạn nên kiểm tra với bác sĩ để đảm bảo an toàn.",
-            "cao huyết áp": "Người cao huyết áp có thể tiêm vaccine nếu huyết áp ổn định. Vaccine như Vaxigrip Tetra hoặc Pneumovax 23 thường an toàn, nhưng nên tham khảo bác sĩ.",
-            "trẻ sinh non": "Trẻ sinh non có thể tiêm vaccine theo lịch tiêm chủng, nhưng cần điều chỉnh thời gian dựa trên tuổi điều chỉnh. Tham khảo bác sĩ để có lịch tiêm phù hợp.",
-            "bệnh tim": "Người bệnh tim có thể tiêm vaccine nếu tình trạng ổn định. Vaccine như Vaxigrip Tetra hoặc Pneumovax 23 thường được khuyến nghị, nhưng cần tư vấn bác sĩ.",
-            "dị ứng latex": "Một số vaccine có thể chứa latex trong nắp lọ hoặc bơm tiêm. Bạn nên kiểm tra với bác sĩ để chọn vaccine an toàn.",
-            "bệnh gan": "Người bệnh gan có thể tiêm vaccine nếu tình trạng ổn định. Vaccine viêm gan A (Havax) và viêm gan B (Gene Hbvax A) thường được khuyến nghị, nhưng cần tham khảo bác sĩ.",
-            "hen suyễn": "Trẻ bị hen suyễn có thể tiêm vaccine nếu tình trạng được kiểm soát. Vaccine cúm (Vaxigrip Tetra) đặc biệt quan trọng, nhưng cần tham khảo bác sĩ.",
-            "dị ứng trứng": "Một số vaccine cúm (như Vaxigrip Tetra) có thể chứa lượng nhỏ protein trứng, nhưng thường an toàn. Tham khảo bác sĩ nếu có tiền sử dị ứng nghiêm trọng.",
-            "lupus": "Người bị lupus nên tránh vaccine sống (như MMR II). Vaccine bất hoạt (như Vaxigrip Tetra) thường an toàn, nhưng cần tư vấn bác sĩ."
-        }
-
-        response = condition_vaccine_info.get(condition,
-                                              f"Đối với {condition}, bạn nên tham khảo ý kiến bác sĩ để chọn vaccine phù hợp. Tôi có thể giúp bạn với thông tin vaccine khác!")
+
+        response = DISEASE_KNOWLEDGE.get().conditions.lookup(condition) or (
+            f"Đối với {condition}, bạn nên tham khảo ý kiến bác sĩ để chọn vaccine phù hợp. Tôi có thể giúp bạn với thông tin vaccine khác!")
         dispatcher.utter_message(
             text=response,
             buttons=[
@@ -740,7 +747,11 @@ class ActionAnalyzeOutOfScope(Action):
     ) -> List[Dict[Text, Any]]:
         user_input = tracker.latest_message.get("text", "")
         intent = tracker.latest_message.get("intent", {}).get("name", "unknown")
-        logger.info(f"Analyzing out-of-scope query: {user_input} (intent: {intent})")
+        keywords = RELEVANCE_CLASSIFIER.match(user_input)
+        logger.info(
+            f"Analyzing out-of-scope query: {user_input} (intent: {intent}, "
+            f"related: {bool(keywords) or intent in RELATED_INTENTS}, keywords: {keywords})"
+        )
         return []
 
 class ActionAnnotateQuery(Action):
@@ -751,7 +762,7 @@ class ActionAnnotateQuery(Action):
             self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]
     ) -> List[Dict[Text, Any]]:
         user_input = tracker.latest_message.get("text", "")
-        logger.info(f"Annotating query: {user_input}")
+        logger.info(f"Annotating query: {user_input} (keywords: {RELEVANCE_CLASSIFIER.match(user_input)})")
         return []
 
 class ActionResetAllSlots(Action):
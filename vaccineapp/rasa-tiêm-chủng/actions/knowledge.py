@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Generic, Iterable, Optional, Set, Text, Tuple, TypeVar
+from fuzzywuzzy import fuzz
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+# Holds the parsed form of a JSON file next to this module. Readers get the
+# current snapshot without locking; at most once per check_interval one reader
+# stats the file and, if the mtime changed, parses it and swaps the reference.
+class KnowledgeFile(Generic[T]):
+    def __init__(self, file_name: Text, build: Callable[[Dict[Text, Any]], T], check_interval: float = 5.0):
+        self.file_path = os.path.join(os.path.dirname(__file__), file_name)
+        self.check_interval = check_interval
+        self._build = build
+        self._snapshot: Optional[T] = None
+        self._mtime: Optional[int] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if self._snapshot is None or time.monotonic() >= self._next_check:
+            self._refresh()
+        return self._snapshot
+
+    def _refresh(self) -> None:
+        # Other readers keep using the old snapshot while one thread reloads
+        if not self._lock.acquire(blocking=self._snapshot is None):
+            return
+        try:
+            now = time.monotonic()
+            if self._snapshot is not None and now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.file_path).st_mtime_ns
+            except OSError as e:
+                logger.error(f"Error reading {self.file_path}: {str(e)}")
+                if self._snapshot is None:
+                    self._snapshot = self._build({})
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.file_path, "r", encoding="utf-8") as f:
+                    snapshot = self._build(json.load(f))
+            except Exception as e:
+                logger.error(f"Error loading {self.file_path}: {str(e)}")
+                if self._snapshot is None:
+                    self._snapshot = self._build({})
+                return
+            self._snapshot = snapshot
+            self._mtime = mtime
+            logger.info(f"Loaded knowledge file {self.file_path}")
+        finally:
+            self._lock.release()
+
+
+def trigrams(text: Text) -> Set[Text]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def tokens(text: Text) -> Tuple[Text, ...]:
+    return tuple(re.findall(r"[^\W_]+", text))
+
+
+# Trigram postings over a fixed set of keys: a lookup only scores the few keys
+# sharing the most trigrams with the query instead of every key. Keys differ by
+# a single short word ("viêm gan b" / "viêm gan c"), so a candidate must have
+# the same words as the query except for one typo in a word of MIN_TYPO_LENGTH
+# characters or more; anything looser returns None rather than a wrong answer.
+class FuzzyIndex:
+    MIN_TYPO_LENGTH = 4
+
+    def __init__(self, keys: Iterable[Text], score_cutoff: int = 80, max_candidates: int = 5):
+        self.score_cutoff = score_cutoff
+        self.max_candidates = max_candidates
+        postings = defaultdict(set)
+        for key in keys:
+            for gram in trigrams(key):
+                postings[gram].add(key)
+        self._postings = {gram: frozenset(members) for gram, members in postings.items()}
+
+    def best_match(self, term: Text) -> Optional[Tuple[Text, int]]:
+        counts = Counter()
+        for gram in trigrams(term):
+            counts.update(self._postings.get(gram, ()))
+        term_tokens = tokens(term)
+        best = None
+        for key, _ in counts.most_common(self.max_candidates):
+            if not self._same_words(term_tokens, tokens(key)):
+                continue
+            score = fuzz.ratio(term, key)
+            if best is None or score > best[1]:
+                best = (key, score)
+        return best
+
+    def _same_words(self, term_tokens: Tuple[Text, ...], key_tokens: Tuple[Text, ...]) -> bool:
+        if len(term_tokens) != len(key_tokens):
+            return False
+        differing = [(a, b) for a, b in zip(term_tokens, key_tokens) if a != b]
+        if len(differing) > 1:
+            return False
+        return all(min(len(a), len(b)) >= self.MIN_TYPO_LENGTH and fuzz.ratio(a, b) >= self.score_cutoff
+                   for a, b in differing)
+
+
+def fold_accents(text: Text) -> Text:
+    decomposed = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def fold_key(text: Text) -> Text:
+    return " ".join(tokens(fold_accents(text)))
+
+
+# Exact lookup on normalized keys, then on accent-folded keys (users often type
+# without diacritics, and the word segmenter joins words with "_" only when it
+# recognizes them), then fuzzy matching through the trigram index.
+class LookupTable:
+    def __init__(self, entries: Dict[Text, Text], normalize: Callable[[Text], Text], score_cutoff: int = 80):
+        self.entries = MappingProxyType({normalize(key): value for key, value in entries.items()})
+        self._folded = MappingProxyType({fold_key(key): key for key in self.entries})
+        self._index = FuzzyIndex(self._folded, score_cutoff=score_cutoff)
+
+    def lookup(self, key: Optional[Text]) -> Optional[Text]:
+        # key is already normalized by the caller: normalize is not idempotent
+        # ("prevenar" -> "prevenar 13" -> "prevenar 13 13")
+        if not key:
+            return None
+        if key in self.entries:
+            return self.entries[key]
+        folded = fold_key(key)
+        if folded in self._folded:
+            return self.entries[self._folded[folded]]
+        match = self._index.best_match(folded)
+        if match:
+            logger.debug(f"Fuzzy matched '{key}' to '{self._folded[match[0]]}' (score {match[1]})")
+            return self.entries[self._folded[match[0]]]
+        return None
@@ -0,0 +1,156 @@
+import argparse
+import atexit
+import csv
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Set, Text
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_PATH = os.path.join(os.path.dirname(__file__), "out_of_scope_queries.csv")
+QUERY_LOG_HEADER = ["user_input", "intent", "entities", "timestamp"]
+
+
+def read_query_rows(file_path: Text) -> List[List[Text]]:
+    if not os.path.isfile(file_path):
+        return []
+    with open(file_path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [row for row in reader if row and row[0]]
+
+
+def unique_query_rows(rows: List[List[Text]]) -> List[List[Text]]:
+    seen = set()
+    unique_rows = []
+    for row in rows:
+        if row[0] in seen:
+            continue
+        seen.add(row[0])
+        unique_rows.append(row)
+    return unique_rows
+
+
+# The CSV is read once to seed the set of seen queries; new rows go through a
+# single writer thread that appends whole batches, so rows never interleave.
+class OutOfScopeQueryLog:
+    def __init__(self, file_path: Text = QUERY_LOG_PATH):
+        self.file_path = file_path
+        self._seen: Optional[Set[Text]] = None
+        self._lock = threading.Lock()
+        # File writes take their own lock so a slow disk never stalls record()
+        self._file_lock = threading.Lock()
+        self._queue: "queue.Queue[List[Text]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+
+    def _load_seen(self) -> None:
+        try:
+            self._seen = {row[0] for row in read_query_rows(self.file_path)}
+        except Exception as e:
+            logger.error(f"Error reading CSV file {self.file_path} for duplicate check: {str(e)}")
+            self._seen = set()
+        logger.debug(f"Loaded {len(self._seen)} out-of-scope queries from {self.file_path}")
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name="out-of-scope-log-writer", daemon=True)
+            self._writer.start()
+
+    def record(self, user_input: Text, intent: Text, entities: List[Dict[Text, Any]], timestamp: Any) -> bool:
+        if not user_input:
+            return False
+        with self._lock:
+            if self._seen is None:
+                self._load_seen()
+            if user_input in self._seen:
+                return False
+            self._seen.add(user_input)
+            self._ensure_writer()
+        self._queue.put([user_input, intent, str(entities), timestamp])
+        return True
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._append_rows(batch)
+                logger.info(f"Saved {len(batch)} out-of-scope queries to CSV")
+            except Exception as e:
+                logger.error(f"Error writing to CSV file {self.file_path}: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _append_rows(self, rows: List[List[Text]]) -> None:
+        # Same lock as compact(), which replaces the file: an append racing the
+        # swap would land in the old file and be lost
+        with self._file_lock:
+            write_header = not os.path.isfile(self.file_path) or os.path.getsize(self.file_path) == 0
+            with open(self.file_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow(QUERY_LOG_HEADER)
+                writer.writerows(rows)
+
+    def flush(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.join()
+
+    def compact(self) -> int:
+        # Rewrites the file without duplicate or blank rows; the swap is atomic
+        # so a crash mid-compaction never leaves a truncated log behind.
+        self.flush()
+        with self._file_lock:
+            rows = unique_query_rows(read_query_rows(self.file_path))
+            tmp_path = f"{self.file_path}.tmp"
+            with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(QUERY_LOG_HEADER)
+                writer.writerows(rows)
+            os.replace(tmp_path, self.file_path)
+        with self._lock:
+            # Queries still queued for the writer stay seen
+            self._seen = {row[0] for row in rows} | (self._seen or set())
+        return len(rows)
+
+    def export(self, out_path: Text, fmt: Text = "csv") -> int:
+        self.flush()
+        rows = unique_query_rows(read_query_rows(self.file_path))
+        with open(out_path, "w", newline="", encoding="utf-8") as f:
+            if fmt == "json":
+                json.dump([dict(zip(QUERY_LOG_HEADER, row)) for row in rows], f, ensure_ascii=False, indent=2)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(QUERY_LOG_HEADER)
+                writer.writerows(rows)
+        return len(rows)
+
+
+def main(argv: Optional[List[Text]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Maintain the out-of-scope query log.")
+    parser.add_argument("--file", default=QUERY_LOG_PATH, help="Path to out_of_scope_queries.csv")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("compact", help="Drop duplicate and blank rows in place (run while the action server is idle)")
+    export_parser = subparsers.add_parser("export", help="Write the deduplicated log to another file")
+    export_parser.add_argument("out_path")
+    export_parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    args = parser.parse_args(argv)
+
+    query_log = OutOfScopeQueryLog(args.file)
+    if args.command == "compact":
+        print(f"Compacted {args.file}: {query_log.compact()} queries")
+    else:
+        print(f"Exported {query_log.export(args.out_path, args.format)} queries to {args.out_path}")
+
+
+if __name__ == "__main__":
+    main()
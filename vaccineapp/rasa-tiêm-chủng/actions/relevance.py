@@ -0,0 +1,32 @@
+import re
+from typing import Iterable, List, Optional, Text
+
+RELATED_INTENTS = frozenset(["ask_vaccine_for_new_disease", "ask_vaccine_for_special_condition"])
+
+# Regex fragments for generic domain words; literal terms (vaccine names and
+# synonyms) are escaped and tried first, longest first, so the most specific
+# term wins at any position.
+DOMAIN_KEYWORD_PATTERNS = [
+    r"vaccine", r"vắc[-\s]?xin", r"tiêm", r"bệnh", r"phòng", r"viêm", r"virus",
+    r"cúm", r"sởi", r"uốn ván", r"bạch hầu", r"phế cầu", r"hpv", r"thủy đậu"
+]
+
+
+class RelevanceClassifier:
+    def __init__(self, terms: Iterable[Text] = (), patterns: Iterable[Text] = DOMAIN_KEYWORD_PATTERNS):
+        literals = sorted({term.lower().strip() for term in terms if term and term.strip()}, key=len, reverse=True)
+        alternatives = [re.escape(term) for term in literals] + list(patterns)
+        self.pattern = re.compile("|".join(alternatives)) if alternatives else None
+
+    def match(self, text: Optional[Text]) -> List[Text]:
+        if not text or self.pattern is None:
+            return []
+        matched = {}
+        for m in self.pattern.finditer(text.lower()):
+            matched.setdefault(m.group(0), None)
+        return list(matched)
+
+    def is_related(self, text: Optional[Text], intent: Optional[Text] = None) -> bool:
+        if intent in RELATED_INTENTS:
+            return True
+        return bool(text) and self.pattern is not None and self.pattern.search(text.lower()) is not None
@@ -0,0 +1,64 @@
+import re
+from collections import Counter, defaultdict
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Text, Tuple
+
+
+def normalize_term(text: Optional[Text]) -> Text:
+    if not text:
+        return ""
+    return re.sub(r"\s+", " ", text.lower().replace("_", " ")).strip()
+
+
+def term_pattern(terms: Iterable[Text]) -> Optional["re.Pattern"]:
+    alternatives = [re.escape(term) for term in sorted(set(terms), key=len, reverse=True) if term]
+    if not alternatives:
+        return None
+    return re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + r")(?!\w)")
+
+
+# Inverted index from normalized symptom terms to vaccines, built from the
+# curated SYMPTOM_TO_VACCINE table and the side_effects lists of every vaccine.
+# A short symptom such as "sưng" is also posted for each side-effect phrase
+# containing it ("sưng đau tại chỗ tiêm"), so queries never scan phrases.
+class SymptomIndex:
+    def __init__(self, side_effects: Mapping[Text, Iterable[Text]], symptom_to_vaccine: Mapping[Text, Iterable[Text]]):
+        postings: Dict[Text, Set[Text]] = defaultdict(set)
+        for symptom, vaccines in symptom_to_vaccine.items():
+            postings[normalize_term(symptom)].update(vaccines)
+
+        phrases: Dict[Text, Set[Text]] = defaultdict(set)
+        for vaccine, effects in side_effects.items():
+            for effect in effects:
+                phrase = normalize_term(effect)
+                if phrase:
+                    phrases[phrase].add(vaccine)
+                    postings[phrase].add(vaccine)
+
+        for term in list(postings):
+            contained = term_pattern([term])
+            for phrase, vaccines in phrases.items():
+                if phrase != term and contained.search(phrase):
+                    postings[term].update(vaccines)
+
+        self.postings = MappingProxyType({term: frozenset(vaccines) for term, vaccines in postings.items()})
+        self._pattern = term_pattern(self.postings)
+
+    def extract(self, texts: Iterable[Optional[Text]]) -> List[Text]:
+        found = {}
+        if self._pattern is None:
+            return []
+        for text in texts:
+            for m in self._pattern.finditer(normalize_term(text)):
+                found.setdefault(m.group(0), None)
+        return list(found)
+
+    def rank(self, symptoms: Iterable[Text]) -> List[Tuple[Text, List[Text]]]:
+        counts = Counter()
+        matched: Dict[Text, List[Text]] = defaultdict(list)
+        for symptom in symptoms:
+            for vaccine in self.postings.get(normalize_term(symptom), ()):
+                counts[vaccine] += 1
+                matched[vaccine].append(symptom)
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return [(vaccine, matched[vaccine]) for vaccine, _ in ranked]
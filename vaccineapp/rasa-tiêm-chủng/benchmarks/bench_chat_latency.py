@@ -0,0 +1,542 @@
+# End-to-end latency benchmark for the chatbot's action hop.
+#
+# A chat message travels ChatView -> Rasa -> action server -> Django API. This
+# script starts the real action server (rasa_sdk + the actions package) in a
+# subprocess, points it at a stub Django API with configurable latency, and
+# replays the conversations from tests/test_stories.yml and every example in
+# data/nlu.yml through its /webhook at the given concurrency. Intents are routed
+# to actions with data/rules.yml and data/stories.yml, the way Rasa core would.
+#
+# The action server is instrumented so each action's time is split into text
+# normalization, fuzzy matching, HTTP calls to Django and everything else.
+#
+#   cd rasa-tiêm-chủng && python benchmarks/bench_chat_latency.py -c 8 --rounds 3 --api-latency 20
+#
+# With --rasa-url, turns are sent to a running Rasa server's REST channel
+# instead (its endpoints.yml must point action_endpoint at --port), which adds
+# the Rasa hop to the measurement.
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+import yaml
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+PHASES = ("normalize", "fuzzy", "http")
+ENTITY_RE = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
+# Somewhere in Ho Chi Minh City, used when --location-share sends coordinates
+USER_LOCATION = (10.7769, 106.7009)
+
+
+def load_yaml(*parts):
+    with open(os.path.join(BOT_DIR, *parts), encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))]
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean_ms": statistics.fmean(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+    }
+
+
+# --- Stub Django API -------------------------------------------------------
+
+class StubApi:
+    # Answers the endpoints actions.py calls with payloads shaped like the real
+    # API, after sleeping latency +/- jitter. Records server-side time per path.
+    def __init__(self, latency, jitter):
+        from actions.actions import VACCINE_STATIC_DATA
+
+        self.latency = latency
+        self.jitter = jitter
+        self.vaccines = [
+            {"id": i, "name": name, "description": facts.get("description", ""), "price": facts.get("price", 0),
+             "country_produce": {"name": facts.get("origin", "")}, "imgUrl": ""}
+            for i, (name, facts) in enumerate(VACCINE_STATIC_DATA.items(), 1)
+        ]
+        rng = random.Random(0)
+        self.centers = [
+            {"id": i, "name": f"Trung tâm tiêm chủng {i}", "address": f"Số {i}, Quận {i % 12 + 1}",
+             "latitude": USER_LOCATION[0] + rng.uniform(-0.2, 0.2), "longitude": USER_LOCATION[1] + rng.uniform(-0.2, 0.2)}
+            for i in range(1, 41)
+        ]
+        self.timings = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def respond(self, path, query):
+        if path == "/vaccines/":
+            q = query.get("q", [""])[0].lower()
+            results = [v for v in self.vaccines if q in v["name"].lower()]
+            return 200, {"count": len(results), "next": None, "previous": None, "results": results[:20]}
+        if path == "/health-centers/":
+            return 200, {"count": len(self.centers), "next": None, "previous": None, "results": self.centers[:10]}
+        if path == "/health-centers/nearest/":
+            results = [dict(center, distance_km=round(abs(center["latitude"] - USER_LOCATION[0]) * 111, 2))
+                       for center in self.centers]
+            results.sort(key=lambda c: c["distance_km"])
+            return 200, {"count": len(results), "results": results[:int(query.get("limit", ["10"])[0])]}
+        if path == "/schedules/":
+            return 200, {"results": []}
+        return 404, {"detail": "Not found."}
+
+    def serve(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                start = time.perf_counter()
+                url = urlparse(self.path)
+                time.sleep(max(0.0, api.latency + random.uniform(-api.jitter, api.jitter)))
+                status, payload = api.respond(url.path, parse_qs(url.query))
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with api.lock:
+                    api.timings[url.path].append(time.perf_counter() - start)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# --- Instrumented action server (runs in the subprocess) -------------------
+
+class Probes:
+    # Wall time of each action call with the time it spent in each phase, and
+    # every HTTP request on its own. Sync actions run on the server's event
+    # loop, so the running call is tracked in a context variable.
+    def __init__(self):
+        self.current = contextvars.ContextVar("bench_call", default=None)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.calls = defaultdict(list)
+            self.http = []
+            self.outside = defaultdict(float)
+
+    def add(self, phase, duration):
+        phases = self.current.get()
+        with self.lock:
+            if phase == "http":
+                self.http.append(duration)
+            if phases is None:
+                self.outside[phase] += duration
+        if phases is not None:
+            phases[phase] = phases.get(phase, 0.0) + duration
+
+    def phase(self, name, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+    def action(self, name, fn, clear_caches):
+        probes = self
+
+        def finish(token, phases, start):
+            duration = time.perf_counter() - start
+            probes.current.reset(token)
+            with probes.lock:
+                probes.calls[name].append((duration, phases))
+
+        async def finish_async(result, token, phases, start):
+            try:
+                return await result
+            finally:
+                finish(token, phases, start)
+
+        def wrapper(dispatcher, tracker, domain):
+            if clear_caches:
+                clear_caches()
+            phases = {}
+            token = probes.current.set(phases)
+            start = time.perf_counter()
+            try:
+                result = fn(dispatcher, tracker, domain)
+            except BaseException:
+                finish(token, phases, start)
+                raise
+            if asyncio.iscoroutine(result):
+                return finish_async(result, token, phases, start)
+            finish(token, phases, start)
+            return result
+        return wrapper
+
+    def snapshot(self):
+        with self.lock:
+            return {"actions": dict(self.calls), "http": list(self.http), "outside": dict(self.outside)}
+
+
+def serve_actions(port, api_url, cold):
+    import fuzzywuzzy.process
+    import requests.api
+    from rasa_sdk.endpoint import create_app
+    from rasa_sdk.executor import ActionExecutor
+    from sanic import response
+
+    import actions.actions as bot
+    from actions import symptoms
+
+    probes = Probes()
+    bot.DJANGO_API_BASE_URL = api_url
+    # Keep replayed out-of-scope messages out of the real query log
+    bot.OUT_OF_SCOPE_QUERY_LOG.file_path = os.path.join(tempfile.gettempdir(), "bench_out_of_scope_queries.csv")
+
+    bot.normalize_input = probes.phase("normalize", bot.normalize_input)
+    bot.normalize_term = probes.phase("normalize", bot.normalize_term)
+    symptoms.normalize_term = probes.phase("normalize", symptoms.normalize_term)
+    fuzzywuzzy.process.extractOne = probes.phase("fuzzy", fuzzywuzzy.process.extractOne)
+    requests.api.request = probes.phase("http", requests.api.request)
+
+    executor = ActionExecutor()
+    executor.register_package("actions")
+    clear_caches = bot.fetch_vaccine_from_api.cache_clear if cold else None
+    for name, fn in list(executor.actions.items()):
+        executor.actions[name] = probes.action(name, fn, clear_caches)
+
+    app = create_app(executor)
+
+    @app.get("/bench/probes")
+    async def get_probes(_):
+        return response.json(probes.snapshot())
+
+    @app.post("/bench/reset")
+    async def reset_probes(_):
+        probes.reset()
+        return response.json({"status": "ok"})
+
+    app.run(host="127.0.0.1", port=port, single_process=True, access_log=False, motd=False)
+
+
+# --- Conversations ---------------------------------------------------------
+
+def parse_message(text):
+    entities = []
+    plain = ""
+    last = 0
+    for match in ENTITY_RE.finditer(text):
+        plain += text[last:match.start()]
+        entities.append({"entity": match.group(2), "value": match.group(1),
+                         "start": len(plain), "end": len(plain) + len(match.group(1))})
+        plain += match.group(1)
+        last = match.end()
+    return (plain + text[last:]).strip(), entities
+
+
+def load_routes(forms):
+    # intent -> custom actions Rasa core would call on the action server.
+    # A form adds its validate_<form> call, then the actions of its submit rule.
+    by_intent, by_form = {}, {}
+    for source in (load_yaml("data", "rules.yml").get("rules", []), load_yaml("data", "stories.yml").get("stories", [])):
+        for item in source:
+            steps = item.get("steps", [])
+            condition = item.get("condition", [])
+            loop = next((c["active_loop"] for c in condition if "active_loop" in c), None)
+            if loop and steps and steps[0].get("action") == loop:
+                by_form.setdefault(loop, [s["action"] for s in steps[1:] if "action" in s])
+                continue
+            if steps and "intent" in steps[0]:
+                actions = []
+                for step in steps[1:]:
+                    if "intent" in step:
+                        break
+                    if "action" in step:
+                        actions.append(step["action"])
+                by_intent.setdefault(steps[0]["intent"], actions)
+
+    routes = {}
+    for intent, actions in by_intent.items():
+        expanded = []
+        for action in actions:
+            if action in forms:
+                expanded += [f"validate_{action}"] + by_form.get(action, [])
+            else:
+                expanded.append(action)
+        routes[intent] = expanded
+    return routes
+
+
+def load_conversations():
+    domain = load_yaml("domain.yml")
+    routes = load_routes(set(domain.get("forms") or {}))
+    conversations = []
+
+    for story in load_yaml("tests", "test_stories.yml").get("stories", []):
+        turns = []
+        for step in story.get("steps", []):
+            if "user" in step:
+                text, entities = parse_message(step["user"])
+                turns.append({"text": text, "intent": step.get("intent"), "entities": entities, "actions": []})
+            elif "action" in step and turns:
+                turns[-1]["actions"].append(step["action"])
+        conversations.append({"source": f"test_stories: {story.get('story')}", "turns": turns})
+
+    for block in load_yaml("data", "nlu.yml").get("nlu", []):
+        intent = block.get("intent")
+        if not intent:
+            continue
+        for line in (block.get("examples") or "").splitlines():
+            line = line.strip()
+            if not line.startswith("- "):
+                continue
+            text, entities = parse_message(line[2:])
+            conversations.append({"source": f"nlu: {intent}", "turns": [
+                {"text": text, "intent": intent, "entities": entities, "actions": routes.get(intent, [])}
+            ]})
+    return domain, conversations
+
+
+def build_call(action, sender, turn, slots, domain, metadata):
+    return {
+        "next_action": action,
+        "sender_id": sender,
+        "version": "3.1.0",
+        "domain": domain,
+        "tracker": {
+            "sender_id": sender,
+            "slots": dict(slots),
+            "latest_message": {
+                "text": turn["text"], "intent": {"name": turn["intent"], "confidence": 1.0},
+                "intent_ranking": [], "entities": turn["entities"], "metadata": metadata,
+            },
+            "latest_event_time": time.time(),
+            "followup_action": None,
+            "paused": False,
+            "events": [],
+            "latest_input_channel": "rest",
+            "latest_action_name": "action_listen",
+            "latest_action": {"action_name": "action_listen"},
+            "active_loop": {},
+        },
+    }
+
+
+# --- Client ----------------------------------------------------------------
+
+class Replayer:
+    def __init__(self, args, domain, registered):
+        self.args = args
+        self.domain = domain
+        self.registered = registered
+        self.slot_names = set(domain.get("slots") or {})
+        self.webhook = f"http://127.0.0.1:{args.port}/webhook"
+        self.turns, self.hops, self.statuses = [], defaultdict(list), defaultdict(int)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def metadata(self, rng):
+        if rng.random() < self.args.location_share:
+            return {"lat": USER_LOCATION[0], "lon": USER_LOCATION[1]}
+        return {}
+
+    def replay(self, conversation, rng):
+        sender = f"bench-{uuid.uuid4().hex[:12]}"
+        slots = {name: None for name in self.slot_names}
+        turn_times, hops, statuses = [], defaultdict(list), defaultdict(int)
+        for turn in conversation["turns"]:
+            metadata = self.metadata(rng)
+            for entity in turn["entities"]:
+                if entity["entity"] in slots:
+                    slots[entity["entity"]] = entity["value"]
+            start = time.perf_counter()
+            if self.args.rasa_url:
+                response = self.session().post(f"{self.args.rasa_url.rstrip('/')}/webhooks/rest/webhook",
+                                               json={"sender": sender, "message": turn["text"], "metadata": metadata},
+                                               timeout=30)
+                statuses[response.status_code] += 1
+            else:
+                for action in turn["actions"]:
+                    if action not in self.registered:
+                        # utter_*, forms and action_listen are handled by Rasa core
+                        continue
+                    call_start = time.perf_counter()
+                    response = self.session().post(self.webhook, json=build_call(
+                        action, sender, turn, slots, self.domain, metadata), timeout=30)
+                    hops[action].append(time.perf_counter() - call_start)
+                    statuses[response.status_code] += 1
+                    if response.ok:
+                        for event in response.json().get("events", []):
+                            if event.get("event") == "slot" and event.get("name") in slots:
+                                slots[event["name"]] = event.get("value")
+            turn_times.append(time.perf_counter() - start)
+        with self.lock:
+            self.turns.extend(turn_times)
+            for action, durations in hops.items():
+                self.hops[action].extend(durations)
+            for status, n in statuses.items():
+                self.statuses[status] += n
+
+
+def start_action_server(args, api_url):
+    command = [sys.executable, os.path.abspath(__file__), "--serve-actions", "--port", str(args.port), "--api-url", api_url]
+    if args.cold:
+        command.append("--cold")
+    process = subprocess.Popen(command, cwd=BOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Action server exited:\n{process.stderr.read()[-3000:]}")
+        try:
+            if requests.get(f"http://127.0.0.1:{args.port}/health", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("Action server did not start in time")
+
+
+def print_report(report):
+    def row(label, s):
+        print(f"{label:<40}{s['count']:>7}{s['mean_ms']:>9.1f}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+
+    print(f"\n{'hop (ms)':<40}{'n':>7}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for label, key in (("user turn (end to end)", "turn"), ("-> action server webhook (client)", "webhook"),
+                       ("   action run (server side)", "action"), ("   -> Django API (client side)", "api_client"),
+                       ("      Django stub (server side)", "api_server")):
+        row(label, report["hops"][key])
+
+    print(f"\n{'action (mean ms)':<44}{'calls':>6}{'total':>8}{'p95':>8}{'norm':>8}{'fuzzy':>8}{'http':>8}{'other':>8}")
+    for name, a in sorted(report["actions"].items(), key=lambda item: -item[1]["mean_ms"] * item[1]["count"]):
+        print(f"{name:<44}{a['count']:>6}{a['mean_ms']:>8.2f}{a['p95_ms']:>8.2f}{a['normalize_ms']:>8.2f}"
+              f"{a['fuzzy_ms']:>8.2f}{a['http_ms']:>8.2f}{a['other_ms']:>8.2f}")
+    print(f"\n{report['conversations']} conversations, {report['hops']['turn']['count']} turns in "
+          f"{report['elapsed']:.1f}s ({report['hops']['turn']['count'] / report['elapsed']:.1f} turns/s), "
+          f"statuses {report['statuses']}")
+
+
+def build_report(replayer, probes, api, elapsed, conversations):
+    actions, action_times = {}, []
+    for name, calls in probes["actions"].items():
+        durations = [duration for duration, _ in calls]
+        action_times += durations
+        entry = summarize(durations)
+        spent = 0.0
+        for phase in PHASES:
+            total = sum(phases.get(phase, 0.0) for _, phases in calls)
+            entry[f"{phase}_ms"] = total / len(calls) * 1000
+            spent += total
+        entry["other_ms"] = (sum(durations) - spent) / len(calls) * 1000
+        entry["webhook"] = summarize(replayer.hops.get(name, []))
+        actions[name] = entry
+
+    return {
+        "conversations": conversations,
+        "elapsed": elapsed,
+        "statuses": {str(k): v for k, v in replayer.statuses.items()},
+        "hops": {
+            "turn": summarize(replayer.turns),
+            "webhook": summarize([d for durations in replayer.hops.values() for d in durations]),
+            "action": summarize(action_times),
+            "api_client": summarize(probes["http"]),
+            "api_server": summarize([d for durations in api.timings.values() for d in durations]),
+        },
+        "api_paths": {path: summarize(durations) for path, durations in api.timings.items()},
+        "actions": actions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--concurrency", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=1, help="Times to replay the whole corpus")
+    parser.add_argument("--api-latency", type=float, default=20.0, help="Stub Django API latency in ms")
+    parser.add_argument("--api-jitter", type=float, default=5.0, help="+/- jitter on the stub latency in ms")
+    parser.add_argument("--location-share", type=float, default=0.5,
+                        help="Share of messages sent with the user's coordinates in metadata")
+    parser.add_argument("--cold", action="store_true", help="Clear the vaccine lookup cache before every action")
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--rasa-url", help="Send turns through a running Rasa REST channel instead")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="Write the report as JSON to this file")
+    parser.add_argument("--serve-actions", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--api-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_actions:
+        serve_actions(args.port, args.api_url, args.cold)
+        return
+
+    api = StubApi(args.api_latency / 1000, args.api_jitter / 1000)
+    stub = api.serve()
+    server = start_action_server(args, f"http://127.0.0.1:{stub.server_address[1]}/")
+    try:
+        base = f"http://127.0.0.1:{args.port}"
+        registered = {action["name"] for action in requests.get(f"{base}/actions", timeout=5).json()}
+        domain, conversations = load_conversations()
+        replayer = Replayer(args, domain, registered)
+        work = [conversation for _ in range(args.rounds) for conversation in conversations]
+        random.Random(args.seed).shuffle(work)
+        requests.post(f"{base}/bench/reset", timeout=5)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(lambda item: replayer.replay(item[1], random.Random(args.seed * 1000003 + item[0])),
+                          enumerate(work)))
+        elapsed = time.perf_counter() - start
+        probes = requests.get(f"{base}/bench/probes", timeout=30).json()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        stub.shutdown()
+
+    report = build_report(replayer, probes, api, elapsed, len(work))
+    report["settings"] = {key: value for key, value in vars(args).items() if key not in ("serve_actions", "api_url")}
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Benchmark for the symptom -> vaccine inverted index.
+#
+# Runs every indexed symptom term, alone and combined with other terms, once
+# per vaccine, through SymptomIndex.rank and through a naive scan over all
+# side-effect lists, and reports the time per query of each.
+#
+#   cd rasa-tiêm-chủng && python benchmarks/bench_symptom_index.py --multi 3
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.actions import SYMPTOM_TO_VACCINE, VACCINE_KNOWLEDGE  # noqa: E402
+from actions.symptoms import normalize_term  # noqa: E402
+
+
+def naive_rank(symptoms, side_effects):
+    counts = Counter()
+    for symptom in symptoms:
+        for vaccine, effects in side_effects.items():
+            if any(symptom in normalize_term(effect) for effect in effects):
+                counts[vaccine] += 1
+        for vaccine in SYMPTOM_TO_VACCINE.get(symptom, []):
+            counts[vaccine] += 1
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--multi", type=int, default=3, help="Symptoms per query in the multi-symptom run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    knowledge = VACCINE_KNOWLEDGE.get()
+    index = knowledge.symptoms
+    side_effects = {name: facts.side_effects for name, facts in knowledge.vaccines.items()}
+    terms = sorted(index.postings)
+
+    single = [[term] for _ in knowledge.vaccines for term in terms]
+    multi = [random.sample(terms, min(args.multi, len(terms))) for _ in knowledge.vaccines for _ in terms]
+
+    print(f"{len(knowledge.vaccines)} vaccines x {len(terms)} symptom terms = {len(single)} queries per run")
+    for label, queries in [("single symptom", single), (f"{args.multi} symptoms", multi)]:
+        indexed = timed(index.rank, queries)
+        naive = timed(lambda query: naive_rank(query, side_effects), queries)
+        print(f"{label:>16}: index {indexed:8.2f} us/query | naive scan {naive:8.2f} us/query | x{naive / indexed:.1f}")
+
+    message = "con bị sốt, sưng đau tại chỗ tiêm và quấy khóc"
+    start = time.perf_counter()
+    for _ in range(1000):
+        index.rank(index.extract([message]))
+    print(f"extract + rank of a full message: {(time.perf_counter() - start) * 1e3:.2f} us/message")
+
+
+if __name__ == "__main__":
+    main()
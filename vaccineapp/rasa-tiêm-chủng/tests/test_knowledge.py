@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import unittest
+
+from actions.actions import DISEASE_KNOWLEDGE, normalize_input
+from actions.knowledge import FuzzyIndex, KnowledgeFile, LookupTable, fold_accents
+
+
+class KnowledgeFileTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "data.json")
+        self.write({"version": 1})
+        self.builds = []
+        # An absolute file name replaces the module directory in os.path.join
+        self.knowledge = KnowledgeFile(self.path, self.build, check_interval=0)
+
+    def build(self, data):
+        self.builds.append(data)
+        return data.get("version")
+
+    def write(self, data, text=None):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text if text is not None else json.dumps(data))
+        # Move the mtime forward so quick rewrites are never within its resolution
+        mtime_ns = os.stat(self.path).st_mtime_ns + 10 ** 9
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_reloads_only_when_the_file_changes(self):
+        self.assertEqual(self.knowledge.get(), 1)
+        self.assertEqual(self.knowledge.get(), 1)
+        self.assertEqual(len(self.builds), 1)
+
+        self.write({"version": 2})
+        self.assertEqual(self.knowledge.get(), 2)
+        self.assertEqual(len(self.builds), 2)
+
+    def test_waits_for_the_check_interval(self):
+        self.knowledge.check_interval = 3600
+        self.assertEqual(self.knowledge.get(), 1)
+
+        self.write({"version": 2})
+        self.assertEqual(self.knowledge.get(), 1)
+
+    def test_a_broken_file_keeps_the_previous_snapshot(self):
+        self.assertEqual(self.knowledge.get(), 1)
+
+        self.write(None, text="{broken")
+        self.assertEqual(self.knowledge.get(), 1)
+        self.write({"version": 3})
+        self.assertEqual(self.knowledge.get(), 3)
+
+    def test_a_missing_file_builds_an_empty_snapshot(self):
+        os.remove(self.path)
+
+        self.assertIsNone(self.knowledge.get())
+        self.assertEqual(self.builds, [{}])
+
+
+class LookupTableTests(unittest.TestCase):
+    def setUp(self):
+        self.table = LookupTable({
+            "viêm gan c": "gan c", "bệnh gan": "gan", "bệnh tim": "tim", "hen_suyễn": "hen",
+            "sars - cov - 2": "covid", "viêm phổi do virus": "phổi"
+        }, str.lower)
+
+    def test_exact_and_accent_folded_keys(self):
+        self.assertEqual(self.table.lookup("viêm gan c"), "gan c")
+        self.assertEqual(self.table.lookup("viem gan c"), "gan c")
+        self.assertEqual(self.table.lookup("bệnh gán"), "gan")
+        self.assertEqual(self.table.lookup("hen suyen"), "hen")
+        self.assertEqual(self.table.lookup("sars cov 2"), "covid")
+
+    def test_typo_in_a_long_word(self):
+        self.assertEqual(self.table.lookup("viêm phổi do viruss"), "phổi")
+
+    def test_a_different_word_is_not_a_typo(self):
+        for key in ["viêm gan b", "viêm gan a", "bệnh thận", "bệnh tím gan", "viêm phổi", ""]:
+            with self.subTest(key=key):
+                self.assertIsNone(self.table.lookup(key))
+
+    def test_fold_accents(self):
+        self.assertEqual(fold_accents("Đường huyết"), "Duong huyet")
+
+
+class FuzzyIndexTests(unittest.TestCase):
+    def test_only_candidates_with_the_same_words(self):
+        index = FuzzyIndex(["benh tieu duong", "benh gan", "viem gan c"])
+
+        self.assertEqual(index.best_match("benh tieu duongg")[0], "benh tieu duong")
+        self.assertIsNone(index.best_match("benh gan c"))
+        self.assertIsNone(index.best_match("viem gan b"))
+        self.assertIsNone(index.best_match("xyz"))
+
+
+class DiseaseKnowledgeTests(unittest.TestCase):
+    def lookup(self, text):
+        knowledge = DISEASE_KNOWLEDGE.get()
+        key = normalize_input(text)
+        return knowledge.diseases.lookup(key) or knowledge.conditions.lookup(key)
+
+    def test_close_diseases_do_not_get_each_others_answer(self):
+        self.assertIn("viêm gan C", self.lookup("viêm gan c"))
+        self.assertIn("viêm gan C", self.lookup("viem gan c"))
+        self.assertIsNone(self.lookup("viêm gan b"))
+        self.assertIsNone(self.lookup("viêm gan a"))
+
+    def test_close_conditions_do_not_get_each_others_answer(self):
+        self.assertIn("bệnh gan", self.lookup("bệnh gán"))
+        self.assertIsNone(self.lookup("bệnh thận"))
+
+    def test_segmented_and_unaccented_queries(self):
+        self.assertIn("sốt xuất huyết", self.lookup("sot xuat huyet"))
+        self.assertIn("sốt xuất huyết", self.lookup("sốt xuất huyêt"))
+        self.assertIn("hen suyễn", self.lookup("hen suyen"))
@@ -0,0 +1,86 @@
+import csv
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from actions.query_log import QUERY_LOG_HEADER, OutOfScopeQueryLog, read_query_rows
+
+
+class OutOfScopeQueryLogTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "queries.csv")
+        self.log = OutOfScopeQueryLog(self.path)
+
+    def test_duplicate_queries_are_written_once(self):
+        self.assertTrue(self.log.record("thời tiết hôm nay", "out_of_scope", [], "1"))
+        self.assertFalse(self.log.record("thời tiết hôm nay", "out_of_scope", [], "2"))
+        self.assertFalse(self.log.record("", "out_of_scope", [], "3"))
+        self.log.flush()
+
+        self.assertEqual(read_query_rows(self.path), [["thời tiết hôm nay", "out_of_scope", "[]", "1"]])
+
+    def test_queries_already_in_the_file_are_not_recorded_again(self):
+        self.log.record("giá vàng", "out_of_scope", [], "1")
+        self.log.flush()
+
+        self.assertFalse(OutOfScopeQueryLog(self.path).record("giá vàng", "out_of_scope", [], "2"))
+
+    def test_concurrent_records_keep_whole_rows(self):
+        threads = [threading.Thread(target=lambda i=i: self.log.record(f"câu hỏi {i % 50}", "out_of_scope", [], str(i)))
+                   for i in range(200)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.log.flush()
+
+        rows = read_query_rows(self.path)
+        self.assertEqual(sorted(row[0] for row in rows), sorted(f"câu hỏi {i}" for i in range(50)))
+        self.assertTrue(all(len(row) == len(QUERY_LOG_HEADER) for row in rows))
+
+    def test_record_does_not_wait_for_a_slow_write(self):
+        started, release = threading.Event(), threading.Event()
+        self.addCleanup(release.set)
+        writer = csv.writer
+
+        def slow_writer(f):
+            started.set()
+            release.wait(5)
+            return writer(f)
+
+        with mock.patch("actions.query_log.csv.writer", side_effect=slow_writer):
+            self.log.record("câu 1", "out_of_scope", [], "1")
+            self.assertTrue(started.wait(5))
+            done = threading.Event()
+            threading.Thread(target=lambda: (self.log.record("câu 2", "out_of_scope", [], "2"), done.set())).start()
+            self.assertTrue(done.wait(1))
+            release.set()
+            self.log.flush()
+
+        self.assertEqual([row[0] for row in read_query_rows(self.path)], ["câu 1", "câu 2"])
+
+    def test_compact_drops_duplicate_and_blank_rows(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(",".join(QUERY_LOG_HEADER) + "\n" + "a,x,[],1\n,x,[],2\na,x,[],3\nb,x,[],4\n")
+
+        self.assertEqual(self.log.compact(), 2)
+        self.assertEqual(read_query_rows(self.path), [["a", "x", "[]", "1"], ["b", "x", "[]", "4"]])
+        self.assertFalse(self.log.record("b", "x", [], "5"))
+
+    def test_export_json(self):
+        self.log.record("a", "out_of_scope", [], "1")
+        out_path = os.path.join(self.dir.name, "queries.json")
+
+        self.assertEqual(self.log.export(out_path, "json"), 1)
+        with open(out_path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [{"user_input": "a", "intent": "out_of_scope", "entities": "[]",
+                                             "timestamp": "1"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from actions.relevance import RelevanceClassifier
+
+
+class RelevanceClassifierTests(unittest.TestCase):
+    def setUp(self):
+        self.classifier = RelevanceClassifier(["Gardasil", "Gardasil 9", "MMR"])
+
+    def test_longest_term_wins_and_matches_keep_their_order(self):
+        self.assertEqual(self.classifier.match("Tôi muốn tiêm Gardasil 9 và vắc xin MMR, tiêm ở đâu?"),
+                         ["tiêm", "gardasil 9", "vắc xin", "mmr"])
+
+    def test_domain_patterns_accept_spelling_variants(self):
+        for text, word in [("vắc-xin cúm", "vắc-xin"), ("vắcxin cúm", "vắcxin"), ("Vắc xin cúm", "vắc xin")]:
+            self.assertEqual(self.classifier.match(text), [word, "cúm"])
+
+    def test_unrelated_text(self):
+        self.assertEqual(self.classifier.match("giá vàng hôm nay"), [])
+        self.assertFalse(self.classifier.is_related("giá vàng hôm nay"))
+        self.assertFalse(self.classifier.is_related(None))
+
+    def test_related_intents_need_no_keyword(self):
+        self.assertTrue(self.classifier.is_related("giá vàng hôm nay", "ask_vaccine_for_new_disease"))
+        self.assertTrue(self.classifier.is_related("MMR", "out_of_scope"))
+
+    def test_terms_are_matched_literally(self):
+        classifier = RelevanceClassifier(["a.b (c)"], patterns=[])
+
+        self.assertEqual(classifier.match("tiêm A.B (C) nhé"), ["a.b (c)"])
+        self.assertEqual(classifier.match("tiêm axb c"), [])
+        self.assertEqual(RelevanceClassifier([], patterns=[]).match("tiêm"), [])
@@ -0,0 +1,33 @@
+import unittest
+
+from actions.symptoms import SymptomIndex, normalize_term
+
+
+class SymptomIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.index = SymptomIndex(
+            {"A": ["Sưng đau tại chỗ tiêm", "Sốt nhẹ"], "B": ["sốt cao"], "C": ["mệt mỏi"]},
+            {"sốt": ["C"], "sưng": ["A"], "Phát_ban": ["B"]}
+        )
+
+    def test_short_terms_are_posted_for_the_phrases_containing_them(self):
+        self.assertEqual(self.index.postings["sốt"], {"A", "B", "C"})
+        self.assertEqual(self.index.postings["sưng"], {"A"})
+        self.assertEqual(self.index.postings["phát ban"], {"B"})
+        self.assertEqual(self.index.postings["mệt mỏi"], {"C"})
+
+    def test_extract_prefers_the_longest_term_on_word_boundaries(self):
+        self.assertEqual(self.index.extract(["Bé bị SƯNG và sốt nhẹ", None, "phát_ban", "sốtt, sưngg"]),
+                         ["sưng", "sốt nhẹ", "phát ban"])
+
+    def test_rank_by_matched_symptoms_then_name(self):
+        self.assertEqual(self.index.rank(["sốt", "sưng", "Phát ban", "ho"]),
+                         [("A", ["sốt", "sưng"]), ("B", ["sốt", "Phát ban"]), ("C", ["sốt"])])
+        self.assertEqual(self.index.rank([]), [])
+
+    def test_empty_index(self):
+        self.assertEqual(SymptomIndex({}, {}).extract(["sốt"]), [])
+
+    def test_normalize_term(self):
+        self.assertEqual(normalize_term("  Phát_ban   NHẸ "), "phát ban nhẹ")
+        self.assertEqual(normalize_term(None), "")
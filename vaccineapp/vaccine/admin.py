@@ -1,17 +1,31 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.urls import path
-from django.utils.html import mark_safe
-from django.db.models import Count, Q, F
-from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter
+from django.utils.html import format_html
+from django.db.models import Count
 from django.template.response import TemplateResponse
-from datetime import datetime, timedelta
-from django.utils import timezone
+from collections import defaultdict
+from datetime import date, datetime, timedelta
 import calendar
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 
+from vaccine import archive, transitions
+from vaccine.dbrouter import replica_reads
+from vaccine.passwords import hash_password
+from vaccine.uploads import image_url
 from vaccine.models import User, Information, Vaccine, HealthCenter, Time, Appointment, VaccineType, AppointmentDetail, \
-    CommunicationVaccination, CountryProduce
+    CommunicationVaccination, CountryProduce, CoverageStat, StatusEnum, CheckIn, ArchivedAppointment
+
+
+def image_preview(field):
+    # Images are uploaded straight to storage (uploads/sign + uploads/complete),
+    # never through an admin form; the admin only shows them
+    def preview(self, obj):
+        url = image_url(getattr(obj, field))
+        return format_html('<img src="{}" width="120" />', url) if url else '-'
+    preview.short_description = 'Ảnh'
+    return preview
 
 
 class MyVaccineAdmin(admin.ModelAdmin):
@@ -20,7 +34,9 @@ class MyVaccineAdmin(admin.ModelAdmin):
     list_filter = ['id', 'createdAt']
     list_editable = ['name']
     list_per_page = 10
-    # readonly_fields = ['image_preview']
+    exclude = ['imgUrl']
+    readonly_fields = ['image_preview']
+    image_preview = image_preview('imgUrl')
 
 
 class MyCommunicationAdmin(admin.ModelAdmin):
@@ -29,6 +45,9 @@ class MyCommunicationAdmin(admin.ModelAdmin):
     list_filter = ['id']
     list_editable = ['name']
     list_per_page = 10
+    exclude = ['imgUrl']
+    readonly_fields = ['image_preview']
+    image_preview = image_preview('imgUrl')
 
 
 class MyVaccineTypeAdmin(admin.ModelAdmin):
@@ -48,7 +67,7 @@ class MyCountryProduceAdmin(admin.ModelAdmin):
 
 
 class MyHealthCenterAdmin(admin.ModelAdmin):
-    list_display = ['id', 'name', 'active', 'address']
+    list_display = ['id', 'name', 'active', 'address', 'latitude', 'longitude']
     search_fields = ['name']
     list_filter = ['id']
     list_editable = ['name']
@@ -69,14 +88,45 @@ class MyTimeAdmin(admin.ModelAdmin):
     list_filter = ['id']
     list_editable = ['time_start', 'time_end']
     list_per_page = 10
+    ordering = ['time_start']
+
+
+class AppointmentAdminForm(forms.ModelForm):
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        if self.instance.pk and not transitions.can_transition(self.instance.status, status):
+            raise forms.ValidationError(f"Không thể chuyển từ {self.instance.status} sang {status}")
+        return status
+
+
+def transition_action(target, description):
+    def apply(modeladmin, request, queryset):
+        result = transitions.transition(queryset.values_list('pk', flat=True), target)
+        modeladmin.message_user(request, f"Đã chuyển {len(result.updated)} lịch hẹn sang {target}.")
+        if result.skipped:
+            modeladmin.message_user(request, f"Bỏ qua {len(result.skipped)} lịch hẹn không thể chuyển sang {target}.",
+                                    messages.WARNING)
+    apply.__name__ = f'mark_{target}'
+    apply.short_description = description
+    return apply
 
 
 class MyAppointmentAdmin(admin.ModelAdmin):
+    form = AppointmentAdminForm
     list_display = ['id', 'date', 'status']
     search_fields = ['date', 'status']
     list_filter = ['id']
     list_editable = ['date', 'status']
     list_per_page = 10
+    actions = [
+        transition_action(StatusEnum.DA_XAC_NHAN, 'Xác nhận các lịch hẹn đã chọn'),
+        transition_action(StatusEnum.DA_HOAN_THANH, 'Đánh dấu đã tiêm các lịch hẹn đã chọn'),
+        transition_action(StatusEnum.DA_HUY, 'Hủy các lịch hẹn đã chọn'),
+    ]
+
+    def get_changelist_form(self, request, **kwargs):
+        # Same transition check for the list_editable status column
+        return super().get_changelist_form(request, form=AppointmentAdminForm, **kwargs)
 
 
 class MyAppointmentDetailAdmin(admin.ModelAdmin):
@@ -93,19 +143,103 @@ class MyUserAdmin(admin.ModelAdmin):
     list_filter = ['id']
     list_editable = ['username']
     list_per_page = 10
+    exclude = ['avatarUrl']
+    readonly_fields = ['image_preview']
+    image_preview = image_preview('avatarUrl')
 
     def save_model(self, request, obj, form, change):
         if 'password' in form.changed_data or not change:
-            obj.set_password(obj.password)
+            obj.password = hash_password(obj.password)
         obj.save()
 
 
+class MyCheckInAdmin(admin.ModelAdmin):
+    list_display = ['id', 'number', 'date', 'health_centre', 'time', 'status', 'queued_at', 'called_at']
+    list_filter = ['date', 'health_centre', 'status']
+    list_select_related = ['health_centre', 'time']
+    raw_id_fields = ['appointment', 'called_by']
+    list_per_page = 50
+
+
+class MyArchivedAppointmentAdmin(admin.ModelAdmin):
+    list_display = ['id', 'date', 'status', 'information', 'health_centre', 'archived_at']
+    list_filter = ['status', 'health_centre']
+    date_hierarchy = 'date'
+    list_select_related = ['information', 'health_centre']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class MyCoverageStatAdmin(admin.ModelAdmin):
+    list_display = ['computed_on', 'cohort_year', 'vaccine', 'health_center', 'population', 'vaccinated', 'coverage']
+    list_filter = ['computed_on', 'cohort_year', 'vaccine', 'health_center']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+def stats_buckets(start, end, bucket, size):
+    # Appointment counts per bucket (month, quarter or day) of [start, end),
+    # from grouped queries on the live table and, when the period reaches
+    # back that far, the archive
+    vaccinated, total = [0] * size, [0] * size
+    by_type = defaultdict(lambda: [0] * size)
+    for model in archive.appointment_models(start):
+        appointments = model.objects.filter(date__gte=start, date__lt=end).order_by()
+        for day, status, n in appointments.values_list('date', 'status').annotate(n=Count('id')):
+            total[bucket(day)] += n
+            if status == StatusEnum.DA_HOAN_THANH:
+                vaccinated[bucket(day)] += n
+        rows = (appointments.filter(status=StatusEnum.DA_HOAN_THANH, appointment_details__vaccine__vaccine_type__isnull=False)
+                .values_list('date', 'appointment_details__vaccine__vaccine_type')
+                .annotate(n=Count('id', distinct=True)))
+        for day, type_id, n in rows:
+            by_type[type_id][bucket(day)] += n
+    return vaccinated, total, by_type
+
+
 class MyVaccineAdminSite(admin.AdminSite):
     site_header = 'Vaccine Management Admin'
 
     def get_urls(self):
-        return [path('cate-stats/', self.cate_stats_view, name='cate-stats')] + super().get_urls()
+        return [
+            path('cate-stats/', self.cate_stats_view, name='cate-stats'),
+            path('coverage-stats/', self.coverage_stats_view, name='coverage-stats'),
+        ] + super().get_urls()
 
+    @replica_reads
+    def coverage_stats_view(self, request):
+        if not request.user.is_authenticated or not request.user.is_staff:
+            return HttpResponseRedirect(reverse('admin:login') + '?next=' + request.path)
+
+        # Reads the latest run of compute_coverage_stats; nothing is computed here
+        latest = CoverageStat.objects.order_by('-computed_on').values_list('computed_on', flat=True).first()
+        center_id = request.GET.get('health_center') or None
+        stats = CoverageStat.objects.filter(computed_on=latest, health_center_id=center_id).select_related('vaccine')
+
+        cohorts = sorted({s.cohort_year for s in stats}, reverse=True)
+        vaccines = sorted({s.vaccine.name for s in stats})
+        cells = {(s.cohort_year, s.vaccine.name): s for s in stats}
+        rows = [(cohort, [cells.get((cohort, name)) for name in vaccines]) for cohort in cohorts]
+
+        return TemplateResponse(request, 'admin/coverage_stats.html', {
+            'computed_on': latest,
+            'vaccines': vaccines,
+            'rows': rows,
+            'health_centers': HealthCenter.objects.filter(active=True).order_by('name'),
+            'health_center': center_id,
+        })
+
+    @replica_reads
     def cate_stats_view(self, request):
         if not request.user.is_authenticated or not request.user.is_staff:
             return HttpResponseRedirect(reverse('admin:login') + '?next=' + request.path)
@@ -121,126 +255,28 @@ class MyVaccineAdminSite(admin.AdminSite):
         else:
             period = 1
 
-        if time_filter == 'year':
-            start_date = timezone.make_aware(datetime(year, 1, 1))
-            end_date = timezone.make_aware(datetime(year + 1, 1, 1))
-            period_label = f"Năm {year}"
-        elif time_filter == 'quarter':
-            start_date = timezone.make_aware(datetime(year, 1, 1))
-            end_date = timezone.make_aware(datetime(year + 1, 1, 1))
-            period_label = f"Các Quý - {year}"
-        else:
-            start_date = timezone.make_aware(datetime(year, int(period), 1))
-            end_date = timezone.make_aware(
-                datetime(year, int(period), calendar.monthrange(year, int(period))[1])
-            ) + timedelta(days=1)
-            period_label = f"Tháng {period} - {year}"
-
-        vaccinated_data = []
-        completion_data = []
-        labels = []
-        vaccine_stats = {}
-
-        vaccine_types = VaccineType.objects.all()
-        for vt in vaccine_types:
-            vaccine_stats[vt.name] = []
-
         if time_filter == 'year':
             labels = [f"Tháng {i}" for i in range(1, 13)]
-            for month in range(1, 13):
-                month_start = timezone.make_aware(datetime(year, month, 1))
-                month_end = timezone.make_aware(
-                    datetime(year, month, calendar.monthrange(year, month)[1])
-                ) + timedelta(days=1)
-
-                vaccinated_count = Appointment.objects.filter(
-                    status='completed',
-                    date__range=(month_start, month_end)
-                ).count()
-                vaccinated_data.append(vaccinated_count)
-
-                total_apps = Appointment.objects.filter(
-                    date__range=(month_start, month_end)
-                ).count()
-                completed_apps = Appointment.objects.filter(
-                    status='completed',
-                    date__range=(month_start, month_end)
-                ).count()
-                rate = (completed_apps / total_apps * 100) if total_apps > 0 else 0
-                completion_data.append(round(rate, 2))
-
-                for vt in vaccine_types:
-                    count = Appointment.objects.filter(
-                        status='completed',
-                        date__range=(month_start, month_end),
-                        appointment_details__vaccine__vaccine_type=vt
-                    ).count()
-                    vaccine_stats[vt.name].append(count)
-
+            start, end = date(year, 1, 1), date(year + 1, 1, 1)
+            bucket = lambda day: day.month - 1
+            period_label = f"Năm {year}"
         elif time_filter == 'quarter':
             labels = ['Quý 1', 'Quý 2', 'Quý 3', 'Quý 4']
-            for quarter in range(1, 5):
-                start_month = (quarter - 1) * 3 + 1
-                end_month = start_month + 2
-                quarter_start = timezone.make_aware(datetime(year, start_month, 1))
-                quarter_end = timezone.make_aware(
-                    datetime(year, end_month, calendar.monthrange(year, end_month)[1])
-                ) + timedelta(days=1)
-
-                vaccinated_count = Appointment.objects.filter(
-                    status='completed',
-                    date__range=(quarter_start, quarter_end)
-                ).count()
-                vaccinated_data.append(vaccinated_count)
-
-                total_apps = Appointment.objects.filter(
-                    date__range=(quarter_start, quarter_end)
-                ).count()
-                completed_apps = Appointment.objects.filter(
-                    status='completed',
-                    date__range=(quarter_start, quarter_end)
-                ).count()
-                rate = (completed_apps / total_apps * 100) if total_apps > 0 else 0
-                completion_data.append(round(rate, 2))
-
-                for vt in vaccine_types:
-                    count = Appointment.objects.filter(
-                        status='completed',
-                        date__range=(quarter_start, quarter_end),
-                        appointment_details__vaccine__vaccine_type=vt
-                    ).count()
-                    vaccine_stats[vt.name].append(count)
-
+            start, end = date(year, 1, 1), date(year + 1, 1, 1)
+            bucket = lambda day: (day.month - 1) // 3
+            period_label = f"Các Quý - {year}"
         else:
             days_in_month = calendar.monthrange(year, int(period))[1]
             labels = [f"Ngày {i}" for i in range(1, days_in_month + 1)]
-            for day in range(1, days_in_month + 1):
-                day_start = timezone.make_aware(datetime(year, int(period), day))
-                day_end = day_start + timedelta(days=1)
-
-                vaccinated_count = Appointment.objects.filter(
-                    status='completed',
-                    date__range=(day_start, day_end)
-                ).count()
-                vaccinated_data.append(vaccinated_count)
-
-                total_apps = Appointment.objects.filter(
-                    date__range=(day_start, day_end)
-                ).count()
-                completed_apps = Appointment.objects.filter(
-                    status='completed',
-                    date__range=(day_start, day_end)
-                ).count()
-                rate = (completed_apps / total_apps * 100) if total_apps > 0 else 0
-                completion_data.append(round(rate, 2))
-
-                for vt in vaccine_types:
-                    count = Appointment.objects.filter(
-                        status='completed',
-                        date__range=(day_start, day_end),
-                        appointment_details__vaccine__vaccine_type=vt
-                    ).count()
-                    vaccine_stats[vt.name].append(count)
+            start = date(year, int(period), 1)
+            end = start + timedelta(days=days_in_month)
+            bucket = lambda day: day.day - 1
+            period_label = f"Tháng {period} - {year}"
+
+        vaccinated_data, total_data, by_type = stats_buckets(start, end, bucket, len(labels))
+        completion_data = [round(vaccinated / total * 100, 2) if total > 0 else 0
+                           for vaccinated, total in zip(vaccinated_data, total_data)]
+        vaccine_stats = {vt.name: by_type[vt.pk] for vt in VaccineType.objects.all()}
 
         months = list(range(1, 13))
 
@@ -267,4 +303,7 @@ admin_site.register(HealthCenter, MyHealthCenterAdmin)
 admin_site.register(Time, MyTimeAdmin)
 admin_site.register(CommunicationVaccination, MyCommunicationAdmin)
 admin_site.register(VaccineType, MyVaccineTypeAdmin)
-admin_site.register(CountryProduce, MyCountryProduceAdmin)
\ No newline at end of file
+admin_site.register(CountryProduce, MyCountryProduceAdmin)
+admin_site.register(CoverageStat, MyCoverageStatAdmin)
+admin_site.register(CheckIn, MyCheckInAdmin)
+admin_site.register(ArchivedAppointment, MyArchivedAppointmentAdmin)
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class VaccineConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vaccine'
+
+    def ready(self):
+        from vaccine import signals  # noqa: F401
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from vaccine.models import Appointment, AppointmentDetail, ArchivedAppointment, ArchivedAppointmentDetail, CheckIn, \
+    StatusEnum
+
+ARCHIVED_STATUSES = (StatusEnum.DA_HOAN_THANH, StatusEnum.DA_HUY)
+APPOINTMENT_FIELDS = ('id', 'date', 'status', 'created_at', 'note', 'information_id', 'health_centre_id', 'time_id')
+
+
+def horizon(today=None):
+    # Only appointments dated before this day can be in the archive
+    return (today or timezone.localdate()) - timedelta(days=getattr(settings, 'APPOINTMENT_ARCHIVE_AFTER_DAYS', 365))
+
+
+def needs_archive(start):
+    # start: first appointment date the caller asks for, None for no lower bound
+    return start is None or start < horizon()
+
+
+def appointment_models(start=None):
+    return (Appointment, ArchivedAppointment) if needs_archive(start) else (Appointment,)
+
+
+def detail_models(start=None):
+    return (AppointmentDetail, ArchivedAppointmentDetail) if needs_archive(start) else (AppointmentDetail,)
+
+
+def archive_batch(cutoff, batch_size):
+    # Moves up to batch_size finished appointments dated before cutoff, with
+    # their details, in one transaction. Rows are copied with their ids and
+    # deleted without signals: this is a move, and everything that rolls up
+    # history (schedules, coverage, statistics) reads both tables.
+    with transaction.atomic():
+        ids = list(Appointment.objects.select_for_update()
+                   .filter(date__lt=cutoff, status__in=ARCHIVED_STATUSES)
+                   .order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return 0, 0
+        ArchivedAppointment.objects.bulk_create(
+            ArchivedAppointment(**row) for row in Appointment.objects.filter(pk__in=ids).values(*APPOINTMENT_FIELDS))
+        details = [ArchivedAppointmentDetail(**row) for row in
+                   AppointmentDetail.objects.filter(appointment_id__in=ids).values('id', 'appointment_id', 'vaccine_id')]
+        ArchivedAppointmentDetail.objects.bulk_create(details)
+        # Day-of queue entries have no use once the day is this far behind
+        CheckIn.objects.filter(appointment_id__in=ids).delete()
+        AppointmentDetail.objects.filter(appointment_id__in=ids)._raw_delete(router.db_for_write(AppointmentDetail))
+        Appointment.objects.filter(pk__in=ids)._raw_delete(router.db_for_write(Appointment))
+    return len(ids), len(details)
+
+
+def pending(cutoff):
+    return Appointment.objects.filter(date__lt=cutoff, status__in=ARCHIVED_STATUSES).count()
@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from oauth2_provider.models import get_access_token_model
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from vaccine.models import User
+
+PRINCIPAL_FIELDS = ('id', 'username', 'userRole', 'is_active', 'is_staff', 'is_superuser')
+ACCESS_TOKEN_FIELDS = ('id', 'user_id', 'application_id', 'token', 'expires', 'scope')
+
+
+def build_instance(model, values, names):
+    # An instance with only the given fields; anything else is deferred and
+    # loaded in one query by refresh_from_db if a view touches it.
+    field_names = [f.attname for f in model._meta.concrete_fields if f.attname in names]
+    return model.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+
+
+def build_principal(values):
+    return build_instance(User, values, PRINCIPAL_FIELDS)
+
+
+def principal_values(user):
+    return {name: getattr(user, name) for name in PRINCIPAL_FIELDS}
+
+
+def build_access_token(values, user):
+    # request.auth stays an AccessToken, so is_valid()/allow_scopes() checks
+    # (TokenHasScope) work on cache hits too
+    access_token = build_instance(get_access_token_model(), values, ACCESS_TOKEN_FIELDS)
+    access_token.user = user
+    return access_token
+
+
+def access_token_values(access_token):
+    return {name: getattr(access_token, name) for name in ACCESS_TOKEN_FIELDS}
+
+
+def inactive_key(user_id):
+    return f'auth:inactive:{user_id}'
+
+
+def mark_inactive(user_id, inactive=True):
+    # Stateless JWTs are never looked up, so deactivated and deleted users are
+    # remembered in the shared cache for as long as a token issued before
+    # could still be valid
+    if inactive:
+        cache.set(inactive_key(user_id), True, jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    else:
+        cache.delete(inactive_key(user_id))
+
+
+def get_bearer_token(request):
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(parts) == 2 and parts[0].lower() == 'bearer':
+        return parts[1]
+    return None
+
+
+def authenticate_plain_request(request):
+    # The API's authentication classes for plain Django views. EventSource
+    # clients cannot set headers, so ?access_token= is accepted as well.
+    token = request.GET.get('access_token')
+    if token and 'HTTP_AUTHORIZATION' not in request.META:
+        request.META['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return drf_request.user
+    except APIException:
+        return None
+
+
+class TokenCache:
+    # Per process: logout, revocation and user changes only reach the worker
+    # that handled them; other workers keep their entry for up to
+    # AUTH_TOKEN_CACHE_TTL seconds.
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._tokens_by_user = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        _, values, expires_at = entry
+        if expires_at <= time.monotonic():
+            self.discard(token)
+            return None
+        return values
+
+    def set(self, token, user_id, values, ttl):
+        with self._lock:
+            self._entries[token] = (user_id, values, time.monotonic() + ttl)
+            self._entries.move_to_end(token)
+            self._tokens_by_user[user_id].add(token)
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, token):
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            tokens = self._tokens_by_user.get(entry[0])
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[entry[0]]
+
+    def discard(self, token):
+        with self._lock:
+            self._pop(token)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._pop(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+
+token_cache = TokenCache(getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000))
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    # Validated access tokens are remembered for AUTH_TOKEN_CACHE_TTL seconds
+    # (never past their expiry), so repeat requests skip the token and user
+    # lookups. Entries are dropped on logout, revocation and user changes.
+    def authenticate(self, request):
+        token = get_bearer_token(request)
+        if token:
+            values = token_cache.get(token)
+            if values is not None:
+                user = build_principal(values['user'])
+                return user, build_access_token(values['access_token'], user)
+
+        result = super().authenticate(request)
+        if result is not None and token:
+            user, access_token = result
+            ttl = getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 60)
+            if access_token.expires:
+                ttl = min(ttl, (access_token.expires - timezone.now()).total_seconds())
+            if ttl > 0:
+                token_cache.set(token, user.pk, {'user': principal_values(user),
+                                                 'access_token': access_token_values(access_token)}, ttl)
+        return result
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    # Opt-in (AUTH_STATELESS_JWT): the principal comes from the token claims,
+    # so no query is made. Role changes apply when the access token expires;
+    # deactivated and deleted users are refused through mark_inactive.
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None or raw_token.count(b'.') != 2:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        try:
+            values = {
+                'id': validated_token['user_id'],
+                'username': validated_token['username'],
+                'userRole': validated_token['userRole'],
+                'is_active': True,
+                'is_staff': validated_token.get('is_staff', False),
+                'is_superuser': validated_token.get('is_superuser', False),
+            }
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        if cache.get(inactive_key(values['id'])):
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return build_principal(values)
+
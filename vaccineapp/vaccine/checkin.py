@@ -0,0 +1,254 @@
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from vaccine import slotstream
+from vaccine.models import CheckIn, CheckInStatusEnum, HealthCenter, StatusEnum, Time
+
+NUMBER_ATTEMPTS = 3
+
+
+class CheckInError(Exception):
+    pass
+
+
+class CenterQueue:
+    # Waiting check-ins of one center for one day: a FIFO per time slot plus a
+    # dict of who is still waiting. Removing from the middle (skip, cancel)
+    # only drops the dict entry and stale deque entries are discarded when they
+    # reach the head, so peek, pop and length stay O(1) amortized.
+    __slots__ = ('slots', 'waiting', 'counts', 'slot_order', 'loaded_at', '_seq')
+
+    def __init__(self, rows, slot_order):
+        self.slots = {}
+        self.waiting = {}
+        self.counts = Counter()
+        self.slot_order = slot_order
+        self.loaded_at = time.monotonic()
+        self._seq = 0
+        for pk, time_id, number in rows:
+            self.push(pk, time_id, number)
+
+    def push(self, pk, time_id, number):
+        if pk in self.waiting:
+            return
+        # The sequence tells a re-queued id apart from its old deque entry
+        self._seq += 1
+        self.slots.setdefault(time_id, deque()).append((pk, self._seq))
+        self.waiting[pk] = (time_id, self._seq, number)
+        self.counts[time_id] += 1
+
+    def remove(self, pk):
+        entry = self.waiting.pop(pk, None)
+        if entry is not None:
+            self.counts[entry[0]] -= 1
+
+    def peek(self, time_id):
+        queue = self.slots.get(time_id)
+        while queue:
+            pk, seq = queue[0]
+            entry = self.waiting.get(pk)
+            if entry is not None and entry[1] == seq:
+                return pk
+            queue.popleft()
+        return None
+
+    def next_slot(self):
+        # Earliest slot of the day with someone waiting
+        for time_id in self.slot_order:
+            if self.counts[time_id] > 0:
+                return time_id
+        return next((time_id for time_id, n in self.counts.items() if n > 0), None)
+
+    def __len__(self):
+        return len(self.waiting)
+
+
+class CheckInQueue:
+    # Per-process index over the CheckIn table. The database stays the source
+    # of truth: every change is written first (calls are guarded UPDATEs, so
+    # two desks never get the same patient) and queues are reloaded after a
+    # restart or CHECKIN_QUEUE_RESYNC_SECONDS, which also picks up check-ins
+    # made by other worker processes. A queue that looks empty is reloaded
+    # right away, so a desk is never told the line is empty while another
+    # process still has someone waiting.
+    def __init__(self, resync_seconds):
+        self.resync_seconds = resync_seconds
+        self._queues = {}
+        self._lock = threading.RLock()
+
+    def load(self, center_id, day):
+        rows = (CheckIn.objects
+                .filter(health_centre_id=center_id, date=day, status=CheckInStatusEnum.CHO_GOI)
+                .order_by('queued_at', 'id').values_list('id', 'time_id', 'number'))
+        slot_order = list(Time.objects.order_by('time_start').values_list('id', flat=True))
+        return CenterQueue(rows, slot_order)
+
+    def get(self, center_id, day):
+        key = (center_id, day)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None or time.monotonic() - queue.loaded_at > self.resync_seconds:
+                queue = self._queues[key] = self.load(center_id, day)
+                # Only today's queues are worth keeping around
+                for stale in [k for k in self._queues if k[1] < day]:
+                    del self._queues[stale]
+            return queue
+
+    def forget(self, center_id, day):
+        with self._lock:
+            self._queues.pop((center_id, day), None)
+
+    def reload(self, center_id, day):
+        with self._lock:
+            self.forget(center_id, day)
+            return self.get(center_id, day)
+
+    def check_in(self, appointment):
+        today = timezone.localdate()
+        if appointment.date != today:
+            raise CheckInError('Chỉ có thể check-in lịch hẹn của hôm nay')
+        if appointment.status != StatusEnum.DA_XAC_NHAN:
+            raise CheckInError('Chỉ có thể check-in lịch hẹn đã xác nhận')
+        if appointment.health_centre_id is None:
+            raise CheckInError('Lịch hẹn chưa có trung tâm tiêm')
+
+        for attempt in range(NUMBER_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    check_in = self._save_check_in(appointment, today)
+                    transaction.on_commit(lambda: self._pushed(check_in))
+                return check_in
+            except IntegrityError:
+                # Another desk got the same number (or the same appointment) in
+                # the same instant; the next attempt sees its row
+                if attempt == NUMBER_ATTEMPTS - 1:
+                    raise CheckInError('Hệ thống đang bận, vui lòng thử lại')
+
+    def _save_check_in(self, appointment, today):
+        check_in = CheckIn.objects.select_for_update().filter(appointment=appointment).first()
+        if check_in is not None and check_in.status != CheckInStatusEnum.BO_QUA:
+            raise CheckInError('Lịch hẹn đã được check-in')
+        if check_in is None:
+            # The center row serializes number allocation between desks and
+            # processes; the unique (health_centre, date, number) constraint
+            # backs it up where row locks are not available (SQLite)
+            HealthCenter.objects.select_for_update().filter(pk=appointment.health_centre_id).first()
+            last = CheckIn.objects.filter(health_centre_id=appointment.health_centre_id, date=today) \
+                .aggregate(last=Max('number'))['last']
+            check_in = CheckIn(appointment=appointment, health_centre_id=appointment.health_centre_id,
+                               date=today, number=(last or 0) + 1)
+        # A skipped patient who comes back goes to the end of the line
+        check_in.time_id = appointment.time_id
+        check_in.status = CheckInStatusEnum.CHO_GOI
+        check_in.queued_at = timezone.now()
+        check_in.called_at = None
+        check_in.called_by = None
+        check_in.save()
+        return check_in
+
+    def _pushed(self, check_in):
+        with self._lock:
+            self.get(check_in.health_centre_id, check_in.date).push(check_in.pk, check_in.time_id, check_in.number)
+        self.publish(check_in.health_centre_id, 'check_in', check_in)
+
+    def call_next(self, center_id, time_id=None, user=None):
+        today = timezone.localdate()
+        reloaded = False
+        while True:
+            with self._lock:
+                queue = self.get(center_id, today)
+                pk = self.head(queue, time_id)
+                if pk is None and not reloaded:
+                    queue = self.reload(center_id, today)
+                    reloaded = True
+                    pk = self.head(queue, time_id)
+                if pk is None:
+                    return None
+                queue.remove(pk)
+            called = CheckIn.objects.filter(pk=pk, status=CheckInStatusEnum.CHO_GOI).update(
+                status=CheckInStatusEnum.DA_GOI, called_at=timezone.now(), called_by=user)
+            # 0 rows: another desk or process got there first, try the next one
+            if called:
+                check_in = CheckIn.objects.select_related('appointment__information', 'time').get(pk=pk)
+                self.publish(center_id, 'called', check_in)
+                return check_in
+
+    @staticmethod
+    def head(queue, time_id=None):
+        slot = time_id if time_id is not None else queue.next_slot()
+        return queue.peek(slot) if slot is not None else None
+
+    def skip(self, check_in):
+        skipped = CheckIn.objects.filter(
+            pk=check_in.pk, status__in=[CheckInStatusEnum.CHO_GOI, CheckInStatusEnum.DA_GOI]
+        ).update(status=CheckInStatusEnum.BO_QUA)
+        if not skipped:
+            raise CheckInError('Lượt này không còn trong hàng chờ')
+        check_in.status = CheckInStatusEnum.BO_QUA
+        with self._lock:
+            self.get(check_in.health_centre_id, check_in.date).remove(check_in.pk)
+        self.publish(check_in.health_centre_id, 'skipped', check_in)
+        return check_in
+
+    def drop_appointments(self, appointment_ids):
+        # Canceled appointments leave the line
+        rows = list(CheckIn.objects.filter(appointment_id__in=appointment_ids, status=CheckInStatusEnum.CHO_GOI))
+        if not rows:
+            return
+        CheckIn.objects.filter(pk__in=[row.pk for row in rows], status=CheckInStatusEnum.CHO_GOI) \
+            .update(status=CheckInStatusEnum.BO_QUA)
+        for row in rows:
+            row.status = CheckInStatusEnum.BO_QUA
+            with self._lock:
+                self.get(row.health_centre_id, row.date).remove(row.pk)
+            self.publish(row.health_centre_id, 'skipped', row)
+
+    def summary(self, center_id):
+        today = timezone.localdate()
+        with self._lock:
+            queue = self.get(center_id, today)
+            if not queue:
+                queue = self.reload(center_id, today)
+            slots = []
+            for time_id in queue.slot_order + [t for t in queue.counts if t not in queue.slot_order]:
+                if queue.counts[time_id] > 0:
+                    pk = queue.peek(time_id)
+                    slots.append({'time': time_id, 'waiting': queue.counts[time_id],
+                                  'next': {'id': pk, 'number': queue.waiting[pk][2]}})
+            return {'health_centre': center_id, 'date': today.isoformat(), 'waiting': len(queue), 'slots': slots}
+
+    def publish(self, center_id, event, check_in):
+        slotstream.publish([queue_topic(center_id)], {
+            'event': event,
+            'check_in': {'id': check_in.pk, 'number': check_in.number, 'appointment': check_in.appointment_id,
+                         'time': check_in.time_id, 'status': check_in.status},
+            'queue': self.summary(center_id),
+        })
+
+
+def queue_topic(center_id):
+    return f'checkin:{center_id}'
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = CheckInQueue(getattr(settings, 'CHECKIN_QUEUE_RESYNC_SECONDS', 30))
+    return _queue
+
+
+def queue_stream(center_id, asynchronous=True):
+    return slotstream.event_stream([queue_topic(center_id)], lambda: [get_queue().summary(center_id)], event='queue',
+                                   asynchronous=asynchronous)
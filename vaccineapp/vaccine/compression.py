@@ -0,0 +1,90 @@
+import gzip
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# HTML is left out on purpose: admin pages carry CSRF tokens, and compressing
+# them next to reflected input is what BREACH exploits
+COMPRESSIBLE_TYPES = ('application/json', 'text/csv', 'text/plain', 'text/css', 'application/javascript')
+
+
+def accepted_encodings(header):
+    # "gzip, deflate, br;q=0.9" -> {'gzip': 1.0, 'deflate': 1.0, 'br': 0.9}
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    # Brotli (when installed) wins over gzip unless the client ranks gzip higher
+    accepted = accepted_encodings(header)
+    best, best_quality = None, 0.0
+    for coding in (('br',) if brotli is not None else ()) + ('gzip',):
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressionMiddleware:
+    # Compresses non-streaming responses of at least COMPRESSION_MIN_SIZE bytes.
+    # Streaming responses (server-sent events) pass through untouched, since
+    # compressing them would buffer the events.
+    def __init__(self, get_response):
+        if not getattr(settings, 'COMPRESSION_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.gzip_level = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+        self.content_types = tuple(getattr(settings, 'COMPRESSION_CONTENT_TYPES', COMPRESSIBLE_TYPES))
+
+    def compress(self, content, encoding):
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        return gzip.compress(content, compresslevel=self.gzip_level, mtime=0)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in self.content_types or len(response.content) < self.min_size:
+            return response
+
+        # Caches must keep compressed and plain copies apart
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressed = self.compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # Same representation, different bytes
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
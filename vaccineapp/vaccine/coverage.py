@@ -0,0 +1,157 @@
+import logging
+from collections import namedtuple
+
+import numpy as np
+from django.db import transaction
+
+from vaccine import archive
+from vaccine.models import CoverageStat, Information, StatusEnum
+
+logger = logging.getLogger(__name__)
+
+PatientArrays = namedtuple('PatientArrays', ['ids', 'cohorts', 'sexes'])
+DoseArrays = namedtuple('DoseArrays', ['patient_ids', 'vaccine_ids', 'center_ids', 'dates'])
+
+# counts arrays are indexed [cohort, sex, vaccine, center], sex being the stored
+# Information.sex (0 = False, 1 = True); the last center slot
+# holds patients without a completed appointment at any center.
+Coverage = namedtuple('Coverage', ['cohorts', 'vaccine_ids', 'center_ids', 'population', 'vaccinated'])
+
+NO_CENTER = 0
+
+
+def stream_patients(chunk_size=50000):
+    ids, cohorts, sexes = [], [], []
+    queryset = Information.objects.order_by('pk').values_list('pk', 'date_of_birth', 'sex')
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        ids.append(np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk)))
+        cohorts.append(np.fromiter((row[1].year for row in chunk), dtype=np.int32, count=len(chunk)))
+        sexes.append(np.fromiter((bool(row[2]) for row in chunk), dtype=np.int8, count=len(chunk)))
+    if not ids:
+        return PatientArrays(np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.int8))
+    return PatientArrays(np.concatenate(ids), np.concatenate(cohorts), np.concatenate(sexes))
+
+
+def stream_doses(chunk_size=100000):
+    columns = [[], [], [], []]
+    # Archived appointments are part of every cohort's history
+    for model in archive.detail_models():
+        queryset = (model.objects
+                    .filter(appointment__status=StatusEnum.DA_HOAN_THANH, vaccine__isnull=False,
+                            appointment__information__isnull=False)
+                    .order_by('pk')
+                    .values_list('pk', 'appointment__information_id', 'vaccine_id',
+                                 'appointment__health_centre_id', 'appointment__date'))
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+            n = len(chunk)
+            columns[0].append(np.fromiter((row[1] for row in chunk), dtype=np.int64, count=n))
+            columns[1].append(np.fromiter((row[2] for row in chunk), dtype=np.int64, count=n))
+            columns[2].append(np.fromiter((row[3] or NO_CENTER for row in chunk), dtype=np.int64, count=n))
+            columns[3].append(np.fromiter((row[4].toordinal() for row in chunk), dtype=np.int32, count=n))
+    if not columns[0]:
+        return DoseArrays(*(np.empty(0, np.int64) for _ in range(4)))
+    return DoseArrays(*(np.concatenate(column) for column in columns))
+
+
+def dense_index(ids):
+    # Maps database ids to 0..n-1 through a lookup table indexed by id, which is
+    # linear time (no sorting) since primary keys are small dense integers.
+    present = np.flatnonzero(np.bincount(ids)) if len(ids) else np.empty(0, np.int64)
+    lookup = np.full(int(present[-1]) + 1 if len(present) else 1, -1, dtype=np.int64)
+    lookup[present] = np.arange(len(present))
+    return present, lookup
+
+
+def compute_coverage(patients, doses):
+    # Everything below is whole-array work in linear time: ids become dense
+    # indexes through lookup tables, and the counts come from one bincount each.
+    if len(patients.ids):
+        patient_lookup = np.full(int(patients.ids.max()) + 1, -1, dtype=np.int64)
+        patient_lookup[patients.ids] = np.arange(len(patients.ids))
+        in_range = doses.patient_ids < len(patient_lookup)
+        rows = np.where(in_range, patient_lookup[np.where(in_range, doses.patient_ids, 0)], -1)
+    else:
+        rows = np.full(len(doses.patient_ids), -1, dtype=np.int64)
+    known = rows >= 0
+    rows, vaccine_ids, center_ids, dates = rows[known], doses.vaccine_ids[known], doses.center_ids[known], doses.dates[known]
+
+    cohorts, cohort_index = np.unique(patients.cohorts, return_inverse=True)
+    sexes = patients.sexes.astype(np.int64)
+    vaccines, vaccine_lookup = dense_index(vaccine_ids)
+    vaccine_index = vaccine_lookup[vaccine_ids]
+    centers, center_lookup = dense_index(center_ids[center_ids != NO_CENTER])
+    n_vaccines, n_centers = len(vaccines), len(centers) + 1
+
+    # Home center: the center of each patient's most recent completed dose. The
+    # date and center are packed into one key so a single maximum.at finds it
+    # (same-day ties go to the higher center id); patients without any center
+    # keep the last slot.
+    home = np.full(len(patients.ids), len(centers), dtype=np.int64)
+    with_center = center_ids != NO_CENTER
+    if with_center.any():
+        key = dates[with_center].astype(np.int64) * n_centers + center_lookup[center_ids[with_center]]
+        latest = np.full(len(patients.ids), -1, dtype=np.int64)
+        np.maximum.at(latest, rows[with_center], key)
+        has_center = latest >= 0
+        home[has_center] = latest[has_center] % n_centers
+
+    shape = (len(cohorts), 2, n_vaccines, n_centers)
+    population = np.bincount(
+        np.ravel_multi_index((cohort_index, sexes, home), (len(cohorts), 2, n_centers)),
+        minlength=len(cohorts) * 2 * n_centers,
+    ).reshape(len(cohorts), 2, n_centers)
+
+    # A patient counts once per vaccine however many doses they had
+    seen = np.zeros((len(patients.ids), n_vaccines), dtype=bool)
+    seen[rows, vaccine_index] = True
+    vaccinated_rows, vaccinated_vaccines = np.nonzero(seen)
+    vaccinated = np.bincount(
+        np.ravel_multi_index(
+            (cohort_index[vaccinated_rows], sexes[vaccinated_rows], vaccinated_vaccines, home[vaccinated_rows]), shape),
+        minlength=int(np.prod(shape)),
+    ).reshape(shape)
+
+    return Coverage(cohorts, vaccines, centers, population, vaccinated)
+
+
+def build_stats(coverage, computed_on, min_cohort=None):
+    # One row per cohort x vaccine x center, plus an all-centers row (center None)
+    stats = []
+    population_all = coverage.population.sum(axis=2)
+    vaccinated_all = coverage.vaccinated.sum(axis=3)
+    center_ids = list(coverage.center_ids.tolist()) + [None]
+    for c, cohort in enumerate(coverage.cohorts.tolist()):
+        if min_cohort is not None and cohort < min_cohort:
+            continue
+        for v, vaccine_id in enumerate(coverage.vaccine_ids.tolist()):
+            slices = [(None, population_all[c], vaccinated_all[c, :, v])]
+            slices += [(center_id, coverage.population[c, :, h], coverage.vaccinated[c, :, v, h])
+                       for h, center_id in enumerate(center_ids) if center_id is not None]
+            for center_id, population, vaccinated in slices:
+                total_population, total_vaccinated = int(population.sum()), int(vaccinated.sum())
+                if not total_population:
+                    continue
+                stats.append(CoverageStat(
+                    computed_on=computed_on, cohort_year=cohort, vaccine_id=vaccine_id, health_center_id=center_id,
+                    population=total_population, vaccinated=total_vaccinated,
+                    vaccinated_sex_false=int(vaccinated[0]), vaccinated_sex_true=int(vaccinated[1]),
+                    coverage=round(total_vaccinated / total_population * 100, 2),
+                ))
+    return stats
+
+
+def persist(stats, computed_on):
+    with transaction.atomic():
+        CoverageStat.objects.filter(computed_on=computed_on).delete()
+        CoverageStat.objects.bulk_create(stats, batch_size=5000)
+    logger.info(f"Saved {len(stats)} coverage rows for {computed_on}")
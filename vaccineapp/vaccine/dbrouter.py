@@ -0,0 +1,118 @@
+import contextvars
+import functools
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'db_primary_pin'
+
+_read_db = contextvars.ContextVar('read_db', default=None)
+
+
+def replicas():
+    return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', []) if alias in settings.DATABASES]
+
+
+class ReplicaRouter:
+    # Writes always go to the primary. Reads go to a replica only inside
+    # using_replica() (read-only endpoints, see ReplicaReadMixin) and never
+    # while a transaction is open on the primary.
+    def db_for_read(self, model, **hints):
+        alias = _read_db.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+@contextmanager
+def using_replica():
+    aliases = replicas()
+    token = _read_db.set(random.choice(aliases) if aliases else None)
+    try:
+        yield
+    finally:
+        _read_db.reset(token)
+
+
+def pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def pin(request, response):
+    # Read-your-writes: the client's next reads stay on the primary until
+    # replication has caught up. The cookie covers browser sessions, the cache
+    # entry bearer-token clients.
+    seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set(pin_key(user.pk), 1, seconds)
+    response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+
+
+def is_pinned(request):
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and cache.get(pin_key(user.pk)) is not None
+
+
+def should_use_replica(request):
+    return request.method in SAFE_METHODS and bool(replicas()) and not is_pinned(request)
+
+
+class ReplicaReadMixin:
+    # For ViewSets: safe requests are served from a replica. Authentication and
+    # permissions run first, on the primary, so a token issued a moment ago
+    # is always found.
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if should_use_replica(request):
+            aliases = replicas()
+            self._replica_token = _read_db.set(random.choice(aliases))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _read_db.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def replica_reads(view_method):
+    # Same for plain view methods (admin pages); template responses are
+    # rendered before leaving the replica
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not should_use_replica(request):
+            return view_method(self, request, *args, **kwargs)
+        with using_replica():
+            response = view_method(self, request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
+    return wrapper
+
+
+class PrimaryPinMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replicas():
+            pin(request, response)
+        return response
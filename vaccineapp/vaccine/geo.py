@@ -0,0 +1,91 @@
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9
+
+# Approximate cell height x width (km, at the equator) for each geohash length
+CELL_SIZES_KM = {
+    1: (4992.6, 5009.4), 2: (624.1, 1252.3), 3: (156.0, 156.5), 4: (19.5, 39.1),
+    5: (4.89, 4.89), 6: (0.61, 1.22), 7: (0.153, 0.153), 8: (0.019, 0.038),
+}
+
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def decode_bounds(geohash):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        code = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if code >> shift & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return lat_range, lon_range
+
+
+def neighbors(geohash):
+    # The cell itself and the eight cells around it, found by stepping one cell
+    # size from its centre and re-encoding.
+    (lat_min, lat_max), (lon_min, lon_max) = decode_bounds(geohash)
+    lat, lon = (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+    dlat, dlon = lat_max - lat_min, lon_max - lon_min
+    cells = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            cell_lat = lat + i * dlat
+            if not -90 <= cell_lat <= 90:
+                continue
+            cell_lon = (lon + j * dlon + 180) % 360 - 180
+            cell = encode(cell_lat, cell_lon, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def precision_for_radius(radius_km, lat):
+    # Longest geohash whose cells are still at least radius_km on each side, so
+    # the 3x3 block around the query point covers the whole circle.
+    shrink = max(math.cos(math.radians(lat)), 0.01)
+    for precision in range(max(CELL_SIZES_KM), 0, -1):
+        height, width = CELL_SIZES_KM[precision]
+        if min(height, width * shrink) >= radius_km:
+            return precision
+    return 0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi, dlambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def nearby_cells(lat, lon, radius_km):
+    precision = precision_for_radius(radius_km, lat)
+    if precision == 0:
+        return None
+    return neighbors(encode(lat, lon, precision))
@@ -0,0 +1,99 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from vaccine.models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+
+
+def request_hash(request):
+    data = dict(request.data.lists()) if hasattr(request.data, 'lists') else request.data
+    payload = f"{request.method} {request.path}\n{json.dumps(data, sort_keys=True, default=str)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def replay(record):
+    return Response(record.response_body, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def claim(user, scope, key, fingerprint):
+    # Returns (record, None) when this request owns the key, or (None, response)
+    # when it is a retry that must not run again.
+    now = timezone.now()
+    ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400))
+    stale = now - timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_SECONDS', 60))
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                return IdempotencyRecord.objects.create(user=user, scope=scope, key=key, request_hash=fingerprint,
+                                                        expires_at=now + ttl), None
+        except IntegrityError:
+            existing = IdempotencyRecord.objects.filter(user=user, scope=scope, key=key).first()
+        if existing is None:
+            continue
+        if existing.expires_at <= now or (existing.status_code is None and existing.created_at < stale):
+            # Expired, or left behind by a worker that died mid-request
+            IdempotencyRecord.objects.filter(pk=existing.pk, created_at=existing.created_at).delete()
+            continue
+        if existing.request_hash != fingerprint:
+            return None, Response({'error': f'{HEADER} này đã được dùng cho một yêu cầu khác'},
+                                  status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        if existing.status_code is None:
+            return None, Response({'error': f'Yêu cầu với {HEADER} này đang được xử lý'},
+                                  status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+        return None, replay(existing)
+    return None, Response({'error': f'Yêu cầu với {HEADER} này đang được xử lý'},
+                          status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+
+
+def idempotent(scope):
+    # For POST actions of a ViewSet. A request carrying an Idempotency-Key runs
+    # once per user and key; retries get the stored response back without
+    # touching the database again. The outcome is saved in the same
+    # transaction as the view's writes, so a crash can't leave one without the
+    # other. 5xx responses and exceptions free the key for another try.
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key or not request.user.is_authenticated:
+                return view_method(self, request, *args, **kwargs)
+            if len(key) > 255:
+                return Response({'error': f'{HEADER} tối đa 255 ký tự'}, status=status.HTTP_400_BAD_REQUEST)
+
+            record, response = claim(request.user, scope, key, request_hash(request))
+            if response is not None:
+                return response
+            try:
+                with transaction.atomic():
+                    response = view_method(self, request, *args, **kwargs)
+                    if response.status_code < 500:
+                        record.status_code = response.status_code
+                        record.response_body = response.data
+                        record.save(update_fields=['status_code', 'response_body'])
+            except Exception:
+                record.delete()
+                raise
+            if response.status_code >= 500:
+                record.delete()
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_expired(batch_size=1000):
+    deleted = 0
+    while True:
+        ids = list(IdempotencyRecord.objects.filter(expires_at__lte=timezone.now())
+                   .values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyRecord.objects.filter(pk__in=ids).delete()[0]
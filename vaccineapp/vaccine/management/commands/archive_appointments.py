@@ -0,0 +1,45 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vaccine import archive
+
+
+class Command(BaseCommand):
+    help = 'Chuyển các lịch hẹn đã tiêm / đã hủy cũ hơn APPOINTMENT_ARCHIVE_AFTER_DAYS sang bảng lưu trữ'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='Chỉ lưu trữ lịch hẹn trước ngày này (YYYY-MM-DD), không muộn hơn mốc cấu hình')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.0, help='Nghỉ giữa các lô (giây), giảm độ trễ replica')
+        parser.add_argument('--max-batches', type=int, help='Dừng sau số lô này')
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ đếm số lịch hẹn sẽ được lưu trữ')
+
+    def handle(self, *args, **options):
+        cutoff = archive.horizon()
+        if options['before']:
+            before = date.fromisoformat(options['before'])
+            # The API only looks in the archive for dates before the horizon
+            if before > cutoff:
+                raise CommandError(f"--before không được muộn hơn {cutoff} (APPOINTMENT_ARCHIVE_AFTER_DAYS)")
+            cutoff = before
+
+        if options['dry_run']:
+            self.stdout.write(f"{archive.pending(cutoff)} lịch hẹn trước {cutoff} sẽ được lưu trữ")
+            return
+
+        appointments = details = batches = 0
+        start = time.perf_counter()
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved, moved_details = archive.archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            appointments += moved
+            details += moved_details
+            batches += 1
+            self.stdout.write(f"  lô {batches}: {moved} lịch hẹn, {moved_details} chi tiết")
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f"Đã lưu trữ {appointments} lịch hẹn, {details} chi tiết trước {cutoff} "
+                          f"({batches} lô, {time.perf_counter() - start:.2f}s)")
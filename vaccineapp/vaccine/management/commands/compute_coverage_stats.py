@@ -0,0 +1,40 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from vaccine import coverage
+
+
+class Command(BaseCommand):
+    help = 'Tính tỷ lệ bao phủ tiêm chủng theo năm sinh x vaccine x trung tâm (chạy hằng đêm)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Ngày ghi nhận kết quả (YYYY-MM-DD), mặc định là hôm nay')
+        parser.add_argument('--min-cohort', type=int, help='Chỉ lưu các năm sinh từ năm này trở đi')
+        parser.add_argument('--chunk-size', type=int, default=100000)
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ tính, không lưu vào CSDL')
+
+    def handle(self, *args, **options):
+        computed_on = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+
+        start = time.perf_counter()
+        patients = coverage.stream_patients(options['chunk_size'])
+        doses = coverage.stream_doses(options['chunk_size'])
+        loaded = time.perf_counter()
+        result = coverage.compute_coverage(patients, doses)
+        computed = time.perf_counter()
+        stats = coverage.build_stats(result, computed_on, options['min_cohort'])
+        if not options['dry_run']:
+            coverage.persist(stats, computed_on)
+        done = time.perf_counter()
+
+        self.stdout.write(
+            f"{len(patients.ids)} hồ sơ, {len(doses.patient_ids)} mũi tiêm -> {len(stats)} dòng thống kê "
+            f"({len(result.cohorts)} năm sinh x {len(result.vaccine_ids)} vaccine x {len(result.center_ids)} trung tâm)"
+        )
+        self.stdout.write(
+            f"Đọc dữ liệu {loaded - start:.2f}s, tính toán {computed - loaded:.2f}s, "
+            f"{'bỏ qua lưu' if options['dry_run'] else 'lưu'} {done - computed:.2f}s"
+        )
@@ -0,0 +1,57 @@
+import json
+import time
+from datetime import date
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from vaccine import schedule
+
+
+class Command(BaseCommand):
+    help = 'Tính danh sách vaccine đến hạn / quá hạn cho toàn bộ hồ sơ tiêm (Information)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Ngày tính lịch (YYYY-MM-DD), mặc định là hôm nay')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--output', help='Ghi kết quả từng hồ sơ ra file JSON Lines')
+        parser.add_argument('--warm-cache', action='store_true', help='Ghi kết quả vào cache lịch tiêm của từng hồ sơ')
+
+    def handle(self, *args, **options):
+        today = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        engine = schedule.get_engine()
+        totals = {category: np.zeros(len(engine.rules), dtype=np.int64) for category in schedule.CATEGORIES}
+        patients = 0
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else None
+        start = time.perf_counter()
+        try:
+            for ids, dobs, completed, masks in schedule.compute_all(today, options['batch_size']):
+                patients += len(ids)
+                for category, mask in masks.items():
+                    totals[category] += mask.sum(axis=0)
+                if output or options['warm_cache']:
+                    self.write_patients(engine, today, ids, dobs, completed, masks, output, options['warm_cache'])
+        finally:
+            if output:
+                output.close()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{patients} hồ sơ, {len(engine.rules)} mũi trong lịch, ngày {today} ({elapsed:.2f}s)")
+        for i, rule in enumerate(engine.rules):
+            counts = ', '.join(f"{category}={totals[category][i]}" for category in schedule.CATEGORIES)
+            self.stdout.write(f"  {rule.vaccine} (mũi {rule.dose}): {counts}")
+
+    def write_patients(self, engine, today, ids, dobs, completed, masks, output, warm_cache):
+        flagged = np.zeros(len(ids), dtype=bool)
+        for mask in masks.values():
+            flagged |= mask.any(axis=1)
+        for row in range(len(ids)) if warm_cache else np.flatnonzero(flagged):
+            dob = dobs[row].item()
+            completed_doses = {vaccine: int(n) for vaccine, n in zip(engine.vaccines, completed[row]) if n}
+            if warm_cache:
+                schedule.store_schedule(int(ids[row]), {'dob': dob, 'completed': completed_doses}, today)
+            if output:
+                result = {category: [engine.rules[i].vaccine for i in np.flatnonzero(mask[row])]
+                          for category, mask in masks.items()}
+                output.write(json.dumps({'information': int(ids[row]), **result}, ensure_ascii=False) + '\n')
@@ -0,0 +1,209 @@
+import json
+import random
+import secrets
+import time
+from datetime import time as clock, timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model, get_application_model
+
+from vaccine import geo
+from vaccine.models import Appointment, AppointmentDetail, CommunicationVaccination, CountryProduce, HealthCenter, \
+    Information, RoleEnum, StatusEnum, Time, User, Vaccine, VaccineType
+
+AccessToken = get_access_token_model()
+Application = get_application_model()
+
+PREFIX = 'bench'
+FIRST_NAMES = ['An', 'Bình', 'Chi', 'Dũng', 'Giang', 'Hà', 'Hùng', 'Lan', 'Minh', 'Nam', 'Ngọc', 'Phúc', 'Quân', 'Thảo', 'Vy']
+LAST_NAMES = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng']
+VACCINE_TYPES = ['Vắc-xin sống giảm độc lực', 'Vắc-xin bất hoạt', 'Vắc-xin tái tổ hợp', 'Vắc-xin kết hợp']
+COUNTRIES = ['Việt Nam', 'Bỉ', 'Pháp', 'Mỹ', 'Hàn Quốc', 'Ấn Độ']
+SLOTS = [(clock(7, 30), clock(9)), (clock(9), clock(10, 30)), (clock(13, 30), clock(15)), (clock(15), clock(16, 30))]
+
+
+class Command(BaseCommand):
+    help = 'Sinh dữ liệu giả lập (người dùng, hồ sơ, lịch hẹn, chiến dịch, vaccine) cho benchmark/load test'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Số bệnh nhân')
+        parser.add_argument('--staff', type=int, default=20)
+        parser.add_argument('--vaccines', type=int, default=60)
+        parser.add_argument('--centers', type=int, default=50)
+        parser.add_argument('--campaigns', type=int, default=200)
+        parser.add_argument('--appointments', type=int, default=3, help='Số lịch hẹn trung bình mỗi hồ sơ')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--password', default='bench-password', help='Mật khẩu chung của các tài khoản giả lập')
+        parser.add_argument('--tokens-out', help='Ghi access token của các tài khoản giả lập ra file JSON')
+        parser.add_argument('--clear', action='store_true', help='Xóa dữ liệu giả lập cũ trước khi sinh')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start = time.perf_counter()
+        if options['clear']:
+            self.clear()
+
+        with transaction.atomic():
+            types = self.get_or_create_named(VaccineType, VACCINE_TYPES)
+            countries = self.get_or_create_named(CountryProduce, COUNTRIES)
+            vaccines = self.create_vaccines(rng, options['vaccines'], types, countries)
+            centers = self.create_centers(rng, options['centers'])
+            times = [Time.objects.get_or_create(time_start=s, time_end=e)[0] for s, e in SLOTS]
+            campaigns = self.create_campaigns(rng, options['campaigns'])
+            password = make_password(options['password'])
+            patients = self.create_users(rng, options['users'], RoleEnum.PATIENT, password)
+            staff = self.create_users(rng, options['staff'], RoleEnum.STAFF, password, is_staff=True)
+            informations = self.create_informations(rng, patients)
+            appointments, details = self.create_appointments(rng, informations, centers, times, vaccines, options['appointments'])
+
+        self.stdout.write(
+            f"{len(patients)} bệnh nhân, {len(staff)} nhân viên, {len(informations)} hồ sơ, {appointments} lịch hẹn, "
+            f"{details} mũi tiêm, {len(vaccines)} vaccine, {len(centers)} trung tâm, {len(campaigns)} chiến dịch "
+            f"({time.perf_counter() - start:.1f}s)"
+        )
+        if options['tokens_out']:
+            self.write_tokens(options['tokens_out'], patients, staff, options['password'])
+
+    def clear(self):
+        Appointment.objects.filter(information__user__username__startswith=f'{PREFIX}-').delete()
+        User.objects.filter(username__startswith=f'{PREFIX}-').delete()
+        CommunicationVaccination.objects.filter(name__startswith=f'{PREFIX}-').delete()
+        HealthCenter.objects.filter(name__startswith=f'{PREFIX}-').delete()
+        Vaccine.objects.filter(name__startswith=f'{PREFIX}-').delete()
+
+    def get_or_create_named(self, model, names):
+        return [model.objects.get_or_create(name=name)[0] for name in names]
+
+    def create_vaccines(self, rng, count, types, countries):
+        # Real names from the chatbot data first, so searches hit familiar terms
+        try:
+            with open(settings.VACCINE_DATA_FILE, encoding='utf-8') as f:
+                known = list(json.load(f))
+        except (OSError, ValueError):
+            known = []
+        existing = set(Vaccine.objects.values_list('name', flat=True))
+        names = [name for name in known if name not in existing][:count]
+        names += [f'{PREFIX}-vaccine-{i}' for i in range(count - len(names))]
+        Vaccine.objects.bulk_create([
+            Vaccine(name=name, description=f'Vắc-xin {name} phòng bệnh', price=rng.randrange(100, 2000) * 1000,
+                    vaccine_type=rng.choice(types), country_produce=rng.choice(countries))
+            for name in names
+        ], batch_size=1000)
+        return list(Vaccine.objects.filter(active=True))
+
+    def create_centers(self, rng, count):
+        centers = []
+        for i in range(count):
+            lat, lon = rng.uniform(8.6, 23.3), rng.uniform(102.2, 109.4)
+            centers.append(HealthCenter(name=f'{PREFIX}-center-{i}-{secrets.token_hex(3)}', address=f'Số {i}, đường giả lập',
+                                        latitude=lat, longitude=lon, geohash=geo.encode(lat, lon)))
+        return HealthCenter.objects.bulk_create(centers, batch_size=1000)
+
+    def create_campaigns(self, rng, count):
+        today = timezone.localdate()
+        campaigns = []
+        for i in range(count):
+            slot_patient, slot_staff = rng.randrange(50, 500), rng.randrange(5, 30)
+            campaigns.append(CommunicationVaccination(
+                name=f'{PREFIX}-campaign-{i}-{secrets.token_hex(3)}', date=today + timedelta(days=rng.randrange(1, 90)),
+                address=f'Điểm tiêm {i}', description='Chiến dịch tiêm chủng giả lập',
+                slotPatient=slot_patient, slotStaff=slot_staff, emptyPatient=slot_patient, emptyStaff=slot_staff,
+            ))
+        return CommunicationVaccination.objects.bulk_create(campaigns, batch_size=1000)
+
+    def create_users(self, rng, count, role, password, is_staff=False):
+        run = secrets.token_hex(3)
+        users = [User(
+            username=f'{PREFIX}-{role}-{run}-{i}', email=f'{PREFIX}-{role}-{run}-{i}@example.com', password=password,
+            first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES), userRole=role, is_staff=is_staff,
+            phone_number=f'09{rng.randrange(10 ** 8):08d}',
+        ) for i in range(count)]
+        User.objects.bulk_create(users, batch_size=1000)
+        return list(User.objects.filter(username__startswith=f'{PREFIX}-{role}-{run}-').order_by('pk'))
+
+    def create_informations(self, rng, patients):
+        today = timezone.localdate()
+        informations = []
+        for user in patients:
+            for _ in range(rng.choice((1, 1, 2, 3))):
+                informations.append(Information(
+                    first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                    phone_number=user.phone_number, date_of_birth=today - timedelta(days=rng.randrange(0, 365 * 60)),
+                    sex=rng.random() < 0.5, address='Địa chỉ giả lập', email=user.email, user=user,
+                ))
+        Information.objects.bulk_create(informations, batch_size=2000)
+        return list(Information.objects.filter(user__username__startswith=patients[0].username.rsplit('-', 1)[0] + '-')
+                    .order_by('pk').only('id', 'date_of_birth')) if patients else []
+
+    def create_appointments(self, rng, informations, centers, times, vaccines, per_information):
+        today = timezone.localdate()
+        statuses = [StatusEnum.DA_HOAN_THANH] * 5 + [StatusEnum.DA_XAC_NHAN, StatusEnum.CHO_XAC_NHAN, StatusEnum.DA_HUY]
+        appointment_total = detail_total = 0
+        batch = []
+        # Explicit ids: MySQL does not return primary keys from bulk inserts
+        next_id = (Appointment.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+        def flush():
+            nonlocal appointment_total, detail_total
+            created = Appointment.objects.bulk_create([appointment for appointment, _ in batch])
+            details = [AppointmentDetail(appointment=appointment, vaccine=vaccine)
+                       for appointment, (_, chosen) in zip(created, batch) for vaccine in chosen]
+            AppointmentDetail.objects.bulk_create(details, batch_size=5000)
+            appointment_total += len(created)
+            detail_total += len(details)
+            batch.clear()
+
+        for information in informations:
+            for _ in range(rng.randrange(0, per_information * 2 + 1)):
+                day = max(information.date_of_birth, today - timedelta(days=730)) + timedelta(days=rng.randrange(0, 760))
+                status = rng.choice(statuses) if day <= today else rng.choice([StatusEnum.CHO_XAC_NHAN, StatusEnum.DA_XAC_NHAN])
+                appointment = Appointment(id=next_id, date=day, status=status, information=information,
+                                          health_centre=rng.choice(centers), time=rng.choice(times))
+                next_id += 1
+                batch.append((appointment, rng.sample(vaccines, rng.choice((1, 1, 2, 3)))))
+                if len(batch) >= 2000:
+                    flush()
+        if batch:
+            flush()
+        return appointment_total, detail_total
+
+    def write_tokens(self, path, patients, staff, password):
+        application, _ = Application.objects.get_or_create(
+            name=f'{PREFIX}-loadtest', defaults={
+                'client_type': Application.CLIENT_CONFIDENTIAL,
+                'authorization_grant_type': Application.GRANT_PASSWORD,
+            })
+        expires = timezone.now() + timedelta(days=7)
+        tokens = {}
+        for role, users in (('patient', patients), ('staff', staff)):
+            created = AccessToken.objects.bulk_create([
+                AccessToken(user=user, application=application, token=secrets.token_urlsafe(30),
+                            expires=expires, scope='read write')
+                for user in users
+            ], batch_size=1000)
+            tokens[role] = [{'user_id': token.user_id, 'username': user.username, 'token': token.token}
+                            for token, user in zip(created, users)]
+        informations = {}
+        for pk, user_id in Information.objects.filter(user_id__in=[user.pk for user in patients]).values_list('pk', 'user_id'):
+            informations.setdefault(user_id, []).append(pk)
+        for entry in tokens['patient']:
+            entry['informations'] = informations.get(entry['user_id'], [])
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'generated_at': timezone.now().isoformat(),
+                'password': password,
+                'tokens': tokens,
+                'vaccines': list(Vaccine.objects.filter(active=True).values_list('pk', flat=True)),
+                'vaccine_names': list(Vaccine.objects.filter(active=True).values_list('name', flat=True)),
+                'centers': list(HealthCenter.objects.filter(active=True).values_list('pk', flat=True)),
+                'times': list(Time.objects.filter(active=True).values_list('pk', flat=True)),
+                'campaigns': list(CommunicationVaccination.objects.filter(
+                    active=True, name__startswith=f'{PREFIX}-').values_list('pk', flat=True)),
+            }, f, ensure_ascii=False)
+        self.stdout.write(f"Đã ghi token vào {path}")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from vaccine import idempotency
+
+
+class Command(BaseCommand):
+    help = 'Xóa các Idempotency-Key đã hết hạn (IDEMPOTENCY_KEY_TTL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = idempotency.purge_expired(options['batch_size'])
+        self.stdout.write(f"Đã xóa {deleted} Idempotency-Key hết hạn")
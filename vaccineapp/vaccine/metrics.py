@@ -0,0 +1,197 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from vaccine.authentication import authenticate_plain_request
+from vaccine.models import RoleEnum
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+QUANTILES = (0.5, 0.95, 0.99)
+
+METRICS_ROUTE = 'metrics/'
+
+
+class Histogram:
+    # Cumulative-bucket histogram as Prometheus expects it. Quantiles are
+    # estimated by interpolating inside the bucket that holds the rank.
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, n in zip(self.bounds + (float('inf'),), self.counts):
+            total += n
+            yield bound, total
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for bound, n in zip(self.bounds, self.counts):
+            if seen + n >= rank:
+                return lower + (bound - lower) * ((rank - seen) / n if n else 0)
+            lower, seen = bound, seen + n
+        return self.bounds[-1]
+
+
+class EndpointStats:
+    __slots__ = ('latency', 'db_time', 'queries', 'size', 'statuses')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, view, method, status, latency, db_time, queries, size):
+        with self._lock:
+            stats = self._endpoints.get((view, method))
+            if stats is None:
+                stats = self._endpoints[(view, method)] = EndpointStats()
+            stats.latency.observe(latency)
+            stats.db_time.observe(db_time)
+            stats.queries.observe(queries)
+            stats.size.observe(size)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def render(self):
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = []
+            for name, help_text, attr in (
+                ('vaccine_http_request_duration_seconds', 'Request wall time by view', 'latency'),
+                ('vaccine_http_db_duration_seconds', 'Time spent in SQL per request by view', 'db_time'),
+                ('vaccine_http_db_queries', 'SQL queries per request by view', 'queries'),
+                ('vaccine_http_response_size_bytes', 'Response body size by view', 'size'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (view, method), stats in endpoints:
+                    histogram = getattr(stats, attr)
+                    labels = f'view="{escape(view)}",method="{method}"'
+                    for bound, total in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else repr(float(bound))
+                        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {total}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum!r}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+            name = 'vaccine_http_request_duration_quantile_seconds'
+            lines += [f'# HELP {name} Estimated request wall time quantiles by view', f'# TYPE {name} gauge']
+            for (view, method), stats in endpoints:
+                for q in QUANTILES:
+                    lines.append(f'{name}{{view="{escape(view)}",method="{method}",quantile="{q}"}} '
+                                 f'{stats.latency.quantile(q):.6f}')
+
+            name = 'vaccine_http_responses_total'
+            lines += [f'# HELP {name} Responses by view and status code', f'# TYPE {name} counter']
+            for (view, method), stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'{name}{{view="{escape(view)}",method="{method}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+class QueryTimer:
+    # Installed with connection.execute_wrapper: counts statements and adds up
+    # the time spent in the database driver.
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    # The route pattern keeps label cardinality bounded (no ids in it)
+    return match.route or match.view_name or 'unmatched'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        latency = time.perf_counter() - start
+
+        view = view_label(request)
+        if view != METRICS_ROUTE:
+            if response.streaming:
+                size = int(response.get('Content-Length') or 0)
+            else:
+                size = len(response.content)
+            registry.record(view, request.method, response.status_code, latency, timer.duration, timer.count, size)
+        return response
+
+
+def is_staff(user):
+    return user is not None and user.is_authenticated and (user.is_staff or user.userRole in (RoleEnum.STAFF, RoleEnum.ADMIN))
+
+
+def metrics_view(request):
+    # A scraper sending "Authorization: Bearer <METRICS_TOKEN>", staff admin
+    # sessions, or staff authenticated the way the API does (OAuth2/JWT bearer)
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and header.startswith('Bearer ') and constant_time_compare(header[7:], token):
+        authorized = True
+    else:
+        authorized = is_staff(request.user) or is_staff(authenticate_plain_request(request))
+    if not authorized:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccine', '0032_alter_appointment_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healthcenter',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='healthcenter',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='healthcenter',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='communicationvaccination',
+            name='time',
+            field=models.TimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccine', '0033_healthcenter_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoverageStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('computed_on', models.DateField(db_index=True)),
+                ('cohort_year', models.IntegerField()),
+                ('population', models.IntegerField()),
+                ('vaccinated', models.IntegerField()),
+                ('vaccinated_male', models.IntegerField(default=0)),
+                ('vaccinated_female', models.IntegerField(default=0)),
+                ('coverage', models.FloatField()),
+                ('health_center', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='coverage_stats', to='vaccine.healthcenter')),
+                ('vaccine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coverage_stats', to='vaccine.vaccine')),
+            ],
+            options={
+                'ordering': ['-computed_on', '-cohort_year', 'vaccine', 'health_center'],
+                'indexes': [models.Index(fields=['computed_on', 'cohort_year'], name='vaccine_cov_compute_a3a6ba_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccine', '0034_coveragestat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckIn',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('number', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('called', 'Called'), ('skipped', 'Skipped')], default='waiting', max_length=10)),
+                ('queued_at', models.DateTimeField()),
+                ('called_at', models.DateTimeField(blank=True, null=True)),
+                ('appointment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='check_in', to='vaccine.appointment')),
+                ('called_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='called_check_ins', to=settings.AUTH_USER_MODEL)),
+                ('health_centre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='check_ins', to='vaccine.healthcenter')),
+                ('time', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='check_ins', to='vaccine.time')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['health_centre', 'date', 'status', 'queued_at'], name='vaccine_che_health__da2a04_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-19 19:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccine', '0036_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('waited', 'Waited'), ('confirmed', 'Confirmed'), ('completed', 'Completed'), ('canceled', 'Canceled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('note', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('health_centre', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_appointments', to='vaccine.healthcenter')),
+                ('information', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_appointments', to='vaccine.information')),
+                ('time', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_appointments', to='vaccine.time')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedAppointmentDetail',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='appointment_details', to='vaccine.archivedappointment')),
+                ('vaccine', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_appointment_details', to='vaccine.vaccine')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['date', 'status'], name='vaccine_arc_date_bf76a0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['information', 'date'], name='vaccine_arc_informa_2566df_idx'),
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Time.time_start / time_end: free-text CharField -> TimeField. The values are
+# parsed into new columns, which then replace the old ones.
+
+import re
+from datetime import time
+
+from django.db import migrations, models
+
+# "7:30", "07:30:00", "7h30", "7h", "07.30", "1:30 PM", "1:30 CH"
+TIME_PATTERN = re.compile(r'^\s*(\d{1,2})\s*[:hH.]?\s*(\d{2})?(?:\s*[:.]\s*(\d{2}))?\s*(am|pm|sa|ch)?\s*$', re.IGNORECASE)
+
+
+def parse_time(value):
+    match = TIME_PATTERN.match(value or '')
+    if not match:
+        return None
+    hour, minute, second = int(match[1]), int(match[2] or 0), int(match[3] or 0)
+    suffix = (match[4] or '').lower()
+    if suffix in ('pm', 'ch') and hour < 12:
+        hour += 12
+    elif suffix in ('am', 'sa') and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    return time(hour, minute, second)
+
+
+def check_values(apps, schema_editor):
+    # Runs before any schema change, since MySQL can't roll back DDL
+    Time = apps.get_model('vaccine', 'Time')
+    invalid = []
+    for pk, start, end in Time.objects.values_list('pk', 'time_start', 'time_end'):
+        parsed_start, parsed_end = parse_time(start), parse_time(end)
+        if parsed_start is None or parsed_end is None or parsed_end <= parsed_start:
+            invalid.append(f"#{pk} '{start}' - '{end}'")
+    if invalid:
+        raise ValueError(f"Không chuyển được khung giờ, sửa dữ liệu rồi chạy lại: {', '.join(invalid)}")
+
+
+def to_time_fields(apps, schema_editor):
+    Time = apps.get_model('vaccine', 'Time')
+    for pk, start, end in Time.objects.values_list('pk', 'time_start', 'time_end'):
+        Time.objects.filter(pk=pk).update(time_start_value=parse_time(start), time_end_value=parse_time(end))
+
+
+def to_char_fields(apps, schema_editor):
+    Time = apps.get_model('vaccine', 'Time')
+    for slot in Time.objects.all():
+        Time.objects.filter(pk=slot.pk).update(time_start=slot.time_start_value.strftime('%H:%M'),
+                                               time_end=slot.time_end_value.strftime('%H:%M'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccine', '0037_archivedappointment'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_values, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='time',
+            name='time_start_value',
+            field=models.TimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='time',
+            name='time_end_value',
+            field=models.TimeField(null=True),
+        ),
+        # Nullable first, so that unapplying can add the text columns back
+        # empty and to_char_fields fills them
+        migrations.AlterField(
+            model_name='time',
+            name='time_start',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='time',
+            name='time_end',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.RunPython(to_time_fields, to_char_fields),
+        migrations.RemoveField(
+            model_name='time',
+            name='time_start',
+        ),
+        migrations.RemoveField(
+            model_name='time',
+            name='time_end',
+        ),
+        migrations.RenameField(
+            model_name='time',
+            old_name='time_start_value',
+            new_name='time_start',
+        ),
+        migrations.RenameField(
+            model_name='time',
+            old_name='time_end_value',
+            new_name='time_end',
+        ),
+        migrations.AlterField(
+            model_name='time',
+            name='time_start',
+            field=models.TimeField(),
+        ),
+        migrations.AlterField(
+            model_name='time',
+            name='time_end',
+            field=models.TimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='time',
+            index=models.Index(fields=['active', 'time_start', 'time_end'], name='vaccine_tim_active_879e4e_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='time',
+            constraint=models.CheckConstraint(condition=models.Q(('time_end__gt', models.F('time_start'))), name='time_end_after_start'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['health_centre', 'date', 'time'], name='vaccine_app_health__ee73bd_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccine', '0038_time_timefield'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='coveragestat',
+            old_name='vaccinated_male',
+            new_name='vaccinated_sex_true',
+        ),
+        migrations.RenameField(
+            model_name='coveragestat',
+            old_name='vaccinated_female',
+            new_name='vaccinated_sex_false',
+        ),
+    ]
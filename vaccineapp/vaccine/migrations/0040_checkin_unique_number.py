@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def renumber_duplicates(apps, schema_editor):
+    # Tickets handed out twice before the constraint existed: the later
+    # check-ins get new numbers after the day's last one
+    CheckIn = apps.get_model('vaccine', 'CheckIn')
+    duplicates = (CheckIn.objects.values('health_centre_id', 'date', 'number')
+                  .annotate(n=Count('id')).filter(n__gt=1))
+    for group in duplicates:
+        day = CheckIn.objects.filter(health_centre_id=group['health_centre_id'], date=group['date'])
+        last = day.aggregate(last=Max('number'))['last']
+        for offset, pk in enumerate(day.filter(number=group['number']).order_by('queued_at', 'id')
+                                    .values_list('pk', flat=True)[1:], start=1):
+            CheckIn.objects.filter(pk=pk).update(number=last + offset)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccine', '0039_coveragestat_sex_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='checkin',
+            constraint=models.UniqueConstraint(fields=('health_centre', 'date', 'number'), name='check_in_number_per_center_day'),
+        ),
+    ]
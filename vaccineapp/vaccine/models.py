@@ -1,7 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from cloudinary.models import CloudinaryField
 
+from vaccine import geo
+
 
 class RoleEnum(models.TextChoices):
     ADMIN = "admin", "Admin"
@@ -14,6 +17,11 @@ class StatusEnum(models.TextChoices):
     DA_HOAN_THANH = "completed", "Completed"
     DA_HUY = "canceled", "Canceled"
 
+class CheckInStatusEnum(models.TextChoices):
+    CHO_GOI = "waiting", "Waiting"
+    DA_GOI = "called", "Called"
+    BO_QUA = "skipped", "Skipped"
+
 class SexEnum(models.TextChoices):
     NAM = "male", "Male"
     NU = "female", "Female"
@@ -44,6 +52,13 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Loading one deferred field loads all of them (cached auth principals)
+        deferred_fields = self.get_deferred_fields()
+        if fields is not None and deferred_fields and set(fields) <= deferred_fields:
+            fields = deferred_fields
+        super().refresh_from_db(using, fields, from_queryset)
+
 
 class Information(models.Model):
     first_name = models.CharField(max_length=255)
@@ -61,6 +76,20 @@ class Information(models.Model):
 
 class HealthCenter(BaseModel):
     address = models.TextField()
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # Derived from the coordinates; nearest-center queries filter on its prefixes
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -92,13 +121,36 @@ class Vaccine(BaseModel):
         ordering = ['id']
 
 
+class TimeQuerySet(models.QuerySet):
+    # A slot is the interval [time_start, time_end) of a day; both filters are
+    # range conditions on the (active, time_start, time_end) index
+    def overlapping(self, start, end):
+        return self.filter(time_start__lt=end, time_end__gt=start)
+
+    def starting_from(self, moment):
+        return self.filter(time_start__gte=moment)
+
+
 class Time(models.Model):
-    time_start = models.CharField(max_length=255)
-    time_end = models.CharField(max_length=255)
+    time_start = models.TimeField()
+    time_end = models.TimeField()
     active = models.BooleanField(default=True)
 
+    objects = TimeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=['active', 'time_start', 'time_end'])]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(time_end__gt=models.F('time_start')), name='time_end_after_start'),
+        ]
+
+    @staticmethod
+    def format_time(value):
+        # Unsaved instances can still hold the 'HH:MM[:SS]' strings they were built with
+        return value.strftime('%H:%M') if hasattr(value, 'strftime') else str(value)[:5]
+
     def __str__(self):
-        return f"{self.time_start} - {self.time_end}"
+        return f"{self.format_time(self.time_start)} - {self.format_time(self.time_end)}"
 
 
 class Appointment(models.Model):
@@ -110,6 +162,10 @@ class Appointment(models.Model):
     health_centre = models.ForeignKey(HealthCenter, on_delete=models.SET_NULL, related_name="appointments", null=True)
     time = models.ForeignKey(Time, on_delete=models.SET_NULL, related_name="appointments", null=True)
 
+    class Meta:
+        # Bookings per center, day and slot (slot availability)
+        indexes = [models.Index(fields=['health_centre', 'date', 'time'])]
+
     def __str__(self):
         return f"Appointment for {self.information.user.username} on {self.date}"
 
@@ -122,6 +178,36 @@ class AppointmentDetail(models.Model):
         return f"{self.appointment} - Vaccine: {self.vaccine.name}"
 
 
+class ArchivedAppointment(models.Model):
+    # Completed/canceled appointments older than APPOINTMENT_ARCHIVE_AFTER_DAYS,
+    # moved out of Appointment by `manage.py archive_appointments` (vaccine.archive).
+    # Ids are kept, so an archived row reads like the live one it replaced.
+    id = models.BigIntegerField(primary_key=True)
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=StatusEnum.choices)
+    created_at = models.DateTimeField()
+    note = models.TextField(blank=True, null=True)
+    information = models.ForeignKey(Information, on_delete=models.SET_NULL, related_name="archived_appointments", null=True)
+    health_centre = models.ForeignKey(HealthCenter, on_delete=models.SET_NULL, related_name="archived_appointments", null=True)
+    time = models.ForeignKey(Time, on_delete=models.SET_NULL, related_name="archived_appointments", null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['date', 'status']), models.Index(fields=['information', 'date'])]
+
+    def __str__(self):
+        return f"Archived appointment {self.pk} on {self.date}"
+
+
+class ArchivedAppointmentDetail(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    appointment = models.ForeignKey(ArchivedAppointment, on_delete=models.CASCADE, related_name="appointment_details")
+    vaccine = models.ForeignKey(Vaccine, on_delete=models.SET_NULL, related_name="archived_appointment_details", null=True)
+
+    def __str__(self):
+        return f"{self.appointment} - Vaccine: {self.vaccine_id}"
+
+
 class CommunicationVaccination(BaseModel):
     date = models.DateField()
     time = models.TimeField(null=True)
@@ -137,6 +223,52 @@ class CommunicationVaccination(BaseModel):
         return self.name
 
 
+class CoverageStat(models.Model):
+    # Written by the compute_coverage_stats command; health_center None is the
+    # all-centers row. A patient's center is where their latest dose was given.
+    computed_on = models.DateField(db_index=True)
+    cohort_year = models.IntegerField()
+    vaccine = models.ForeignKey(Vaccine, on_delete=models.CASCADE, related_name="coverage_stats")
+    health_center = models.ForeignKey(HealthCenter, on_delete=models.CASCADE, related_name="coverage_stats", null=True, blank=True)
+    population = models.IntegerField()
+    vaccinated = models.IntegerField()
+    # Split by the stored Information.sex value: the project defines no
+    # male/female meaning for that boolean
+    vaccinated_sex_true = models.IntegerField(default=0)
+    vaccinated_sex_false = models.IntegerField(default=0)
+    coverage = models.FloatField()
+
+    class Meta:
+        ordering = ['-computed_on', '-cohort_year', 'vaccine', 'health_center']
+        indexes = [models.Index(fields=['computed_on', 'cohort_year'])]
+
+    def __str__(self):
+        return f"{self.cohort_year} - {self.vaccine_id} - {self.coverage}%"
+
+
+class CheckIn(models.Model):
+    # One row per checked-in appointment; the in-memory queue (vaccine.checkin)
+    # is rebuilt from the waiting rows after a restart.
+    appointment = models.OneToOneField(Appointment, on_delete=models.CASCADE, related_name="check_in")
+    health_centre = models.ForeignKey(HealthCenter, on_delete=models.CASCADE, related_name="check_ins")
+    time = models.ForeignKey(Time, on_delete=models.SET_NULL, related_name="check_ins", null=True)
+    date = models.DateField()
+    number = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=CheckInStatusEnum.choices, default=CheckInStatusEnum.CHO_GOI)
+    queued_at = models.DateTimeField()
+    called_at = models.DateTimeField(null=True, blank=True)
+    called_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="called_check_ins", null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['health_centre', 'date', 'status', 'queued_at'])]
+        constraints = [
+            models.UniqueConstraint(fields=['health_centre', 'date', 'number'], name='check_in_number_per_center_day'),
+        ]
+
+    def __str__(self):
+        return f"#{self.number} - {self.appointment_id}"
+
+
 class AttendantCommunication(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     communication = models.ForeignKey(CommunicationVaccination, on_delete=models.CASCADE)
@@ -150,6 +282,25 @@ class AttendantCommunication(models.Model):
     class Meta:
         unique_together = ('user', 'communication', 'registration_type')
 
+class IdempotencyRecord(models.Model):
+    # Stored outcome of a POST sent with an Idempotency-Key header
+    # (vaccine.idempotency). status_code is null while the first request is
+    # still running.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="idempotency_records")
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'scope', 'key')
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
+
 class New(BaseModel):
     imgNew = CloudinaryField('imgnew', null=True)
     createdAt = models.DateField(null=True)
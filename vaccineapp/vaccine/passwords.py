@@ -0,0 +1,37 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    # Bounded pool shared by the async callers: a burst of registrations queues
+    # here instead of running PASSWORD_HASHING_WORKERS+ key derivations at once.
+    # PBKDF2 (hashlib) and argon2 both release the GIL, so workers run in parallel.
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'PASSWORD_HASHING_WORKERS', 4),
+                    thread_name_prefix='password-hasher',
+                )
+    return _executor
+
+
+def hash_password(raw_password):
+    # Sync callers (RegisterViewSet, UserSerializer, the admin) hash on their
+    # own thread: waiting on the pool would keep that thread busy just the same
+    # and only add a hop
+    return make_password(raw_password)
+
+
+async def ahash_password(raw_password):
+    # The async register/ view: under ASGI the event loop keeps serving other
+    # requests while the pool hashes
+    return await asyncio.wrap_future(get_executor().submit(make_password, raw_password))
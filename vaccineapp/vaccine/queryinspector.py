@@ -0,0 +1,113 @@
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ORIGIN_FILES = ('views.py', 'serializers.py', 'admin.py')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    # Same statement with different values -> same shape
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def find_origin():
+    # Innermost frame of this app's views/serializers/admin on the current stack
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and os.path.basename(filename) in ORIGIN_FILES:
+            return f"{os.path.relpath(filename, os.path.dirname(APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start, find_origin()))
+
+
+class QueryReport:
+    def __init__(self, queries, repeat_threshold, slow_seconds):
+        self.count = len(queries)
+        self.duration = sum(duration for _, duration, _ in queries)
+        shapes = defaultdict(list)
+        for sql, duration, origin in queries:
+            shapes[normalize_sql(sql)].append((duration, origin))
+        # shape -> (count, total time, origins by frequency)
+        self.repeated = sorted(
+            ((shape, len(hits), sum(d for d, _ in hits), Counter(o for _, o in hits).most_common(3))
+             for shape, hits in shapes.items() if len(hits) >= repeat_threshold),
+            key=lambda item: -item[1],
+        )
+        self.slow = [(sql, duration, origin) for sql, duration, origin in queries if duration >= slow_seconds]
+        self.shapes = len(shapes)
+
+    @property
+    def has_issues(self):
+        return bool(self.repeated or self.slow)
+
+    def summary(self):
+        return (f"queries={self.count}; shapes={self.shapes}; time={self.duration * 1000:.1f}ms; "
+                f"repeated={len(self.repeated)}; slow={len(self.slow)}")
+
+    def lines(self):
+        for shape, count, duration, origins in self.repeated:
+            where = ', '.join(f"{origin or '?'} x{n}" for origin, n in origins)
+            yield f"  N+1? {count}x ({duration * 1000:.1f}ms) {shape[:300]} <- {where}"
+        for sql, duration, origin in self.slow:
+            yield f"  slow {duration * 1000:.1f}ms {sql[:300]} <- {origin or '?'}"
+
+
+class QueryInspectorMiddleware:
+    # Development/staging aid (QUERY_INSPECTOR_ENABLED): records every SQL
+    # statement of a request, groups them by shape and reports repeated shapes
+    # (likely N+1) and slow statements with the app frame that issued them.
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSPECTOR_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.repeat_threshold = getattr(settings, 'QUERY_INSPECTOR_REPEAT_THRESHOLD', 5)
+        self.slow_seconds = getattr(settings, 'QUERY_INSPECTOR_SLOW_MS', 100) / 1000
+        self.header = getattr(settings, 'QUERY_INSPECTOR_HEADER', True)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        report = QueryReport(recorder.queries, self.repeat_threshold, self.slow_seconds)
+        if self.header:
+            response['X-Query-Inspector'] = report.summary()
+        if report.has_issues:
+            logger.warning('\n'.join([f"{request.method} {request.path}: {report.summary()}", *report.lines()]))
+        else:
+            logger.debug(f"{request.method} {request.path}: {report.summary()}")
+        return response
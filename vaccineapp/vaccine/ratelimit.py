@@ -0,0 +1,231 @@
+import functools
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+
+def parse_rate(rate):
+    # '20/min' -> bucket of 20 tokens refilled at 20 per minute; a
+    # (rate, burst) pair sets the bucket size separately
+    rate, burst = rate if isinstance(rate, (tuple, list)) else (rate, None)
+    count, period = rate.split('/')
+    count = int(count)
+    return burst or count, count / PERIODS[period.strip()]
+
+
+class MemoryBackend:
+    # Buckets of this process only, least recently used dropped past
+    # RATE_LIMIT_MAX_KEYS so a flood of addresses can't grow it forever.
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = getattr(settings, 'RATE_LIMIT_MAX_KEYS', 100000)
+
+    def take(self, buckets):
+        # buckets: (key, capacity, refill) triples. Seconds to wait before all
+        # of them have a token; 0 means one was taken from each. A refused
+        # request takes nothing, so it doesn't drain the buckets it passed.
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, capacity, refill in buckets:
+                tokens, stamp = self._buckets.pop(key, (capacity, now))
+                levels.append((key, min(capacity, tokens + (now - stamp) * refill), refill))
+            wait = max(((1 - tokens) / refill for _, tokens, refill in levels if tokens < 1), default=0.0)
+            for key, tokens, _ in levels:
+                self._buckets[key] = (tokens if wait else tokens - 1, now)
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisBackend:
+    # Shared by all workers: all buckets of a request are checked and updated
+    # by one Lua script on the Redis clock. If Redis is unreachable requests are let through.
+    SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local refill = tonumber(ARGV[2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'stamp')
+    local tokens = tonumber(bucket[1]) or capacity
+    local stamp = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - stamp) * refill)
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / refill)
+    end
+    levels[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local refill = tonumber(ARGV[2 * i])
+    local tokens = levels[i]
+    if wait == 0 then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'stamp', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / refill * 1000) + 1000)
+end
+return tostring(wait)
+"""
+
+    def __init__(self):
+        import redis
+
+        self._client = redis.Redis.from_url(getattr(settings, 'RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0'))
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, buckets):
+        try:
+            return float(self._script(keys=[key for key, _, _ in buckets],
+                                      args=[value for _, capacity, refill in buckets for value in (capacity, refill)]))
+        except Exception as e:
+            logger.error(f"Không kiểm tra được giới hạn tần suất qua Redis: {e}")
+            return 0.0
+
+
+class Admission:
+    # Requests of one scope in flight in this worker process; past the limit
+    # new ones are turned away at once instead of queueing for a thread.
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.active -= 1
+
+
+_backend = None
+_admissions = {}
+_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = import_string(getattr(settings, 'RATE_LIMIT_BACKEND', 'vaccine.ratelimit.MemoryBackend'))()
+    return _backend
+
+
+def get_admission(scope, limit):
+    admission = _admissions.get(scope)
+    if admission is None or admission.limit != limit:
+        with _lock:
+            admission = _admissions.get(scope)
+            if admission is None or admission.limit != limit:
+                admission = _admissions[scope] = Admission(limit)
+    return admission
+
+
+def client_ip(request):
+    # With RATE_LIMIT_PROXY_COUNT proxies in front, the client is the address
+    # the outermost of them appended to X-Forwarded-For
+    proxies = getattr(settings, 'RATE_LIMIT_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',')]
+        return hops[-min(proxies, len(hops))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def bucket_keys(scope, config, request):
+    user = getattr(request, 'user', None)
+    if 'user' in config and user is not None and user.is_authenticated:
+        yield f'rl:{scope}:user:{user.pk}', config['user']
+    if 'ip' in config:
+        yield f'rl:{scope}:ip:{client_ip(request)}', config['ip']
+    if 'global' in config:
+        yield f'rl:{scope}:global', config['global']
+
+
+def check(scope, config, request):
+    buckets = [(key, *parse_rate(rate)) for key, rate in bucket_keys(scope, config, request)]
+    return get_backend().take(buckets) if buckets else 0.0
+
+
+def too_many(message, wait):
+    response = JsonResponse({'error': message}, status=429)
+    response['Retry-After'] = str(max(1, math.ceil(wait)))
+    return response
+
+
+def admit(scope, config, request):
+    # (refusal, admission to leave once the view has answered)
+    wait = check(scope, config, request)
+    if wait:
+        return too_many('Bạn gửi yêu cầu quá nhanh, vui lòng thử lại sau', wait), None
+    admission = get_admission(scope, config['concurrency']) if config.get('concurrency') else None
+    if admission is not None and not admission.enter():
+        return too_many('Hệ thống đang quá tải, vui lòng thử lại sau', 1), None
+    return None, admission
+
+
+def scope_config(scope):
+    if not getattr(settings, 'RATE_LIMIT_ENABLED', True):
+        return None
+    return getattr(settings, 'RATE_LIMITS', {}).get(scope)
+
+
+def rate_limit(scope):
+    # For view methods (Django View, async View or DRF action) whose scope is
+    # configured in RATE_LIMITS: token buckets per user, per client IP and for
+    # the whole scope, then a cap on concurrent requests. Both are checked
+    # before the view runs.
+    def decorator(view_method):
+        if iscoroutinefunction(view_method):
+            @functools.wraps(view_method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                config = scope_config(scope)
+                if not config:
+                    return await view_method(self, request, *args, **kwargs)
+                # The Redis backend does network I/O
+                refused, admission = await sync_to_async(admit)(scope, config, request)
+                if refused:
+                    return refused
+                try:
+                    return await view_method(self, request, *args, **kwargs)
+                finally:
+                    if admission is not None:
+                        admission.leave()
+            return async_wrapper
+
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            config = scope_config(scope)
+            if not config:
+                return view_method(self, request, *args, **kwargs)
+            refused, admission = admit(scope, config, request)
+            if refused:
+                return refused
+            try:
+                return view_method(self, request, *args, **kwargs)
+            finally:
+                if admission is not None:
+                    admission.leave()
+        return wrapper
+    return decorator
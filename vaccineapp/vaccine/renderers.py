@@ -0,0 +1,18 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+# Dates and times go to DRF's encoder (OPT_PASSTHROUGH_DATETIME) so they are
+# written exactly as before; orjson's own format differs (microseconds, "Z").
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class ORJSONRenderer(JSONRenderer):
+    # Same output as JSONRenderer (compact, UTF-8 unescaped), encoded by orjson.
+    # Types orjson doesn't know (Decimal, lazy strings, querysets, ...) fall back
+    # to DRF's encoder. Indented output is left to JSONRenderer.
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
@@ -0,0 +1,307 @@
+import json
+import logging
+import re
+import threading
+from collections import Counter, defaultdict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from vaccine import archive
+from vaccine.models import AppointmentDetail, Information, StatusEnum
+
+logger = logging.getLogger(__name__)
+
+# Recommended program, same milestones the chatbot answers with. A vaccine listed
+# at several milestones is a dose series (Infanrix Hexa at 2 and 6 months).
+VACCINATION_SCHEDULE = {
+    "trẻ sơ sinh": ["BCG", "Gene Hbvax A"],
+    "2 tháng": ["Infanrix Hexa", "Hexaxim", "Prevenar 13", "Rotateq"],
+    "6 tháng": ["Infanrix Hexa", "Hexaxim", "Vaxigrip Tetra", "Rotarix"],
+    "12 tháng": ["Varivax", "Prevenar 13", "MMR II"],
+    "người lớn": ["Vaxigrip Tetra", "Pneumovax 23", "Twinrix", "Gardasil A"],
+}
+
+# Products that are alternatives for the same series: a dose of any of them
+# counts toward the series (Hexaxim at 2 months, Infanrix Hexa at 6 months).
+EQUIVALENT_VACCINES = [
+    ("Infanrix Hexa", "Hexaxim"),
+    ("Rotateq", "Rotarix"),
+]
+
+UNIT_DAYS = {'ngày': 1, 'tuần': 7, 'tháng': 30.4375, 'tuổi': 365.25}
+ADULT_AGE_DAYS = round(18 * UNIT_DAYS['tuổi'])
+
+_UNIT = r'(ngày|tuần|tháng|tuổi)'
+_RANGE_RE = re.compile(r'(\d+)\s*' + _UNIT + r'?\s*-\s*(\d+)\s*' + _UNIT)
+_NEWBORN_RANGE_RE = re.compile(r'sơ sinh\s*-\s*(\d+)\s*' + _UNIT)
+_ABOVE_RE = re.compile(r'trên\s*(\d+)\s*' + _UNIT)
+_AGE_RE = re.compile(r'(\d+)\s*' + _UNIT)
+
+AgeInterval = namedtuple('AgeInterval', ['start_days', 'end_days'])
+DoseRule = namedtuple('DoseRule', ['vaccine', 'dose', 'start_days', 'end_days', 'series'])
+DueDose = namedtuple('DueDose', ['vaccine', 'dose', 'due_date', 'window_end'])
+
+CATEGORIES = ('due', 'overdue', 'upcoming', 'missed')
+
+
+def to_days(amount, unit):
+    return round(int(amount) * UNIT_DAYS[unit])
+
+
+def parse_age_range(text):
+    # "2-6 tháng", "6 tuần - 5 tuổi", "Sơ sinh - 1 tháng", "Trên 9 tháng", ...
+    # The upper bound covers the whole last unit: "9-45 tuổi" includes 45-year-olds.
+    # Returns None for ranges that are left to the doctor.
+    text = (text or '').strip().lower()
+    if not text or 'chỉ định' in text or 'không rõ' in text:
+        return None
+    if 'tất cả' in text or ('sơ sinh' in text and 'người lớn' in text):
+        return AgeInterval(0, None)
+    m = _NEWBORN_RANGE_RE.search(text)
+    if m:
+        return AgeInterval(0, to_days(int(m.group(1)) + 1, m.group(2)) - 1)
+    m = _RANGE_RE.search(text)
+    if m:
+        return AgeInterval(to_days(m.group(1), m.group(2) or m.group(4)), to_days(int(m.group(3)) + 1, m.group(4)) - 1)
+    m = _ABOVE_RE.search(text)
+    if m:
+        return AgeInterval(to_days(m.group(1), m.group(2)), None)
+    logger.warning(f"Unrecognized age range: {text}")
+    return None
+
+
+def milestone_days(label):
+    label = label.strip().lower()
+    if 'sơ sinh' in label:
+        return 0
+    if 'người lớn' in label:
+        return ADULT_AGE_DAYS
+    m = _AGE_RE.search(label)
+    return to_days(m.group(1), m.group(2)) if m else None
+
+
+def vaccine_key(name):
+    return (name or '').strip().lower()
+
+
+_SERIES = {vaccine_key(name): vaccine_key(group[0]) for group in EQUIVALENT_VACCINES for name in group}
+
+
+def series_key(name):
+    key = vaccine_key(name)
+    return _SERIES.get(key, key)
+
+
+class ScheduleEngine:
+    # Age ranges are parsed once into dose rules; evaluating a patient is then a
+    # walk over a few dozen integer comparisons.
+    def __init__(self, vaccine_data, milestones=VACCINATION_SCHEDULE, grace_days=30, upcoming_days=90):
+        self.grace_days = grace_days
+        self.upcoming_days = upcoming_days
+        intervals = {vaccine_key(name): parse_age_range(entry.get('age_range')) for name, entry in vaccine_data.items()}
+
+        doses = Counter()
+        starts = {}
+        rules = []
+        for label, vaccines in sorted(milestones.items(), key=lambda item: milestone_days(item[0])):
+            age = milestone_days(label)
+            # Alternatives listed at the same milestone are one dose of the series
+            products = defaultdict(list)
+            for vaccine in vaccines:
+                products[series_key(vaccine)].append(vaccine)
+            for series, names in products.items():
+                interval = self.series_interval([intervals.get(vaccine_key(name)) for name in names])
+                start = max(age, interval.start_days)
+                if interval.end_days is not None and start > interval.end_days:
+                    # The age range wins over the milestone (Rotarix ends at 24 weeks),
+                    # but a dose never opens before the previous one of its series
+                    logger.debug(f"Milestone {label} is outside the age range of {' / '.join(names)}")
+                    start = max(interval.start_days, starts.get(series, 0))
+                starts[series] = start
+                doses[series] += 1
+                rules.append(DoseRule(' / '.join(names), doses[series], start, interval.end_days, series))
+        self.rules = tuple(rules)
+        self.vaccines = tuple(dict.fromkeys(rule.series for rule in rules))
+
+    @staticmethod
+    def series_interval(intervals):
+        intervals = [interval or AgeInterval(0, None) for interval in intervals]
+        ends = [interval.end_days for interval in intervals]
+        return AgeInterval(min(interval.start_days for interval in intervals), None if None in ends else max(ends))
+
+    def classify(self, age_days, start_days, end_days):
+        if age_days < start_days:
+            return 'upcoming' if start_days - age_days <= self.upcoming_days else None
+        if end_days is not None and age_days > end_days:
+            return 'missed'
+        return 'due' if age_days - start_days <= self.grace_days else 'overdue'
+
+    def evaluate(self, date_of_birth, completed, today):
+        # completed maps series_key -> number of completed doses; only the next
+        # outstanding dose of each series is reported.
+        age = (today - date_of_birth).days
+        result = {category: [] for category in CATEGORIES}
+        for rule in self.rules:
+            if completed.get(rule.series, 0) != rule.dose - 1:
+                continue
+            category = self.classify(age, rule.start_days, rule.end_days)
+            if category:
+                window_end = date_of_birth + timedelta(days=rule.end_days) if rule.end_days is not None else None
+                result[category].append(DueDose(rule.vaccine, rule.dose, date_of_birth + timedelta(days=rule.start_days), window_end))
+        return result
+
+    def evaluate_batch(self, dates_of_birth, completed, today):
+        # dates_of_birth: datetime64[D] array (n,); completed: int array (n, len(self.vaccines)).
+        # Returns {category: bool array (n, len(self.rules))}.
+        import numpy as np
+
+        ages = (np.datetime64(today, 'D') - dates_of_birth).astype(np.int64)[:, None]
+        columns = [self.vaccines.index(rule.series) for rule in self.rules]
+        pending = completed[:, columns] == np.array([rule.dose - 1 for rule in self.rules])
+        start = np.array([rule.start_days for rule in self.rules])
+        end = np.array([rule.end_days if rule.end_days is not None else np.iinfo(np.int64).max for rule in self.rules])
+
+        started = ages >= start
+        open_window = pending & started & (ages <= end)
+        due = open_window & (ages - start <= self.grace_days)
+        return {
+            'due': due,
+            'overdue': open_window & ~due,
+            'upcoming': pending & ~started & (start - ages <= self.upcoming_days),
+            'missed': pending & (ages > end),
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                try:
+                    with open(settings.VACCINE_DATA_FILE, encoding='utf-8') as f:
+                        vaccine_data = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Error loading {settings.VACCINE_DATA_FILE}: {e}")
+                    vaccine_data = {}
+                _engine = ScheduleEngine(
+                    vaccine_data,
+                    grace_days=getattr(settings, 'VACCINE_SCHEDULE_GRACE_DAYS', 30),
+                    upcoming_days=getattr(settings, 'VACCINE_SCHEDULE_UPCOMING_DAYS', 90),
+                )
+    return _engine
+
+
+def cache_key(information_id):
+    # v2: completed doses are counted per series, not per product
+    return f'vaccine-schedule:v2:{information_id}'
+
+
+def completed_counts(**filters):
+    # Doses count over the whole history, archived appointments included
+    counts = defaultdict(Counter)
+    for model in archive.detail_models():
+        rows = (model.objects
+                .filter(appointment__status=StatusEnum.DA_HOAN_THANH, vaccine__isnull=False, **filters)
+                .values_list('appointment__information_id', 'vaccine__name')
+                .annotate(n=Count('id')))
+        for information_id, name, n in rows:
+            counts[information_id][series_key(name)] += n
+    return counts
+
+
+def serialize_result(result):
+    return {
+        category: [{
+            'vaccine': dose.vaccine,
+            'dose': dose.dose,
+            'due_date': dose.due_date.isoformat(),
+            'window_end': dose.window_end.isoformat() if dose.window_end else None,
+        } for dose in doses]
+        for category, doses in result.items()
+    }
+
+
+def store_schedule(information_id, state, today):
+    # The state (birth date + completed doses) is what is expensive to load; the
+    # result is recomputed from it when the date changes or a dose completes.
+    entry = {
+        'state': state,
+        'on': today.isoformat(),
+        'result': serialize_result(get_engine().evaluate(state['dob'], state['completed'], today)),
+    }
+    cache.set(cache_key(information_id), entry, getattr(settings, 'VACCINE_SCHEDULE_CACHE_TTL', 86400))
+    return entry
+
+
+def get_schedule(information, today=None):
+    today = today or timezone.localdate()
+    entry = cache.get(cache_key(information.pk))
+    if entry is None:
+        state = {'dob': information.date_of_birth, 'completed': dict(completed_counts(appointment__information_id=information.pk)[information.pk])}
+        entry = store_schedule(information.pk, state, today)
+    elif entry['on'] != today.isoformat():
+        entry = store_schedule(information.pk, entry['state'], today)
+    return entry['result']
+
+
+def record_completed(appointment_ids):
+    # Incremental update after appointments complete: patients with a cached
+    # state get the new doses added; the others are loaded on their next read.
+    rows = (AppointmentDetail.objects
+            .filter(appointment_id__in=appointment_ids, vaccine__isnull=False, appointment__information__isnull=False)
+            .values_list('appointment__information_id', 'vaccine__name'))
+    added = defaultdict(Counter)
+    for information_id, name in rows:
+        added[information_id][series_key(name)] += 1
+    if not added:
+        return
+    today = timezone.localdate()
+    entries = cache.get_many([cache_key(information_id) for information_id in added])
+    for information_id, doses in added.items():
+        entry = entries.get(cache_key(information_id))
+        if entry is None:
+            continue
+        completed = Counter(entry['state']['completed'])
+        completed.update(doses)
+        store_schedule(information_id, {'dob': entry['state']['dob'], 'completed': dict(completed)}, today)
+
+
+def invalidate(information_id):
+    if information_id is not None:
+        cache.delete(cache_key(information_id))
+
+
+def compute_all(today=None, batch_size=5000):
+    # Batch mode: yields (information_ids, dates_of_birth, completed, masks) per
+    # chunk of patients, masks being the evaluate_batch result for the chunk.
+    import numpy as np
+
+    engine = get_engine()
+    today = today or timezone.localdate()
+    column = {vaccine: i for i, vaccine in enumerate(engine.vaccines)}
+    queryset = Information.objects.order_by('pk').values_list('pk', 'date_of_birth')
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        ids = np.array([pk for pk, _ in chunk], dtype=np.int64)
+        dobs = np.array([dob for _, dob in chunk], dtype='datetime64[D]')
+        completed = np.zeros((len(chunk), len(engine.vaccines)), dtype=np.int32)
+        row = {pk: i for i, pk in enumerate(ids.tolist())}
+        counts_by_patient = completed_counts(appointment__information_id__gte=chunk[0][0],
+                                             appointment__information_id__lte=last_pk)
+        for information_id, counts in counts_by_patient.items():
+            for vaccine, n in counts.items():
+                if vaccine in column:
+                    completed[row[information_id], column[vaccine]] = n
+        yield ids, dobs, completed, engine.evaluate_batch(dobs, completed, today)
@@ -1,8 +1,31 @@
-from django.contrib.auth.hashers import make_password
-from vaccine.models import Vaccine, VaccineType, CommunicationVaccination, User, RoleEnum, CountryProduce, HealthCenter, \
+from vaccine.models import CheckIn, Vaccine, VaccineType, CommunicationVaccination, User, RoleEnum, CountryProduce, HealthCenter, \
     AppointmentDetail, Information, Appointment, New, Time, AttendantCommunication
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer, SerializerMethodField
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from vaccine import transitions
+from vaccine.passwords import hash_password
+from vaccine.uploads import image_url, image_variants
+
+
+class SparseFieldsetMixin:
+    # GET ?fields=id,name trims the listed objects to those fields, so mobile
+    # clients only download what they render. Only the top-level objects are
+    # trimmed; nested serializers are kept whole.
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET' or not request.query_params.get('fields'):
+            return fields
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        if parent is not None:
+            return fields
+
+        requested = {name.strip() for name in request.query_params['fields'].split(',') if name.strip()}
+        unknown = requested - fields.keys()
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Trường không hợp lệ: {', '.join(sorted(unknown))}"})
+        return {name: field for name, field in fields.items() if name in requested}
 
 
 class UserSerializer(ModelSerializer):
@@ -12,18 +35,20 @@ class UserSerializer(ModelSerializer):
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data['avatar'] = instance.avatarUrl.url if instance.avatarUrl else None
+        data['avatar'] = image_url(instance.avatarUrl)
+        data['avatarVariants'] = image_variants(instance.avatarUrl)
         return data
 
     def create(self, validated_data):
         data = validated_data.copy()
         u = User(**data)
-        u.set_password(u.password)
+        u.password = hash_password(u.password)
         u.save()
         return u
 
 class UserRegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
+    # Multipart avatars from old app versions; new clients use uploads/sign
     avatarUrl = serializers.ImageField(required=False, allow_null=True)
 
     class Meta:
@@ -31,12 +56,23 @@ class UserRegisterSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'password', 'phone_number', 'first_name', 'last_name', 'userRole', 'avatarUrl']
 
     def create(self, validated_data):
-        validated_data['password'] = make_password(validated_data['password'])
+        password_hash = validated_data.pop('password_hash', None)
+        validated_data['password'] = password_hash or hash_password(validated_data['password'])
         validated_data['userRole'] = RoleEnum.PATIENT
         user = User.objects.create(**validated_data)
         return user
 
-class VaccineTypeSerializer(serializers.ModelSerializer):
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['userRole'] = user.userRole
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        return token
+
+class VaccineTypeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = VaccineType
         fields = ['id', 'name']
@@ -46,7 +82,7 @@ class CountrySerializer(serializers.ModelSerializer):
         model = CountryProduce
         fields = ['id', 'name']
 
-class VaccineSerializer(ModelSerializer):
+class VaccineSerializer(SparseFieldsetMixin, ModelSerializer):
     vaccine_type = VaccineTypeSerializer(read_only=True)
     country_produce = CountrySerializer(read_only=True)
 
@@ -56,20 +92,25 @@ class VaccineSerializer(ModelSerializer):
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data['imgUrl'] = instance.imgUrl.url if instance.imgUrl else None
+        if 'imgUrl' in data:
+            data['imgUrl'] = image_url(instance.imgUrl)
+            data['imgVariants'] = image_variants(instance.imgUrl)
         return data
 
-class HealthCenterSerializer(serializers.ModelSerializer):
+class HealthCenterSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = HealthCenter
-        fields = ['id', 'name', 'address']
+        fields = ['id', 'name', 'address', 'latitude', 'longitude']
+
+class TimeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    time_start = serializers.TimeField(format='%H:%M')
+    time_end = serializers.TimeField(format='%H:%M')
 
-class TimeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Time
         fields = ['id', 'time_start', 'time_end']
 
-class InformationSerializer(serializers.ModelSerializer):
+class InformationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     date_of_birth = serializers.DateField(format="%d/%m/%Y", input_formats=["%d/%m/%Y"])
 
     class Meta:
@@ -89,7 +130,7 @@ class AppointmentDetailSerializer(serializers.ModelSerializer):
         model = AppointmentDetail
         fields = ['id', 'vaccine']
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     appointment_details = AppointmentDetailSerializer(many=True, required=False)
     information = serializers.PrimaryKeyRelatedField(queryset=Information.objects.all(), required=False)
     health_centre = serializers.PrimaryKeyRelatedField(queryset=HealthCenter.objects.all(), required=False)
@@ -101,6 +142,11 @@ class AppointmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'date', 'status', 'created_at', 'note', 'information', 'health_centre', 'time', 'appointment_details']
         read_only_fields = ['id', 'created_at']
 
+    def validate_status(self, value):
+        if self.instance is not None and not transitions.can_transition(self.instance.status, value):
+            raise serializers.ValidationError(f"Không thể chuyển từ {self.instance.status} sang {value}")
+        return value
+
     def create(self, validated_data):
         appointment_details_data = validated_data.pop('appointment_details', [])
         appointment = Appointment.objects.create(**validated_data)
@@ -109,18 +155,20 @@ class AppointmentSerializer(serializers.ModelSerializer):
         return appointment
 
 
-class CommunicationVaccinationSerializer(serializers.ModelSerializer):
+class CommunicationVaccinationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = CommunicationVaccination
         fields = ['id', 'name', 'date', 'time','address', 'description', 'slotPatient', 'slotStaff', 'emptyStaff', 'emptyPatient', 'imgUrl']
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data['imgUrl'] = instance.imgUrl.url if instance.imgUrl else None
+        if 'imgUrl' in data:
+            data['imgUrl'] = image_url(instance.imgUrl)
+            data['imgVariants'] = image_variants(instance.imgUrl)
         return data
 
 
-class AttendantCommunicationSerializer(serializers.ModelSerializer):
+class AttendantCommunicationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = AttendantCommunication
         fields = ['id', 'user', 'communication', 'quantity', 'registration_type']
@@ -132,7 +180,7 @@ class AppointmentDetailReadSerializer(serializers.ModelSerializer):
         model = AppointmentDetail
         fields = ['id', 'vaccine']
 
-class AppointmentReadSerializer(serializers.ModelSerializer):
+class AppointmentReadSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     appointment_details = AppointmentDetailReadSerializer(many=True, read_only=True)
     information = InformationSerializer(read_only=True)
     health_centre = HealthCenterSerializer(read_only=True)
@@ -141,4 +189,15 @@ class AppointmentReadSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = ['id', 'date', 'status', 'created_at', 'note', 'information', 'health_centre', 'time', 'appointment_details']
-        read_only_fields = ['id', 'created_at']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at']
+
+class CheckInSerializer(serializers.ModelSerializer):
+    patient = SerializerMethodField()
+
+    class Meta:
+        model = CheckIn
+        fields = ['id', 'number', 'status', 'appointment', 'health_centre', 'time', 'date', 'queued_at', 'called_at', 'patient']
+
+    def get_patient(self, obj):
+        information = obj.appointment.information
+        return f"{information.last_name} {information.first_name}" if information else None
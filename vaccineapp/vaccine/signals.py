@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from oauth2_provider.models import get_access_token_model
+
+from vaccine.authentication import mark_inactive, token_cache
+from vaccine import checkin, schedule, slotstream, transitions
+from vaccine.models import Appointment, AppointmentDetail, CommunicationVaccination, Information, StatusEnum, User
+
+AccessToken = get_access_token_model()
+
+
+@receiver(post_save, sender=AccessToken)
+@receiver(post_delete, sender=AccessToken)
+def invalidate_cached_token(sender, instance, created=False, **kwargs):
+    if not created:
+        token_cache.discard(instance.token)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, signal, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+    mark_inactive(instance.pk, signal is post_delete or not instance.is_active)
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_status(sender, instance, **kwargs):
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Appointment)
+def update_cached_schedule(sender, instance, **kwargs):
+    previous, instance._loaded_status = instance._loaded_status, instance.status
+    if instance.status == previous:
+        return
+    if instance.status == StatusEnum.DA_HOAN_THANH:
+        transaction.on_commit(lambda: schedule.record_completed([instance.pk]))
+    elif previous == StatusEnum.DA_HOAN_THANH:
+        schedule.invalidate(instance.information_id)
+    elif instance.status == StatusEnum.DA_HUY and previous is not None:
+        transaction.on_commit(lambda: checkin.get_queue().drop_appointments([instance.pk]))
+
+
+@receiver(transitions.appointments_transitioned)
+def update_schedules_for_transition(sender, target, moved, **kwargs):
+    if target == StatusEnum.DA_HOAN_THANH:
+        schedule.record_completed([m.id for m in moved])
+    for m in moved:
+        if m.previous == StatusEnum.DA_HOAN_THANH:
+            schedule.invalidate(m.information_id)
+
+
+@receiver(transitions.appointments_transitioned)
+def drop_canceled_check_ins(sender, target, moved, **kwargs):
+    if target == StatusEnum.DA_HUY:
+        checkin.get_queue().drop_appointments([m.id for m in moved])
+
+
+@receiver(post_delete, sender=Appointment)
+def invalidate_schedule_for_appointment(sender, instance, **kwargs):
+    schedule.invalidate(instance.information_id)
+
+
+@receiver(post_save, sender=AppointmentDetail)
+@receiver(post_delete, sender=AppointmentDetail)
+def invalidate_schedule_for_detail(sender, instance, created=False, **kwargs):
+    # New details on an open appointment are picked up when it completes
+    if AppointmentDetail.appointment.is_cached(instance):
+        appointment = {'status': instance.appointment.status, 'information_id': instance.appointment.information_id}
+    else:
+        appointment = Appointment.objects.filter(pk=instance.appointment_id).values('status', 'information_id').first()
+    if appointment and (not created or appointment['status'] == StatusEnum.DA_HOAN_THANH):
+        schedule.invalidate(appointment['information_id'])
+
+
+@receiver(post_save, sender=Information)
+@receiver(post_delete, sender=Information)
+def invalidate_schedule_for_information(sender, instance, **kwargs):
+    schedule.invalidate(instance.pk)
+
+
+@receiver(post_init, sender=CommunicationVaccination)
+def remember_campaign_slots(sender, instance, **kwargs):
+    instance._loaded_slots = tuple(instance.__dict__.get(field) for field in slotstream.SLOT_FIELDS)
+
+
+@receiver(post_save, sender=CommunicationVaccination)
+def publish_campaign_slots(sender, instance, **kwargs):
+    previous = instance._loaded_slots
+    instance._loaded_slots = tuple(getattr(instance, field) for field in slotstream.SLOT_FIELDS)
+    if instance._loaded_slots != previous:
+        transaction.on_commit(lambda: slotstream.publish_slots(instance))
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from vaccine.models import CommunicationVaccination
+
+logger = logging.getLogger(__name__)
+
+SLOT_FIELDS = ('emptyPatient', 'emptyStaff', 'slotPatient', 'slotStaff')
+ALL_CAMPAIGNS = 'campaigns'
+
+
+def running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class Subscription:
+    # One watcher. The queue is bounded; a slow client only needs the latest
+    # counts, so the oldest pending message is dropped when it fills up.
+    # loop is None for a watcher served under WSGI, which blocks in its own
+    # worker thread on a thread-safe queue.
+    def __init__(self, broker, topics, loop, maxsize):
+        self.broker = broker
+        self.topics = topics
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize) if loop is not None else queue.Queue(maxsize)
+
+    def deliver(self, message):
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except (asyncio.QueueEmpty, queue.Empty):
+                pass
+        try:
+            self.queue.put_nowait(message)
+        except (asyncio.QueueFull, queue.Full):
+            pass
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def get_blocking(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    # Fan-out to the watchers of this process. publish() is called from sync
+    # views in worker threads; delivery is handed to each watcher's event loop
+    # with one callback per loop, however many watchers it serves. WSGI
+    # watchers have no loop and are fed directly.
+    cross_process = False
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics, maxsize=None):
+        subscription = Subscription(self, list(topics), running_loop(),
+                                    maxsize or getattr(settings, 'SLOT_STREAM_QUEUE_SIZE', 100))
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def watchers(self):
+        with self._lock:
+            return len(set().union(*self._subscribers.values())) if self._subscribers else 0
+
+    def publish(self, topics, message):
+        self.deliver(topics, message)
+
+    def deliver(self, topics, message):
+        # A watcher of several of the topics still gets the message once
+        with self._lock:
+            subscribers = set().union(*(self._subscribers.get(topic, ()) for topic in topics))
+        by_loop = defaultdict(list)
+        for subscription in subscribers:
+            by_loop[subscription.loop].append(subscription)
+        for loop, group in by_loop.items():
+            if loop is None:
+                deliver_all(group, message)
+                continue
+            try:
+                loop.call_soon_threadsafe(deliver_all, group, message)
+            except RuntimeError:
+                # Loop already closed: its watchers are gone
+                for subscription in group:
+                    self.unsubscribe(subscription)
+
+
+def deliver_all(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+class RedisBroker(InProcessBroker):
+    # For several worker processes: publish() goes through a Redis channel and
+    # one listener thread per process feeds the local watchers.
+    cross_process = True
+
+    def __init__(self):
+        super().__init__()
+        import redis
+
+        self._client = redis.Redis.from_url(getattr(settings, 'SLOT_STREAM_REDIS_URL', 'redis://localhost:6379/0'))
+        self._channel = getattr(settings, 'SLOT_STREAM_REDIS_CHANNEL', 'vaccine:campaign-slots')
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, topics, message):
+        self._client.publish(self._channel, json.dumps({'topics': list(topics), 'message': message}))
+
+    def subscribe(self, topics, maxsize=None):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='slot-stream-redis', daemon=True)
+                self._listener.start()
+        return super().subscribe(topics, maxsize)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                for item in pubsub.listen():
+                    data = json.loads(item['data'])
+                    self.deliver(data['topics'], data['message'])
+            except Exception as e:
+                logger.error(f"Mất kết nối Redis của luồng sự kiện: {e}")
+                time.sleep(1)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'SLOT_STREAM_BROKER', 'vaccine.slotstream.InProcessBroker'))()
+    return _broker
+
+
+def check_broker():
+    # uvicorn and gunicorn take their worker count from WEB_CONCURRENCY; with
+    # several workers an in-process broker would leave the watchers of one
+    # worker blind to changes saved in the others
+    workers = int(os.environ.get('WEB_CONCURRENCY') or 1)
+    path = getattr(settings, 'SLOT_STREAM_BROKER', 'vaccine.slotstream.InProcessBroker')
+    if workers > 1 and not import_string(path).cross_process:
+        raise ImproperlyConfigured(f'{path} chỉ phục vụ một tiến trình; với WEB_CONCURRENCY={workers} '
+                                   f'hãy dùng SLOT_STREAM_BROKER=vaccine.slotstream.RedisBroker')
+
+
+def slot_message(values):
+    return {'id': values['id'], **{field: values[field] for field in SLOT_FIELDS}}
+
+
+def campaign_topic(pk):
+    return f'campaign:{pk}'
+
+
+def publish(topics, message):
+    try:
+        get_broker().publish(topics, message)
+    except Exception as e:
+        # Watchers catch up on their next reconnect; the write itself succeeded
+        logger.error(f"Không gửi được sự kiện tới {topics}: {e}")
+
+
+def publish_slots(communication):
+    message = slot_message({'id': communication.pk, **{field: getattr(communication, field) for field in SLOT_FIELDS}})
+    publish([campaign_topic(communication.pk), ALL_CAMPAIGNS], message)
+
+
+def current_slots(ids):
+    queryset = CommunicationVaccination.objects.filter(active=True)
+    if ids:
+        queryset = queryset.filter(pk__in=ids)
+    else:
+        queryset = queryset.filter(date__gte=timezone.localdate())
+    return [slot_message(values) for values in queryset.values('id', *SLOT_FIELDS)]
+
+
+def format_event(message, event='slots'):
+    return f"event: {event}\ndata: {json.dumps(message)}\n\n"
+
+
+def campaign_stream(ids, asynchronous=True):
+    topics = [campaign_topic(pk) for pk in ids] or [ALL_CAMPAIGNS]
+    return event_stream(topics, lambda: current_slots(ids), asynchronous=asynchronous)
+
+
+def event_stream(topics, snapshot, event='slots', asynchronous=True):
+    # Django buffers an async iterator completely when serving it under WSGI
+    # (and a sync one under ASGI), so the stream has to match the server. Under
+    # ASGI watchers wait on the event loop; under WSGI each watcher holds its
+    # worker thread for up to SLOT_STREAM_MAX_SECONDS, so size the thread pool
+    # for the expected watchers or run the ASGI application (vaccineapp/asgi.py).
+    if asynchronous:
+        return async_event_stream(topics, snapshot, event)
+    return sync_event_stream(topics, snapshot, event)
+
+
+async def async_event_stream(topics, snapshot, event):
+    # Subscribe before reading the snapshot so no change falls in between
+    subscription = get_broker().subscribe(topics)
+    heartbeat = getattr(settings, 'SLOT_STREAM_HEARTBEAT', 15)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + getattr(settings, 'SLOT_STREAM_MAX_SECONDS', 300)
+    try:
+        yield f"retry: {getattr(settings, 'SLOT_STREAM_RETRY_MS', 3000)}\n\n"
+        for message in await sync_to_async(snapshot)():
+            yield format_event(message, event)
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await subscription.get(min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield format_event(message, event)
+    finally:
+        subscription.close()
+
+
+def sync_event_stream(topics, snapshot, event):
+    subscription = get_broker().subscribe(topics)
+    heartbeat = getattr(settings, 'SLOT_STREAM_HEARTBEAT', 15)
+    deadline = time.monotonic() + getattr(settings, 'SLOT_STREAM_MAX_SECONDS', 300)
+    try:
+        yield f"retry: {getattr(settings, 'SLOT_STREAM_RETRY_MS', 3000)}\n\n"
+        for message in snapshot():
+            yield format_event(message, event)
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                message = subscription.get_blocking(min(heartbeat, remaining))
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            yield format_event(message, event)
+    finally:
+        subscription.close()
+
+
+def stream_response(stream):
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,41 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from vaccine import checkin, ratelimit
+from vaccine.authentication import token_cache
+from vaccine.models import Appointment, AppointmentDetail, Information, RoleEnum, StatusEnum, User, Vaccine
+
+
+def make_user(username, role=RoleEnum.PATIENT):
+    return User.objects.create(username=username, email=f'{username}@example.com', userRole=role)
+
+
+def make_information(user, date_of_birth=date(2020, 1, 1), sex=True):
+    return Information.objects.create(first_name='An', last_name='Nguyễn', phone_number='0900000000',
+                                      date_of_birth=date_of_birth, sex=sex, address='Hà Nội', user=user)
+
+
+def make_vaccine(name, **kwargs):
+    return Vaccine.objects.create(name=name, description=kwargs.pop('description', ''), price=kwargs.pop('price', 100000),
+                                  **kwargs)
+
+
+def make_appointment(information, status=StatusEnum.DA_XAC_NHAN, day=None, center=None, slot=None, vaccines=()):
+    appointment = Appointment.objects.create(information=information, status=status, date=day or timezone.localdate(),
+                                             health_centre=center, time=slot)
+    for vaccine in vaccines:
+        AppointmentDetail.objects.create(appointment=appointment, vaccine=vaccine)
+    return appointment
+
+
+class VaccineTestCase(APITestCase):
+    # Caches, rate-limit buckets and check-in queues live in the process and
+    # would otherwise carry over from one test to the next
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        ratelimit._backend = None
+        checkin._queue = None
@@ -0,0 +1,131 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from vaccine import archive
+from vaccine.models import Appointment, AppointmentDetail, ArchivedAppointment, StatusEnum
+from vaccine.tests.base import VaccineTestCase, make_appointment, make_information, make_user, make_vaccine
+
+
+class StatisticsTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        user = make_user('benh-nhan')
+        self.client.force_authenticate(user)
+        information = make_information(user)
+        vaccine = make_vaccine('BCG')
+        make_appointment(information, StatusEnum.DA_HOAN_THANH, date(2020, 3, 1), vaccines=[vaccine])
+        make_appointment(information, StatusEnum.DA_HOAN_THANH, date(2020, 2, 1), vaccines=[vaccine])
+        make_appointment(information, StatusEnum.DA_HUY, date(2020, 2, 2))
+        make_appointment(information, StatusEnum.DA_XAC_NHAN, date(2020, 4, 1))
+        archive.archive_batch(date(2020, 3, 1), 100)
+
+    def test_archived_appointments_are_counted(self):
+        self.assertEqual(ArchivedAppointment.objects.count(), 2)
+
+        self.assertEqual(self.client.get('/statistics/total-vaccinated/', {'year': 2020}).json(), {'total': 2})
+        self.assertEqual(self.client.get('/statistics/total-vaccinated/').json(), {'total': 2})
+        self.assertEqual(self.client.get('/statistics/completion-rate/', {'year': 2020}).json(), {'rate': 50.0})
+        self.assertEqual(self.client.get('/statistics/popular-vaccines/', {'year': 2020}).json(),
+                         [{'vaccine_name': 'BCG', 'count': 2}])
+
+    def test_period_filters_apply_to_both_tables(self):
+        response = self.client.get('/statistics/total-vaccinated/', {'year': 2020, 'month': 2})
+
+        self.assertEqual(response.json(), {'total': 1})
+
+
+@override_settings(APPOINTMENT_ARCHIVE_AFTER_DAYS=30)
+class ArchiveTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('benh-nhan')
+        self.information = make_information(self.user)
+        self.vaccine = make_vaccine('BCG')
+        today = timezone.localdate()
+        self.old_day = today - timedelta(days=60)
+        self.old_done = make_appointment(self.information, StatusEnum.DA_HOAN_THANH, self.old_day, vaccines=[self.vaccine])
+        self.old_open = make_appointment(self.information, StatusEnum.DA_XAC_NHAN, self.old_day)
+        self.recent_done = make_appointment(self.information, StatusEnum.DA_HOAN_THANH, today - timedelta(days=5))
+
+    def test_command_moves_finished_appointments_past_the_horizon(self):
+        detail = self.old_done.appointment_details.get()
+
+        call_command('archive_appointments', stdout=StringIO())
+
+        self.assertFalse(Appointment.objects.filter(pk=self.old_done.pk).exists())
+        archived = ArchivedAppointment.objects.get(pk=self.old_done.pk)
+        self.assertEqual((archived.date, archived.status, archived.information_id),
+                         (self.old_day, StatusEnum.DA_HOAN_THANH, self.information.pk))
+        self.assertEqual(list(archived.appointment_details.values_list('id', 'vaccine_id')), [(detail.pk, self.vaccine.pk)])
+        self.assertFalse(AppointmentDetail.objects.filter(pk=detail.pk).exists())
+        self.assertEqual(set(Appointment.objects.values_list('pk', flat=True)), {self.old_open.pk, self.recent_done.pk})
+
+    def test_dry_run_moves_nothing(self):
+        out = StringIO()
+        call_command('archive_appointments', '--dry-run', stdout=out)
+
+        self.assertIn('1 lịch hẹn', out.getvalue())
+        self.assertFalse(ArchivedAppointment.objects.exists())
+
+    def test_before_later_than_the_horizon_is_refused(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_appointments', '--before', timezone.localdate().isoformat(), stdout=StringIO())
+
+    def test_history_reads_the_archive_unless_the_range_is_recent(self):
+        call_command('archive_appointments', stdout=StringIO())
+        self.client.force_authenticate(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            recent = self.client.get('/appointments/', {'from': (timezone.localdate() - timedelta(days=10)).isoformat()})
+        older = self.client.get('/appointments/', {'from': (self.old_day - timedelta(days=1)).isoformat()})
+        everything = self.client.get('/appointments/all/')
+
+        self.assertEqual([a['id'] for a in recent.json()], [self.recent_done.pk])
+        self.assertFalse(any(ArchivedAppointment._meta.db_table in q['sql'] for q in queries.captured_queries))
+        all_ids = [self.old_done.pk, self.old_open.pk, self.recent_done.pk]
+        self.assertEqual([a['id'] for a in older.json()], all_ids)
+        self.assertEqual([a['id'] for a in everything.json()], all_ids)
+
+    def test_history_pages_are_opt_in_and_newest_first(self):
+        call_command('archive_appointments', stdout=StringIO())
+        for days in range(12):
+            make_appointment(self.information, StatusEnum.CHO_XAC_NHAN, timezone.localdate() + timedelta(days=days))
+        self.client.force_authenticate(self.user)
+        start = (self.old_day - timedelta(days=1)).isoformat()
+
+        first = self.client.get('/appointments/all/', {'from': start, 'page': 1}).json()
+        second = self.client.get('/appointments/all/', {'from': start, 'page': 2}).json()
+
+        self.assertEqual(first['count'], 15)
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(len(second['results']), 5)
+        dates = [a['date'] for a in first['results'] + second['results']]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+        self.assertEqual(second['results'][-1]['id'], self.old_done.pk)
+
+    def test_patients_only_see_their_own_history(self):
+        self.client.force_authenticate(make_user('nguoi-khac'))
+
+        self.assertEqual(self.client.get('/appointments/', {'from': '2000-01-01'}).json(), [])
+        self.assertEqual(self.client.get('/appointments/', {'page': 1}).json()['count'], 0)
+        self.assertEqual(self.client.get(f'/appointments/{self.old_done.pk}/').status_code, 404)
+
+    def test_archived_appointments_keep_their_detail_routes(self):
+        call_command('archive_appointments', stdout=StringIO())
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(f'/appointments/{self.old_done.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['id'], response.json()['status']), (self.old_done.pk, StatusEnum.DA_HOAN_THANH))
+        details = self.client.get(f'/appointments/{self.old_done.pk}/details/').json()
+        self.assertEqual([detail['vaccine']['id'] for detail in details], [self.vaccine.pk])
+        self.assertEqual(self.client.get(f'/appointments/{self.old_open.pk}/').status_code, 200)
+
+        self.client.force_authenticate(make_user('nguoi-khac'))
+        self.assertEqual(self.client.get(f'/appointments/{self.old_done.pk}/').status_code, 404)
@@ -0,0 +1,113 @@
+from datetime import time
+from unittest import mock
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from vaccine import checkin
+from vaccine.models import CheckIn, CheckInStatusEnum, HealthCenter, RoleEnum, StatusEnum, Time
+from vaccine.tests.base import VaccineTestCase, make_appointment, make_information, make_user
+
+
+class CheckInTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = make_user('nhan-vien', RoleEnum.STAFF)
+        self.client.force_authenticate(self.staff)
+        self.center = HealthCenter.objects.create(name='Trung tâm 1', address='Hà Nội')
+        self.slot = Time.objects.create(time_start=time(8), time_end=time(9))
+        self.information = make_information(make_user('benh-nhan'))
+
+    def appointment(self):
+        return make_appointment(self.information, StatusEnum.DA_XAC_NHAN, center=self.center, slot=self.slot)
+
+    def check_in(self, appointment):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/check-ins/', {'appointment': appointment.pk}, format='json')
+
+    def test_numbers_follow_arrival_order(self):
+        numbers = [self.check_in(self.appointment()).json()['number'] for _ in range(3)]
+
+        self.assertEqual(numbers, [1, 2, 3])
+        self.assertEqual(self.client.get('/check-ins/queue/', {'health_centre': self.center.pk}).json()['waiting'], 3)
+
+    def test_checking_in_twice_is_refused(self):
+        appointment = self.appointment()
+        self.check_in(appointment)
+
+        self.assertEqual(self.check_in(appointment).status_code, 400)
+
+    def test_number_taken_in_the_meantime_is_retried(self):
+        for _ in range(2):
+            self.check_in(self.appointment())
+        # The first read sees a stale maximum, as a desk racing another would
+        reads = iter([Min, Max])
+
+        with mock.patch('vaccine.checkin.Max', side_effect=lambda field: next(reads)(field)):
+            response = self.check_in(self.appointment())
+
+        self.assertEqual(response.json()['number'], 3)
+
+    def test_unique_number_per_center_and_day(self):
+        first = CheckIn.objects.get(pk=self.check_in(self.appointment()).json()['id'])
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CheckIn.objects.create(appointment=self.appointment(), health_centre=self.center, date=first.date,
+                                   number=first.number, queued_at=timezone.now())
+
+    def test_two_processes_never_call_the_same_patient(self):
+        for _ in range(2):
+            self.check_in(self.appointment())
+        desks = [checkin.CheckInQueue(30), checkin.CheckInQueue(30)]
+        for desk in desks:
+            desk.get(self.center.pk, timezone.localdate())
+
+        first = desks[0].call_next(self.center.pk, user=self.staff)
+        # The second process still has the first patient at the head of its
+        # queue; the guarded update refuses them and it moves on
+        second = desks[1].call_next(self.center.pk, user=self.staff)
+
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(set(CheckIn.objects.values_list('status', flat=True)), {CheckInStatusEnum.DA_GOI})
+        self.assertIsNone(desks[0].call_next(self.center.pk, user=self.staff))
+
+    def test_skipped_patient_goes_to_the_end_of_the_line(self):
+        first, second = self.appointment(), self.appointment()
+        skipped = self.check_in(first).json()['id']
+        self.check_in(second)
+        self.client.post(f'/check-ins/{skipped}/skip/')
+        self.check_in(first)
+
+        called = [self.client.post('/check-ins/call-next/', {'health_centre': self.center.pk}, format='json').json()
+                  for _ in range(2)]
+
+        self.assertEqual([c['appointment'] for c in called], [second.pk, first.pk])
+
+    def test_only_todays_confirmed_appointments(self):
+        appointment = make_appointment(self.information, StatusEnum.CHO_XAC_NHAN, center=self.center)
+
+        self.assertEqual(self.check_in(appointment).status_code, 400)
+
+    def test_check_ins_from_another_process_are_not_missed(self):
+        desks = [checkin.CheckInQueue(30), checkin.CheckInQueue(30)]
+        for desk in desks:
+            desk.get(self.center.pk, timezone.localdate())
+        with self.captureOnCommitCallbacks(execute=True):
+            checked_in = desks[0].check_in(self.appointment())
+
+        # The second process loaded its queue before the check-in and is not
+        # due for a resync yet
+        self.assertEqual(desks[1].summary(self.center.pk)['waiting'], 1)
+        self.assertEqual(desks[1].call_next(self.center.pk, self.slot.pk, user=self.staff).pk, checked_in.pk)
+        self.assertIsNone(desks[1].call_next(self.center.pk, user=self.staff))
+
+    def test_time_must_be_a_slot_id(self):
+        self.check_in(self.appointment())
+
+        response = self.client.post('/check-ins/call-next/', {'health_centre': self.center.pk, 'time': '08:00'},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/check-ins/call-next/', {'health_centre': self.center.pk, 'time': str(self.slot.pk)},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
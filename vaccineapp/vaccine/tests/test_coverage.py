@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from vaccine import archive
+from vaccine.models import CoverageStat, HealthCenter, StatusEnum
+from vaccine.tests.base import VaccineTestCase, make_appointment, make_information, make_user, make_vaccine
+
+
+class CoverageTests(VaccineTestCase):
+    @override_settings(APPOINTMENT_ARCHIVE_AFTER_DAYS=30)
+    def test_rollup_by_cohort_sex_and_home_center(self):
+        vaccine = make_vaccine('MMR II')
+        center_a = HealthCenter.objects.create(name='Trung tâm A', address='Hà Nội')
+        center_b = HealthCenter.objects.create(name='Trung tâm B', address='Hà Nội')
+        today = timezone.localdate()
+        twice = make_information(make_user('hai-mui'), date(2020, 5, 1), sex=True)
+        once = make_information(make_user('mot-mui'), date(2020, 8, 1), sex=False)
+        make_information(make_user('chua-tiem'), date(2020, 9, 1), sex=True)
+        canceled = make_information(make_user('da-huy'), date(2021, 1, 1), sex=False)
+        # The older dose ends up in the archive and still counts
+        make_appointment(twice, StatusEnum.DA_HOAN_THANH, today - timedelta(days=400), center_b, vaccines=[vaccine])
+        make_appointment(twice, StatusEnum.DA_HOAN_THANH, today - timedelta(days=10), center_a, vaccines=[vaccine])
+        make_appointment(once, StatusEnum.DA_HOAN_THANH, today - timedelta(days=10), center_b, vaccines=[vaccine])
+        make_appointment(canceled, StatusEnum.DA_HUY, today - timedelta(days=10), center_b, vaccines=[vaccine])
+        archive.archive_batch(archive.horizon(), 100)
+
+        call_command('compute_coverage_stats', stdout=StringIO())
+
+        overall = CoverageStat.objects.get(cohort_year=2020, vaccine=vaccine, health_center=None)
+        self.assertEqual((overall.population, overall.vaccinated, overall.coverage), (3, 2, 66.67))
+        self.assertEqual((overall.vaccinated_sex_true, overall.vaccinated_sex_false), (1, 1))
+        by_center = {row.health_center_id: (row.population, row.vaccinated)
+                     for row in CoverageStat.objects.filter(cohort_year=2020, health_center__isnull=False)}
+        self.assertEqual(by_center, {center_a.pk: (1, 1), center_b.pk: (1, 1)})
+        cohort_2021 = CoverageStat.objects.get(cohort_year=2021, vaccine=vaccine, health_center=None)
+        self.assertEqual((cohort_2021.population, cohort_2021.vaccinated), (1, 0))
+
+    def test_rerun_replaces_the_days_rows(self):
+        vaccine = make_vaccine('MMR II')
+        information = make_information(make_user('benh-nhan'))
+        make_appointment(information, StatusEnum.DA_HOAN_THANH, vaccines=[vaccine])
+
+        call_command('compute_coverage_stats', '--date', '2025-01-01', stdout=StringIO())
+        call_command('compute_coverage_stats', '--date', '2025-01-01', stdout=StringIO())
+
+        self.assertEqual(CoverageStat.objects.filter(computed_on=date(2025, 1, 1), health_center=None).count(), 1)
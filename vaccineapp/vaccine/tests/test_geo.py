@@ -0,0 +1,53 @@
+import random
+
+from vaccine import geo
+from vaccine.models import HealthCenter
+from vaccine.tests.base import VaccineTestCase
+
+
+class NearestCenterTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hoan_kiem = HealthCenter.objects.create(name='Hoàn Kiếm', address='Hà Nội', latitude=21.0285, longitude=105.8542)
+        self.cau_giay = HealthCenter.objects.create(name='Cầu Giấy', address='Hà Nội', latitude=21.0362, longitude=105.7906)
+        HealthCenter.objects.create(name='Quận 1', address='TP.HCM', latitude=10.7769, longitude=106.7009)
+        HealthCenter.objects.create(name='Chưa có toạ độ', address='Hà Nội')
+
+    def nearest(self, **params):
+        return self.client.get('/health-centers/nearest/', params)
+
+    def test_sorted_by_distance_within_radius(self):
+        response = self.nearest(lat=21.03, lon=105.85, radius=10)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['name'] for c in response.json()['results']], ['Hoàn Kiếm', 'Cầu Giấy'])
+        distances = [c['distance_km'] for c in response.json()['results']]
+        self.assertEqual(distances, sorted(distances))
+        self.assertEqual([c['name'] for c in self.nearest(lat=21.03, lon=105.85, radius=1).json()['results']],
+                         ['Hoàn Kiếm'])
+
+    def test_geohash_follows_the_coordinates(self):
+        self.assertEqual(self.hoan_kiem.geohash, geo.encode(21.0285, 105.8542))
+        self.cau_giay.latitude = None
+        self.cau_giay.save(update_fields=['latitude'])
+        self.cau_giay.refresh_from_db()
+        self.assertEqual(self.cau_giay.geohash, '')
+
+    def test_same_result_as_a_full_scan(self):
+        rng = random.Random(7)
+        for i in range(60):
+            HealthCenter.objects.create(name=f'Điểm {i}', address='Hà Nội',
+                                        latitude=21.0 + rng.uniform(-0.3, 0.3), longitude=105.8 + rng.uniform(-0.3, 0.3))
+        centers = HealthCenter.objects.exclude(latitude=None)
+
+        for lat, lon, radius in ((21.0, 105.8, 5), (21.1, 105.9, 12), (20.95, 105.7, 30)):
+            expected = sorted((geo.haversine_km(lat, lon, c.latitude, c.longitude), c.name) for c in centers)
+            expected = [name for distance, name in expected if distance <= radius]
+            response = self.nearest(lat=lat, lon=lon, radius=radius, limit=50).json()
+            self.assertEqual(response['count'], len(expected))
+            self.assertEqual([c['name'] for c in response['results']], expected[:50])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.nearest(lat=21.03).status_code, 400)
+        self.assertEqual(self.nearest(lat=91, lon=105.85).status_code, 400)
+        self.assertEqual(self.nearest(lat=21.03, lon=105.85, radius=0).status_code, 400)
@@ -0,0 +1,51 @@
+from django.utils import timezone
+
+from vaccine.models import AttendantCommunication, CommunicationVaccination
+from vaccine.tests.base import VaccineTestCase, make_user
+
+
+class IdempotencyTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('benh-nhan')
+        self.client.force_authenticate(self.user)
+        self.campaign = CommunicationVaccination.objects.create(
+            name='Chiến dịch sởi', date=timezone.localdate(), address='Hà Nội', description='',
+            slotPatient=10, emptyPatient=10, slotStaff=2, emptyStaff=2)
+
+    def register(self, key, quantity=2):
+        return self.client.post('/attendant-communications/register/',
+                                {'communication': self.campaign.pk, 'quantity': quantity},
+                                format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response_without_registering_again(self):
+        first = self.register('dang-ky-1')
+        second = self.register('dang-ky-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.emptyPatient, 8)
+        self.assertEqual(AttendantCommunication.objects.count(), 1)
+
+    def test_same_key_with_another_body_is_refused(self):
+        self.register('dang-ky-1')
+        response = self.register('dang-ky-1', quantity=3)
+
+        self.assertEqual(response.status_code, 422)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.emptyPatient, 8)
+
+    def test_error_response_is_replayed_too(self):
+        self.campaign.emptyPatient = 1
+        self.campaign.save()
+        first = self.register('dang-ky-1')
+        self.campaign.emptyPatient = 10
+        self.campaign.save()
+        second = self.register('dang-ky-1')
+
+        self.assertEqual(first.status_code, 400)
+        self.assertEqual(second.status_code, 400)
+        self.assertFalse(AttendantCommunication.objects.exists())
@@ -0,0 +1,49 @@
+from django.test import override_settings
+
+from vaccine import ratelimit
+from vaccine.tests.base import VaccineTestCase, make_user
+
+
+class RateLimitTests(VaccineTestCase):
+    @override_settings(RATE_LIMITS={'signup': {'ip': '2/min'}})
+    def test_bucket_returns_429_with_retry_after(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post('/register/', {}, format='json').status_code, 400)
+
+        response = self.client.post('/register/', {}, format='json')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    @override_settings(RATE_LIMITS={'signup': {'ip': '2/min'}})
+    def test_both_signup_endpoints_share_the_bucket(self):
+        self.assertEqual(self.client.post('/registers/', {}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/register/', {}, format='json').status_code, 400)
+
+        self.assertEqual(self.client.post('/registers/', {}, format='json').status_code, 429)
+        self.assertEqual(self.client.post('/register/', {}, format='json').status_code, 429)
+
+    @override_settings(RATE_LIMITS={'chat': {'user': '3/min', 'ip': '1/min'}})
+    def test_refused_request_keeps_the_user_tokens(self):
+        self.client.force_login(make_user('benh-nhan'))
+
+        def chat(address):
+            return self.client.post('/chat/', {}, format='json', REMOTE_ADDR=address).status_code
+
+        self.assertEqual(chat('10.0.0.1'), 400)
+        self.assertEqual(chat('10.0.0.1'), 429)
+        self.assertEqual(chat('10.0.0.2'), 400)
+        self.assertEqual(chat('10.0.0.3'), 400)
+        self.assertEqual(chat('10.0.0.4'), 429)
+
+    @override_settings(RATE_LIMITS={'signup': {'ip': '100/min', 'concurrency': 1}})
+    def test_concurrency_cap(self):
+        admission = ratelimit.get_admission('signup', 1)
+        self.assertTrue(admission.enter())
+        try:
+            response = self.client.post('/register/', {}, format='json')
+        finally:
+            admission.leave()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.client.post('/register/', {}, format='json').status_code, 400)
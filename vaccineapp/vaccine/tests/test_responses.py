@@ -0,0 +1,67 @@
+import gzip
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from vaccine.models import VaccineType
+from vaccine.renderers import ORJSONRenderer
+from vaccine.tests.base import VaccineTestCase, make_user, make_vaccine
+
+
+class SparseFieldsTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(make_user('benh-nhan'))
+        vaccine_type = VaccineType.objects.create(name='Phế cầu')
+        for i in range(12):
+            make_vaccine(f'Vaccine {i}', vaccine_type=vaccine_type, description='Mô tả chi tiết về vaccine. ' * 20)
+
+    def test_fields_trims_the_listed_objects(self):
+        response = self.client.get('/vaccines/', {'fields': 'id,name'})
+
+        self.assertEqual(response.json()['count'], 12)
+        self.assertEqual({frozenset(v) for v in response.json()['results']}, {frozenset({'id', 'name'})})
+
+    def test_nested_objects_are_kept_whole(self):
+        response = self.client.get('/vaccines/', {'fields': 'id,vaccine_type'})
+
+        self.assertEqual(response.json()['results'][0]['vaccine_type']['name'], 'Phế cầu')
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/vaccines/', {'fields': 'id,gia'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('gia', response.json()['fields'])
+
+
+class CompressionTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(make_user('benh-nhan'))
+        for i in range(12):
+            make_vaccine(f'Vaccine {i}', description='Mô tả chi tiết về vaccine. ' * 20)
+
+    def test_large_json_is_gzipped(self):
+        plain = self.client.get('/vaccines/')
+        response = self.client.get('/vaccines/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+
+    def test_small_or_unaccepted_responses_are_left_alone(self):
+        self.assertFalse(self.client.get('/vaccines/').has_header('Content-Encoding'))
+        small = self.client.get('/vaccines/', {'fields': 'id', 'page': 2}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+        refused = self.client.get('/vaccines/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(refused.has_header('Content-Encoding'))
+
+    def test_orjson_output_matches_drf(self):
+        data = {'price': Decimal('12.50'), 'at': datetime.fromisoformat('2025-01-02T03:04:05.123456+00:00'),
+                'day': date(2025, 1, 2), 'slot': time(7, 30), 'label': gettext_lazy('Tên'), 'name': 'Vắc-xin', 1: None}
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from vaccine import schedule, transitions
+from vaccine.models import StatusEnum
+from vaccine.schedule import DueDose, ScheduleEngine
+from vaccine.tests.base import VaccineTestCase, make_appointment, make_information, make_user, make_vaccine
+
+
+class ScheduleTests(VaccineTestCase):
+    vaccine_data = {'BCG': {'age_range': 'Sơ sinh - 1 tháng'}, 'Infanrix Hexa': {'age_range': '2-6 tháng'}}
+    milestones = {'trẻ sơ sinh': ['BCG'], '2 tháng': ['Infanrix Hexa'], '6 tháng': ['Infanrix Hexa']}
+
+    def setUp(self):
+        super().setUp()
+        self.engine = ScheduleEngine(self.vaccine_data, milestones=self.milestones)
+        self.dob = date(2024, 1, 1)
+
+    def test_next_outstanding_dose_per_vaccine(self):
+        result = self.engine.evaluate(self.dob, {}, self.dob + timedelta(days=70))
+
+        self.assertEqual([dose.vaccine for dose in result['missed']], ['BCG'])
+        self.assertEqual(result['due'], [DueDose('Infanrix Hexa', 1, self.dob + timedelta(days=61),
+                                                 self.dob + timedelta(days=212))])
+        self.assertEqual(result['upcoming'], [])
+
+    def test_completed_doses_move_to_the_next_one(self):
+        result = self.engine.evaluate(self.dob, {'bcg': 1, 'infanrix hexa': 1}, self.dob + timedelta(days=100))
+
+        self.assertEqual(result['missed'], [])
+        self.assertEqual(result['due'] + result['overdue'], [])
+        self.assertEqual([(dose.vaccine, dose.dose) for dose in result['upcoming']], [('Infanrix Hexa', 2)])
+
+    def test_batch_matches_single_evaluation(self):
+        today = date(2025, 6, 1)
+        dobs = [today - timedelta(days=days) for days in (5, 45, 70, 100, 190, 400)]
+        completed = np.array([[0, 0], [1, 0], [0, 1], [1, 1], [1, 1], [0, 2]], dtype=np.int32)
+
+        masks = self.engine.evaluate_batch(np.array(dobs, dtype='datetime64[D]'), completed, today)
+
+        for i, dob in enumerate(dobs):
+            counts = dict(zip(self.engine.vaccines, completed[i].tolist()))
+            result = self.engine.evaluate(dob, counts, today)
+            for category, doses in result.items():
+                expected = [(rule.vaccine, rule.dose) for rule, hit in zip(self.engine.rules, masks[category][i]) if hit]
+                self.assertEqual([(dose.vaccine, dose.dose) for dose in doses], expected)
+
+    def test_endpoint_follows_completed_doses(self):
+        user = make_user('benh-nhan')
+        self.client.force_authenticate(user)
+        information = make_information(user, date_of_birth=timezone.localdate() - timedelta(days=10))
+        appointment = make_appointment(information, StatusEnum.DA_XAC_NHAN, vaccines=[make_vaccine('BCG')])
+
+        def scheduled():
+            result = self.client.get(f'/informations/{information.pk}/schedule/').json()
+            return {dose['vaccine'] for category in ('due', 'overdue', 'upcoming', 'missed') for dose in result[category]}
+
+        self.assertIn('BCG', scheduled())
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.transition([appointment.pk], StatusEnum.DA_HOAN_THANH)
+        self.assertNotIn('BCG', scheduled())
+
+
+class EquivalentVaccineTests(VaccineTestCase):
+    vaccine_data = {'Infanrix Hexa': {'age_range': '2-6 tháng'}, 'Hexaxim': {'age_range': '2-6 tháng'},
+                    'Rotateq': {'age_range': '6 tuần - 32 tuần'}, 'Rotarix': {'age_range': '6 tuần - 24 tuần'}}
+    milestones = {'2 tháng': ['Infanrix Hexa', 'Hexaxim', 'Rotateq'], '6 tháng': ['Infanrix Hexa', 'Hexaxim', 'Rotarix']}
+
+    def setUp(self):
+        super().setUp()
+        self.engine = ScheduleEngine(self.vaccine_data, milestones=self.milestones)
+        today = timezone.localdate()
+        self.information = make_information(make_user('benh-nhan'), date_of_birth=today - timedelta(days=200))
+        hexaxim, rotarix = make_vaccine('Hexaxim'), make_vaccine('Rotarix')
+        make_appointment(self.information, StatusEnum.DA_HOAN_THANH, day=today - timedelta(days=130), vaccines=[hexaxim])
+        make_appointment(self.information, StatusEnum.DA_HOAN_THANH, day=today - timedelta(days=10),
+                         vaccines=[hexaxim, rotarix])
+
+    def test_alternatives_share_one_series(self):
+        self.assertEqual(self.engine.vaccines, ('infanrix hexa', 'rotateq'))
+        self.assertEqual([(rule.vaccine, rule.dose) for rule in self.engine.rules],
+                         [('Infanrix Hexa / Hexaxim', 1), ('Rotateq', 1), ('Infanrix Hexa / Hexaxim', 2), ('Rotarix', 2)])
+        # Rotarix's range ends before 6 months; its dose still opens no earlier than dose 1
+        self.assertEqual(self.engine.rules[3].start_days, self.engine.rules[1].start_days)
+
+    def test_doses_of_any_alternative_count_toward_the_series(self):
+        completed = schedule.completed_counts(appointment__information_id=self.information.pk)[self.information.pk]
+        self.assertEqual(dict(completed), {'infanrix hexa': 2, 'rotateq': 1})
+
+        result = self.engine.evaluate(self.information.date_of_birth, completed, timezone.localdate())
+
+        reported = [(dose.vaccine, dose.dose) for doses in result.values() for dose in doses]
+        self.assertEqual(reported, [('Rotarix', 2)])
+
+    def test_batch_totals_count_the_series(self):
+        self.addCleanup(setattr, schedule, '_engine', None)
+        schedule._engine = self.engine
+
+        (ids, dobs, completed, masks), = schedule.compute_all()
+
+        self.assertEqual(completed.tolist(), [[2, 1]])
+        flagged = [(rule.vaccine, rule.dose) for category in masks for rule, hit in zip(self.engine.rules, masks[category][0])
+                   if hit]
+        self.assertEqual(flagged, [('Rotarix', 2)])
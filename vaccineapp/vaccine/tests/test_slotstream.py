@@ -0,0 +1,61 @@
+import os
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from vaccine import slotstream
+from vaccine.models import CommunicationVaccination, RoleEnum
+from vaccine.tests.base import VaccineTestCase, make_user
+
+
+class CheckBrokerTests(SimpleTestCase):
+    def test_several_workers_need_a_cross_process_broker(self):
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '4'}):
+            with self.assertRaises(ImproperlyConfigured):
+                slotstream.check_broker()
+            with override_settings(SLOT_STREAM_BROKER='vaccine.slotstream.RedisBroker'):
+                slotstream.check_broker()
+
+    def test_a_single_worker_can_use_the_in_process_broker(self):
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '1'}):
+            slotstream.check_broker()
+
+
+class EmptySlotUpdateTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.campaign = CommunicationVaccination.objects.create(
+            name='Chiến dịch sởi', date=timezone.localdate(), address='Hà Nội', description='',
+            slotPatient=10, emptyPatient=10, slotStaff=2, emptyStaff=2)
+        self.users = {role: make_user(f'nguoi-dung-{role}', role) for role in (RoleEnum.PATIENT, RoleEnum.STAFF)}
+        self.subscription = slotstream.get_broker().subscribe([slotstream.campaign_topic(self.campaign.pk)])
+        self.addCleanup(self.subscription.close)
+
+    def update(self, role, url, data):
+        self.client.force_authenticate(self.users[role])
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(f'/communications/{self.campaign.pk}/{url}/', data, format='json')
+
+    def test_counts_are_saved_and_published_as_integers(self):
+        response = self.update(RoleEnum.PATIENT, 'update_empty_patient', {'emptyPatient': '7'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['emptyPatient'], 7)
+        self.assertEqual(self.subscription.get_blocking(1)['emptyPatient'], 7)
+
+        self.assertEqual(self.update(RoleEnum.STAFF, 'update-empty-staff', {'emptyStaff': 0}).status_code, 200)
+        self.assertEqual(self.subscription.get_blocking(1)['emptyStaff'], 0)
+
+    def test_invalid_counts_are_rejected(self):
+        for value in ['abc', -1, None, '1.5']:
+            with self.subTest(value=value):
+                response = self.update(RoleEnum.PATIENT, 'update_empty_patient', {'emptyPatient': value})
+                self.assertEqual(response.status_code, 400)
+                response = self.update(RoleEnum.STAFF, 'update-empty-staff', {'emptyStaff': value})
+                self.assertEqual(response.status_code, 400)
+
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.emptyPatient, self.campaign.emptyStaff), (10, 2))
+        self.assertTrue(self.subscription.queue.empty())
@@ -0,0 +1,110 @@
+from datetime import time, timedelta
+from importlib import import_module
+
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from vaccine.models import HealthCenter, StatusEnum, Time
+from vaccine.tests.base import VaccineTestCase, make_appointment, make_information, make_user
+
+
+class TimeSlotTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(make_user('benh-nhan'))
+        self.center = HealthCenter.objects.create(name='Trung tâm 1', address='Hà Nội')
+        self.early = Time.objects.create(time_start=time(7), time_end=time(8))
+        self.morning = Time.objects.create(time_start=time(8), time_end=time(9))
+        self.afternoon = Time.objects.create(time_start=time(13, 30), time_end=time(15))
+        Time.objects.create(time_start=time(9), time_end=time(10), active=False)
+
+    def starts(self, response):
+        return [slot['time_start'] for slot in response.json()]
+
+    def test_overlapping_is_a_range_query(self):
+        self.assertEqual(self.starts(self.client.get('/times/overlapping/', {'start': '07:30', 'end': '08:30'})),
+                         ['07:00', '08:00'])
+        # Intervals are half-open and inactive slots are left out
+        self.assertEqual(self.starts(self.client.get('/times/overlapping/', {'start': '09:00', 'end': '10:00'})), [])
+        self.assertEqual(self.client.get('/times/overlapping/', {'start': '10:00', 'end': '09:00'}).status_code, 400)
+
+    def test_list_is_ordered_by_start(self):
+        response = self.client.get('/times/')
+
+        self.assertEqual([slot['time_start'] for slot in response.json()['results']], ['07:00', '08:00', '13:30'])
+
+    @override_settings(TIME_SLOT_CAPACITY=1)
+    def test_next_available_skips_full_slots(self):
+        day = timezone.localdate() + timedelta(days=1)
+        information = make_information(make_user('nguoi-khac'))
+        make_appointment(information, StatusEnum.DA_XAC_NHAN, day, self.center, self.early)
+        make_appointment(information, StatusEnum.DA_HUY, day, self.center, self.morning)
+
+        response = self.client.get('/times/next-available/',
+                                   {'health_centre': self.center.pk, 'date': day.isoformat(), 'from': '07:00'})
+
+        self.assertEqual(response.json()['time_start'], '08:00')
+
+    def test_next_available_from_a_time_of_day(self):
+        response = self.client.get('/times/next-available/', {
+            'health_centre': self.center.pk, 'date': (timezone.localdate() + timedelta(days=1)).isoformat(),
+            'from': '08:01'})
+
+        self.assertEqual(response.json()['time_start'], '13:30')
+
+    def test_end_must_follow_start(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Time.objects.create(time_start=time(9), time_end=time(8))
+
+    def test_str_of_saved_and_unsaved_slots(self):
+        self.assertEqual(str(Time(time_start='07:30', time_end='09:00:00')), '07:30 - 09:00')
+        slot, _ = Time.objects.get_or_create(time_start=time(7, 30), time_end=time(9))
+        self.assertEqual(str(slot), '07:30 - 09:00')
+
+
+class TimeFieldMigrationTests(TransactionTestCase):
+    before = [('vaccine', '0037_archivedappointment')]
+    after = [('vaccine', '0038_time_timefield')]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        self.executor.loader.build_graph()
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def old_model(self):
+        return self.executor.loader.project_state(self.before).apps.get_model('vaccine', 'Time')
+
+    def test_text_slots_become_times(self):
+        OldTime = self.old_model()
+        OldTime.objects.create(time_start='7h30', time_end='8:15')
+        OldTime.objects.create(time_start='1:30 PM', time_end='14:00:00')
+
+        self.executor.migrate(self.after)
+
+        NewTime = self.executor.loader.project_state(self.after).apps.get_model('vaccine', 'Time')
+        self.assertEqual(list(NewTime.objects.order_by('pk').values_list('time_start', 'time_end')),
+                         [(time(7, 30), time(8, 15)), (time(13, 30), time(14))])
+
+    def test_unreadable_slot_stops_before_any_schema_change(self):
+        self.old_model().objects.create(time_start='sáng', time_end='9:00')
+
+        with self.assertRaises(ValueError):
+            self.executor.migrate(self.after)
+
+        self.assertEqual(list(self.old_model().objects.values_list('time_start', flat=True)), ['sáng'])
+        self.old_model().objects.all().delete()
+
+    def test_parse_time_formats(self):
+        parse_time = import_module('vaccine.migrations.0038_time_timefield').parse_time
+
+        self.assertEqual(parse_time('7h'), time(7))
+        self.assertEqual(parse_time('07.30'), time(7, 30))
+        self.assertEqual(parse_time('12:15 SA'), time(0, 15))
+        self.assertEqual(parse_time('1:30 CH'), time(13, 30))
+        self.assertIsNone(parse_time('25:00'))
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model
+from rest_framework.exceptions import AuthenticationFailed
+
+from vaccine.authentication import StatelessJWTAuthentication
+from vaccine.models import RoleEnum
+from vaccine.tests.base import VaccineTestCase, make_user
+
+
+class TokenCacheTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user('nhan-vien', RoleEnum.STAFF)
+        self.token = get_access_token_model().objects.create(
+            user=self.user, token='ma-truy-cap', expires=timezone.now() + timedelta(hours=1), scope='read write')
+
+    def current_user(self):
+        return self.client.get('/users/current-user/', HTTP_AUTHORIZATION='Bearer ma-truy-cap')
+
+    def test_cached_token_skips_the_token_lookup(self):
+        self.assertEqual(self.current_user().status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.current_user()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'nhan-vien')
+        table = get_access_token_model()._meta.db_table
+        self.assertFalse(any(table in q['sql'] for q in queries.captured_queries))
+
+    def test_revoked_token_is_refused_at_once(self):
+        self.assertEqual(self.current_user().status_code, 200)
+
+        self.token.delete()
+
+        self.assertEqual(self.current_user().status_code, 401)
+
+    def test_expired_token_is_refused(self):
+        self.assertEqual(self.current_user().status_code, 200)
+
+        self.token.expires = timezone.now() - timedelta(seconds=1)
+        self.token.save()
+
+        self.assertEqual(self.current_user().status_code, 401)
+
+    def test_role_change_applies_at_once(self):
+        self.assertEqual(self.current_user().json()['userRole'], RoleEnum.STAFF)
+
+        self.user.userRole = RoleEnum.PATIENT
+        self.user.save()
+
+        self.assertEqual(self.current_user().json()['userRole'], RoleEnum.PATIENT)
+
+    def test_stateless_jwt_of_a_deactivated_user_is_refused(self):
+        claims = {'user_id': self.user.pk, 'username': self.user.username, 'userRole': self.user.userRole}
+        authentication = StatelessJWTAuthentication()
+        self.assertEqual(authentication.get_user(claims).pk, self.user.pk)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            authentication.get_user(claims)
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(authentication.get_user(claims).pk, self.user.pk)
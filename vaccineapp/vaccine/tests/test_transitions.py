@@ -0,0 +1,86 @@
+from django.utils import timezone
+
+from vaccine import transitions
+from vaccine.models import Appointment, HealthCenter, RoleEnum, StatusEnum
+from vaccine.tests.base import VaccineTestCase, make_appointment, make_information, make_user
+
+
+class TransitionTests(VaccineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(make_user('nhan-vien', RoleEnum.STAFF))
+        self.information = make_information(make_user('benh-nhan'))
+        self.center = HealthCenter.objects.create(name='Trung tâm 1', address='Hà Nội')
+
+    def transition(self, **data):
+        return self.client.post('/appointments/transition/', data, format='json')
+
+    def test_wrong_source_status_updates_no_rows(self):
+        waiting = make_appointment(self.information, StatusEnum.CHO_XAC_NHAN)
+
+        response = self.transition(status=StatusEnum.DA_HOAN_THANH, expected=StatusEnum.DA_XAC_NHAN, ids=[waiting.pk])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], [])
+        self.assertIn(str(waiting.pk), response.json()['skipped'])
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.status, StatusEnum.CHO_XAC_NHAN)
+
+    def test_guarded_update_skips_a_row_that_moved_after_the_read(self):
+        appointment = make_appointment(self.information, StatusEnum.DA_XAC_NHAN)
+        update = Appointment.objects.filter(pk=appointment.pk, status=StatusEnum.DA_XAC_NHAN)
+        Appointment.objects.filter(pk=appointment.pk).update(status=StatusEnum.DA_HUY)
+
+        self.assertEqual(update.update(status=StatusEnum.DA_HOAN_THANH), 0)
+        result = transitions.transition([appointment.pk], StatusEnum.DA_HOAN_THANH)
+        self.assertEqual(result.updated, [])
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, StatusEnum.DA_HUY)
+
+    def test_mixed_batch_reports_every_skipped_id(self):
+        confirmed = make_appointment(self.information, StatusEnum.DA_XAC_NHAN)
+        completed = make_appointment(self.information, StatusEnum.DA_HOAN_THANH)
+        canceled = make_appointment(self.information, StatusEnum.DA_HUY)
+
+        response = self.transition(status=StatusEnum.DA_HOAN_THANH, ids=[confirmed.pk, completed.pk, canceled.pk, 999999])
+
+        self.assertEqual(response.json()['updated'], [confirmed.pk])
+        self.assertEqual(set(response.json()['skipped']), {str(completed.pk), str(canceled.pk), '999999'})
+        canceled.refresh_from_db()
+        self.assertEqual(canceled.status, StatusEnum.DA_HUY)
+
+    def test_whole_clinic_day(self):
+        today = timezone.localdate()
+        other_center = HealthCenter.objects.create(name='Trung tâm 2', address='Hà Nội')
+        due = [make_appointment(self.information, StatusEnum.DA_XAC_NHAN, today, self.center) for _ in range(3)]
+        waiting = make_appointment(self.information, StatusEnum.CHO_XAC_NHAN, today, self.center)
+        elsewhere = make_appointment(self.information, StatusEnum.DA_XAC_NHAN, today, other_center)
+
+        response = self.transition(status=StatusEnum.DA_HOAN_THANH, expected=StatusEnum.DA_XAC_NHAN,
+                                   date=today.isoformat(), health_centre=self.center.pk)
+
+        self.assertEqual(sorted(response.json()['updated']), [a.pk for a in due])
+        self.assertEqual(Appointment.objects.get(pk=waiting.pk).status, StatusEnum.CHO_XAC_NHAN)
+        self.assertEqual(Appointment.objects.get(pk=elsewhere.pk).status, StatusEnum.DA_XAC_NHAN)
+
+    def test_signal_is_sent_once_per_batch_after_commit(self):
+        appointments = [make_appointment(self.information, StatusEnum.DA_XAC_NHAN) for _ in range(3)]
+        received = []
+
+        def receiver(sender, target, moved, **kwargs):
+            received.append((target, sorted(m.id for m in moved)))
+
+        transitions.appointments_transitioned.connect(receiver)
+        self.addCleanup(transitions.appointments_transitioned.disconnect, receiver)
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.transition([a.pk for a in appointments], StatusEnum.DA_HOAN_THANH)
+            self.assertEqual(received, [])
+
+        self.assertEqual(received, [(StatusEnum.DA_HOAN_THANH, [a.pk for a in appointments])])
+
+    def test_unknown_expected_status_is_refused(self):
+        appointment = make_appointment(self.information, StatusEnum.DA_XAC_NHAN)
+
+        response = self.transition(status=StatusEnum.DA_XAC_NHAN, expected=StatusEnum.DA_HOAN_THANH, ids=[appointment.pk])
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,24 @@
+from vaccine.models import User
+from vaccine.tests.base import VaccineTestCase, make_user
+
+
+class MultipartCompatibilityTests(VaccineTestCase):
+    # Old app versions still send these endpoints multipart forms
+    def signup(self, path, username):
+        return self.client.post(path, {'username': username, 'password': 'mat-khau-123', 'email': f'{username}@example.com',
+                                       'first_name': 'An', 'last_name': 'Nguyễn'}, format='multipart')
+
+    def test_register_accepts_multipart(self):
+        self.assertEqual(self.signup('/registers/', 'benh-nhan-1').status_code, 201)
+        self.assertEqual(self.signup('/register/', 'benh-nhan-2').status_code, 201)
+        self.assertEqual(set(User.objects.values_list('username', flat=True)), {'benh-nhan-1', 'benh-nhan-2'})
+
+    def test_current_user_update_accepts_multipart(self):
+        user = make_user('benh-nhan')
+        self.client.force_authenticate(user)
+
+        response = self.client.put('/users/current-user/', {'first_name': 'Bình'}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(user.first_name, 'Bình')
@@ -0,0 +1,88 @@
+import logging
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.dispatch import Signal
+
+from vaccine.models import Appointment, StatusEnum
+
+logger = logging.getLogger(__name__)
+
+# Completed is final; a canceled appointment can be reopened
+ALLOWED_TRANSITIONS = {
+    StatusEnum.CHO_XAC_NHAN: {StatusEnum.DA_XAC_NHAN, StatusEnum.DA_HOAN_THANH, StatusEnum.DA_HUY},
+    StatusEnum.DA_XAC_NHAN: {StatusEnum.CHO_XAC_NHAN, StatusEnum.DA_HOAN_THANH, StatusEnum.DA_HUY},
+    StatusEnum.DA_HOAN_THANH: set(),
+    StatusEnum.DA_HUY: {StatusEnum.CHO_XAC_NHAN},
+}
+
+# Sent once per committed batch with target and moved=[(id, previous status,
+# information_id), ...]. Queryset updates skip post_save, so rollups and
+# notifications for bulk changes hang off this signal.
+appointments_transitioned = Signal()
+
+Moved = namedtuple('Moved', ['id', 'previous', 'information_id'])
+
+
+class TransitionResult:
+    def __init__(self, target):
+        self.target = target
+        self.updated = []
+        self.skipped = {}
+
+    def as_dict(self):
+        return {'status': self.target, 'updated': self.updated, 'skipped': self.skipped}
+
+
+def can_transition(previous, target):
+    return previous == target or target in ALLOWED_TRANSITIONS.get(previous, ())
+
+
+def sources_for(target):
+    return [source for source, targets in ALLOWED_TRANSITIONS.items() if target in targets]
+
+
+def transition(ids, target, expected=None, batch_size=500):
+    # Rows are locked per batch, then moved with one guarded UPDATE per source
+    # status; anything missing, already there or not allowed is reported back.
+    if target not in StatusEnum.values:
+        raise ValueError(f"Trạng thái không hợp lệ: {target}")
+    sources = sources_for(target)
+    if expected is not None:
+        if expected not in sources:
+            raise ValueError(f"Không thể chuyển từ {expected} sang {target}")
+        sources = [expected]
+
+    result = TransitionResult(target)
+    ids = list(dict.fromkeys(int(pk) for pk in ids))
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        with transaction.atomic():
+            rows = {pk: (status, information_id) for pk, status, information_id in
+                    Appointment.objects.select_for_update().filter(pk__in=batch)
+                    .values_list('pk', 'status', 'information_id')}
+            by_source = defaultdict(list)
+            for pk in batch:
+                if pk not in rows:
+                    result.skipped[pk] = 'Không tìm thấy lịch hẹn'
+                elif rows[pk][0] == target:
+                    result.skipped[pk] = 'Lịch hẹn đã ở trạng thái này'
+                elif rows[pk][0] not in sources:
+                    result.skipped[pk] = f"Không thể chuyển từ {rows[pk][0]} sang {target}"
+                else:
+                    by_source[rows[pk][0]].append(pk)
+
+            moved = []
+            for source, pks in by_source.items():
+                Appointment.objects.filter(pk__in=pks, status=source).update(status=target)
+                moved += [Moved(pk, source, rows[pk][1]) for pk in pks]
+            if moved:
+                result.updated += [m.id for m in moved]
+                transaction.on_commit(lambda moved=moved: send_transitioned(target, moved))
+    return result
+
+
+def send_transitioned(target, moved):
+    for receiver, response in appointments_transitioned.send_robust(Appointment, target=target, moved=moved):
+        if isinstance(response, Exception):
+            logger.error(f"Lỗi khi xử lý chuyển trạng thái lịch hẹn ({receiver.__name__}): {response}")
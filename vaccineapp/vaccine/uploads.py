@@ -0,0 +1,197 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import cloudinary
+import cloudinary.uploader
+import cloudinary.utils
+from cloudinary import CloudinaryImage, CloudinaryResource
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.module_loading import import_string
+
+from vaccine.models import CommunicationVaccination, New, User, Vaccine
+
+logger = logging.getLogger(__name__)
+
+UploadTarget = namedtuple('UploadTarget', ['model', 'field', 'folder', 'staff_only'])
+
+UPLOAD_TARGETS = {
+    'avatar': UploadTarget(User, 'avatarUrl', 'avatars', False),
+    'vaccine': UploadTarget(Vaccine, 'imgUrl', 'vaccines', True),
+    'communication': UploadTarget(CommunicationVaccination, 'imgUrl', 'communications', True),
+    'new': UploadTarget(New, 'imgNew', 'news', True),
+}
+
+ALLOWED_FORMATS = ('jpg', 'jpeg', 'png', 'webp')
+
+
+def make_public_id(target_name, object_id):
+    # The target and object are part of the id so a finished upload can only be
+    # attached to the object it was signed for.
+    return f"{UPLOAD_TARGETS[target_name].folder}/{target_name}-{object_id}-{uuid.uuid4().hex[:12]}"
+
+
+def public_id_prefix(target_name, object_id):
+    return f"{UPLOAD_TARGETS[target_name].folder}/{target_name}-{object_id}-"
+
+
+def variant_sizes():
+    return getattr(settings, 'IMAGE_VARIANT_SIZES', {'thumb': (150, 150), 'medium': (600, 600)})
+
+
+class CloudinaryUploadBackend:
+    # The client posts the file to Cloudinary with the signed fields; the server
+    # only checks Cloudinary's response signature and asks Cloudinary to build
+    # the variants, so image bytes never pass through Django.
+    def sign(self, public_id):
+        params = {
+            'timestamp': int(time.time()),
+            'public_id': public_id,
+            'allowed_formats': ','.join(ALLOWED_FORMATS),
+        }
+        params['signature'] = cloudinary.utils.api_sign_request(params, cloudinary.config().api_secret)
+        params['api_key'] = cloudinary.config().api_key
+        return cloudinary.utils.cloudinary_api_url('upload', resource_type='image'), params
+
+    def verify(self, public_id, version, signature):
+        try:
+            return cloudinary.utils.verify_api_response_signature(public_id, version, signature)
+        except Exception as e:
+            logger.warning(f"Upload signature check failed for {public_id}: {e}")
+            return False
+
+    def url(self, resource):
+        return resource.url
+
+    def variant_url(self, resource, size):
+        width, height = size
+        return CloudinaryImage(resource.public_id, version=resource.version, format=resource.format).build_url(
+            width=width, height=height, crop='fill', secure=True)
+
+    def make_variants(self, resource, sizes):
+        # Eager transformations run on Cloudinary; later variant URLs are cache hits
+        cloudinary.uploader.explicit(
+            resource.public_id, type='upload',
+            eager=[{'width': w, 'height': h, 'crop': 'fill'} for w, h in sizes.values()],
+            eager_async=True,
+        )
+
+
+class LocalUploadBackend:
+    # Filesystem stand-in for development and tests. The signed token is posted
+    # with the file to LocalUploadView, which answers like Cloudinary does.
+    salt = 'vaccine.uploads'
+
+    def __init__(self):
+        self.storage = FileSystemStorage(
+            location=getattr(settings, 'IMAGE_UPLOAD_ROOT', os.path.join(settings.BASE_DIR, 'media')),
+            base_url=getattr(settings, 'IMAGE_UPLOAD_URL', '/media/'),
+        )
+
+    def sign(self, public_id):
+        token = signing.dumps({'public_id': public_id}, salt=self.salt)
+        return reverse('local-upload'), {'token': token}
+
+    def unsign(self, token):
+        return signing.loads(token, salt=self.salt, max_age=getattr(settings, 'IMAGE_UPLOAD_EXPIRES', 600))['public_id']
+
+    def response_signature(self, public_id, version):
+        return salted_hmac(self.salt, f"{public_id}:{version}").hexdigest()
+
+    def verify(self, public_id, version, signature):
+        return constant_time_compare(self.response_signature(public_id, version), signature or '')
+
+    def save(self, public_id, file, file_format):
+        name = f"{public_id}.{file_format}"
+        if self.storage.exists(name):
+            self.storage.delete(name)
+        self.storage.save(name, file)
+        version = int(time.time())
+        return {
+            'public_id': public_id, 'version': version, 'format': file_format,
+            'signature': self.response_signature(public_id, version),
+        }
+
+    def url(self, resource):
+        return self.storage.url(f"{resource.public_id}.{resource.format}")
+
+    def variant_name(self, resource, size):
+        return f"{resource.public_id}_{size[0]}x{size[1]}.{resource.format}"
+
+    def variant_url(self, resource, size):
+        return self.storage.url(self.variant_name(resource, size))
+
+    def make_variants(self, resource, sizes):
+        from PIL import Image, ImageOps
+
+        with Image.open(self.storage.path(f"{resource.public_id}.{resource.format}")) as image:
+            for size in sizes.values():
+                variant = ImageOps.fit(image, size)
+                variant.save(self.storage.path(self.variant_name(resource, size)))
+
+
+_backend = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(getattr(settings, 'IMAGE_UPLOAD_BACKEND', 'vaccine.uploads.CloudinaryUploadBackend'))()
+    return _backend
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+                    thread_name_prefix='image-variants',
+                )
+    return _executor
+
+
+def _make_variants(resource):
+    try:
+        get_backend().make_variants(resource, variant_sizes())
+        logger.info(f"Generated image variants for {resource.public_id}")
+    except Exception as e:
+        logger.error(f"Error generating image variants for {resource.public_id}: {e}")
+
+
+def enqueue_variants(resource):
+    return get_executor().submit(_make_variants, resource)
+
+
+def image_url(resource):
+    if not resource or not isinstance(resource, CloudinaryResource):
+        return None
+    return get_backend().url(resource)
+
+
+def image_variants(resource):
+    if not resource or not isinstance(resource, CloudinaryResource):
+        return None
+    backend = get_backend()
+    return {name: backend.variant_url(resource, size) for name, size in variant_sizes().items()}
+
+
+def attach_upload(target_name, obj, public_id, version, file_format):
+    target = UPLOAD_TARGETS[target_name]
+    resource = CloudinaryResource(public_id, version=str(version), format=file_format, type='upload', resource_type='image')
+    setattr(obj, target.field, resource)
+    obj.save(update_fields=[target.field])
+    transaction.on_commit(lambda: enqueue_variants(resource))
+    return resource
@@ -1,8 +1,9 @@
 from django.urls import path, include
 from . import views
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
+from .metrics import metrics_view
 from .views import send_email, AttendantCommunicationViewSet, StatisticsViewSet
 
 
@@ -19,10 +20,17 @@ router.register('appointments',views.AppointmentViewSet, basename='appointment')
 router.register('communications',views.CommunicationVaccinationViewSet, basename='communication')
 router.register('attendant-communications', AttendantCommunicationViewSet, basename='attendant-communication')
 router.register('statistics', StatisticsViewSet, basename='statistics')
+router.register('uploads', views.UploadViewSet, basename='upload')
+router.register('check-ins', views.CheckInViewSet, basename='check-in')
 
 urlpatterns = [
+    path('uploads/local/', views.LocalUploadView.as_view(), name='local-upload'),
+    path('check-ins/stream/', views.CheckInStreamView.as_view(), name='check-in-stream'),
+    path('communications/slot-stream/', views.CampaignSlotStreamView.as_view(), name='communication-slot-stream'),
     path('', include(router.urls)),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', views.RoleTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('register/', views.AsyncRegisterView.as_view(), name='register'),
     path('send-email/', send_email, name='send_email'),
     path('chat/', views.ChatView.as_view(), name='chat'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,37 +1,58 @@
+import os
 import uuid
+from asgiref.sync import sync_to_async
 from threading import activeCount
+from django.core.handlers.asgi import ASGIRequest
 from django.core.mail import send_mail
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 import json
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
 from django.db.models import Count
 from rest_framework.filters import OrderingFilter
 from rest_framework.views import APIView
 from settings import IP_URL_VIEW
 from vaccine.models import *
-from vaccine import serializers, paginators, perms
+from vaccine import serializers, paginators, perms, geo, schedule as vaccine_schedule, slotstream, transitions, checkin, archive
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Q
-
+from django.db.models import IntegerField, Q, Value
+
+from vaccine.authentication import authenticate_plain_request, get_bearer_token, token_cache
+from vaccine.dbrouter import ReplicaReadMixin
+from vaccine.idempotency import idempotent
+from vaccine.ratelimit import rate_limit
+from vaccine.passwords import ahash_password
+from vaccine.uploads import ALLOWED_FORMATS, UPLOAD_TARGETS, LocalUploadBackend, attach_upload, get_backend, image_url, \
+    image_variants, make_public_id, public_id_prefix
 from vaccine.perms import IsOwner, IsPatient, IsStaff
 from vaccine.serializers import VaccineTypeSerializer, UserRegisterSerializer, InformationSerializer, AppointmentSerializer, AppointmentReadSerializer, AppointmentDetailReadSerializer, AttendantCommunicationSerializer, CommunicationVaccinationSerializer
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import viewsets, generics, permissions, parsers, status
+from oauth2_provider.models import get_access_token_model, get_refresh_token_model
+from rest_framework_simplejwt.views import TokenObtainPairView
 import requests
 import logging
-from datetime import datetime
+from collections import Counter
+from datetime import date, datetime
 
 logger = logging.getLogger(__name__)
 
+AccessToken = get_access_token_model()
+RefreshToken = get_refresh_token_model()
+
 
 class UserViewSet(viewsets.ViewSet, generics.CreateAPIView):
     queryset = User.objects.filter(is_active=True)
     serializer_class = serializers.UserSerializer
-    parser_classes = [parsers.MultiPartParser]
+    # New clients upload avatars straight to storage through uploads/sign;
+    # multipart stays accepted until the old app versions are retired
+    parser_classes = [parsers.JSONParser, parsers.FormParser, parsers.MultiPartParser]
 
     @action(methods=['GET', 'PUT'], url_path='current-user', detail=False, permission_classes=[IsAuthenticated, IsOwner])
     def current_user(self, request):
@@ -45,12 +66,28 @@ class UserViewSet(viewsets.ViewSet, generics.CreateAPIView):
                 return Response(serializer.data, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['post'], url_path='logout', detail=False, permission_classes=[IsAuthenticated])
+    def logout(self, request):
+        token = get_bearer_token(request)
+        if token:
+            for refresh_token in RefreshToken.objects.filter(access_token__token=token):
+                refresh_token.revoke()
+            AccessToken.objects.filter(token=token).delete()
+            token_cache.discard(token)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class RoleTokenObtainPairView(TokenObtainPairView):
+    serializer_class = serializers.RoleTokenObtainPairSerializer
+
 class RegisterViewSet(viewsets.ViewSet):
+    parser_classes = [parsers.JSONParser, parsers.FormParser, parsers.MultiPartParser]
+
     def get_permissions(self):
         if self.action == 'create':
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    @rate_limit('signup')
     def create(self, request):
         serializer = UserRegisterSerializer(data=request.data)
         if serializer.is_valid():
@@ -59,6 +96,94 @@ class RegisterViewSet(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncRegisterView(View):
+    # Same contract as RegisterViewSet.create, but the password is hashed in the
+    # bounded hashing pool while the worker keeps serving other requests.
+    @rate_limit('signup')
+    async def post(self, request):
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body)
+            except json.JSONDecodeError:
+                return JsonResponse({'error': 'Định dạng JSON không hợp lệ'}, status=400)
+        else:
+            data = request.POST.dict()
+            # Multipart avatars from old app versions; new clients use uploads/sign
+            data.update(request.FILES.dict())
+
+        serializer = UserRegisterSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=400)
+        password_hash = await ahash_password(serializer.validated_data['password'])
+        await sync_to_async(serializer.save)(password_hash=password_hash)
+        return JsonResponse({"message": "User registered successfully"}, status=201)
+
+
+class UploadViewSet(viewsets.ViewSet):
+    # Direct-to-storage uploads: sign/ returns the URL and signed fields the
+    # client posts the image to, complete/ attaches the stored image to the
+    # object once the storage response signature checks out.
+    permission_classes = [IsAuthenticated]
+
+    def get_target_object(self, request):
+        target_name = request.data.get('target')
+        target = UPLOAD_TARGETS.get(target_name)
+        if target is None:
+            return None, None, Response({'error': f"target phải là một trong: {', '.join(UPLOAD_TARGETS)}"},
+                                        status=status.HTTP_400_BAD_REQUEST)
+        if target_name == 'avatar':
+            return target_name, request.user, None
+        if not (request.user.is_staff or request.user.userRole in (RoleEnum.STAFF, RoleEnum.ADMIN)):
+            return None, None, Response({'error': 'Bạn không có quyền tải ảnh này lên'}, status=status.HTTP_403_FORBIDDEN)
+        obj = target.model.objects.filter(pk=request.data.get('object_id')).first()
+        if obj is None:
+            return None, None, Response({'error': 'Không tìm thấy đối tượng'}, status=status.HTTP_404_NOT_FOUND)
+        return target_name, obj, None
+
+    @action(methods=['post'], detail=False, url_path='sign')
+    def sign(self, request):
+        target_name, obj, error = self.get_target_object(request)
+        if error:
+            return error
+        public_id = make_public_id(target_name, obj.pk)
+        upload_url, fields = get_backend().sign(public_id)
+        return Response({'upload_url': request.build_absolute_uri(upload_url), 'fields': fields, 'public_id': public_id})
+
+    @action(methods=['post'], detail=False, url_path='complete')
+    def complete(self, request):
+        target_name, obj, error = self.get_target_object(request)
+        if error:
+            return error
+        public_id = request.data.get('public_id') or ''
+        version = request.data.get('version')
+        file_format = (request.data.get('format') or '').lower()
+        if not public_id.startswith(public_id_prefix(target_name, obj.pk)) or file_format not in ALLOWED_FORMATS:
+            return Response({'error': 'Ảnh tải lên không khớp với yêu cầu'}, status=status.HTTP_400_BAD_REQUEST)
+        if not get_backend().verify(public_id, version, request.data.get('signature')):
+            return Response({'error': 'Chữ ký tải lên không hợp lệ'}, status=status.HTTP_400_BAD_REQUEST)
+        resource = attach_upload(target_name, obj, public_id, version, file_format)
+        return Response({'url': image_url(resource), 'variants': image_variants(resource)})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LocalUploadView(View):
+    # Receiving end of LocalUploadBackend; with the Cloudinary backend this is never used.
+    def post(self, request):
+        backend = get_backend()
+        if not isinstance(backend, LocalUploadBackend):
+            return JsonResponse({'error': 'Not found'}, status=404)
+        try:
+            public_id = backend.unsign(request.POST.get('token', ''))
+        except Exception:
+            return JsonResponse({'error': 'Chữ ký tải lên không hợp lệ'}, status=400)
+        file = request.FILES.get('file')
+        file_format = os.path.splitext(file.name)[1].lstrip('.').lower() if file else ''
+        if file_format not in ALLOWED_FORMATS:
+            return JsonResponse({'error': 'Định dạng ảnh không hợp lệ'}, status=400)
+        return JsonResponse(backend.save(public_id, file, file_format))
+
+
 class UserProfileViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsOwner]
 
@@ -74,7 +199,7 @@ class UserProfileViewSet(viewsets.ViewSet):
         return Response(data)
 
 
-class VaccineViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIView):
+class VaccineViewSet(ReplicaReadMixin, viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIView):
     queryset = Vaccine.objects.filter(active=True).select_related('vaccine_type', 'country_produce')
     permission_classes = [IsAuthenticated, IsOwner]
     serializer_class = serializers.VaccineSerializer
@@ -100,25 +225,106 @@ class VaccineViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAP
         return Response(serializers.VaccineSerializer(vaccines, many=True).data, status=status.HTTP_200_OK)
 
 
-class VaccineTypeViewSet(viewsets.ViewSet, generics.ListAPIView):
+class VaccineTypeViewSet(ReplicaReadMixin, viewsets.ViewSet, generics.ListAPIView):
     queryset = VaccineType.objects.filter(active=True)
     permission_classes = [IsAuthenticated, IsOwner]
     serializer_class = VaccineTypeSerializer
 
 
-class HealthCenterViewSet(viewsets.ViewSet, generics.ListAPIView):
+class HealthCenterViewSet(ReplicaReadMixin, viewsets.ViewSet, generics.ListAPIView):
     queryset = HealthCenter.objects.filter(active=True)
     permission_classes = [IsAuthenticated, IsOwner]
     serializer_class = serializers.HealthCenterSerializer
     pagination_class = paginators.HealthCenterPagination
 
-
-class TimeViewSet(viewsets.ViewSet, generics.ListAPIView):
-    queryset = Time.objects.filter(active=True)
+    @action(methods=['get'], detail=False, url_path='nearest', permission_classes=[AllowAny])
+    def nearest(self, request):
+        try:
+            lat = float(request.query_params['lat'])
+            lon = float(request.query_params['lon'])
+            radius = min(float(request.query_params.get('radius', 10)), 200)
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except (KeyError, ValueError):
+            return Response({'error': 'Cần truyền lat, lon (số) và radius (km) hợp lệ'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or radius <= 0 or limit <= 0:
+            return Response({'error': 'Tọa độ hoặc bán kính không hợp lệ'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Only centers in the 3x3 geohash cells around the point are loaded
+        queryset = self.get_queryset().exclude(geohash='')
+        cells = geo.nearby_cells(lat, lon, radius)
+        if cells is not None:
+            cell_filter = Q()
+            for cell in cells:
+                cell_filter |= Q(geohash__startswith=cell)
+            queryset = queryset.filter(cell_filter)
+
+        centers = []
+        for center in queryset:
+            distance = geo.haversine_km(lat, lon, center.latitude, center.longitude)
+            if distance <= radius:
+                centers.append((distance, center))
+        centers.sort(key=lambda item: item[0])
+
+        results = []
+        for distance, center in centers[:limit]:
+            data = serializers.HealthCenterSerializer(center).data
+            data['distance_km'] = round(distance, 2)
+            results.append(data)
+        return Response({'count': len(centers), 'results': results})
+
+
+class TimeViewSet(ReplicaReadMixin, viewsets.ViewSet, generics.ListAPIView):
+    queryset = Time.objects.filter(active=True).order_by('time_start')
     permission_classes = [IsAuthenticated, IsOwner]
     serializer_class = serializers.TimeSerializer
     pagination_class = paginators.TimePagination
 
+    @staticmethod
+    def parse_time(value):
+        return datetime.strptime(value, '%H:%M').time()
+
+    @action(methods=['get'], detail=False, url_path='next-available')
+    def next_available(self, request):
+        # First slot of the day at a center that starts at or after ?from= (now,
+        # for today) and still has room under TIME_SLOT_CAPACITY
+        health_centre = request.query_params.get('health_centre')
+        if not health_centre:
+            return Response({'error': 'Cần health_centre'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            day = date.fromisoformat(request.query_params['date']) if request.query_params.get('date') \
+                else timezone.localdate()
+            start = request.query_params.get('from')
+            start = self.parse_time(start) if start else None
+        except ValueError:
+            return Response({'error': 'date phải có dạng YYYY-MM-DD, from có dạng HH:MM'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if start is None and day == timezone.localdate():
+            start = timezone.localtime().time()
+
+        slots = self.get_queryset()
+        if start is not None:
+            slots = slots.starting_from(start)
+        capacity = getattr(settings, 'TIME_SLOT_CAPACITY', None)
+        if capacity is not None:
+            booked = Count('appointments', filter=Q(appointments__health_centre_id=health_centre,
+                                                    appointments__date=day) & ~Q(appointments__status=StatusEnum.DA_HUY))
+            slots = slots.annotate(booked=booked).filter(booked__lt=capacity)
+        slot = slots.first()
+        if slot is None:
+            return Response({'error': 'Không còn khung giờ trống trong ngày'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.get_serializer(slot).data)
+
+    @action(methods=['get'], detail=False, url_path='overlapping')
+    def overlapping(self, request):
+        try:
+            start = self.parse_time(request.query_params.get('start', ''))
+            end = self.parse_time(request.query_params.get('end', ''))
+        except ValueError:
+            return Response({'error': 'start/end phải có dạng HH:MM'}, status=status.HTTP_400_BAD_REQUEST)
+        if end <= start:
+            return Response({'error': 'end phải sau start'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(self.get_queryset().overlapping(start, end), many=True).data)
+
 
 class InformationViewSet(viewsets.ViewSet,generics.ListAPIView,generics.RetrieveAPIView,generics.CreateAPIView,generics.UpdateAPIView):
     queryset = Information.objects.all()
@@ -155,6 +361,11 @@ class InformationViewSet(viewsets.ViewSet,generics.ListAPIView,generics.Retrieve
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(methods=['get'], detail=True, url_path='schedule')
+    def schedule(self, request, pk=None):
+        information = self.get_object()
+        return Response({'information': information.pk, **vaccine_schedule.get_schedule(information)})
+
     @action(methods=['delete'], detail=True, url_path='delete-info', permission_classes= [IsPatient])
     def delete_info(self, request, pk=None):
         instance = self.get_object()
@@ -162,12 +373,16 @@ class InformationViewSet(viewsets.ViewSet,generics.ListAPIView,generics.Retrieve
         return Response({"message": "Thông tin đã được xóa thành công."}, status=status.HTTP_204_NO_CONTENT)
 
 
-class AppointmentViewSet(viewsets.ViewSet,generics.ListAPIView,generics.RetrieveAPIView,generics.CreateAPIView,generics.UpdateAPIView):
+class AppointmentViewSet(ReplicaReadMixin, viewsets.ViewSet,generics.ListAPIView,generics.RetrieveAPIView,generics.CreateAPIView,generics.UpdateAPIView):
     queryset = Appointment.objects.select_related('information', 'health_centre', 'time').prefetch_related('appointment_details__vaccine')
     permission_classes = [IsAuthenticated]
+    pagination_class = paginators.AppointmentPagination
 
     def get_queryset(self):
-        queryset = Appointment.objects.select_related('information', 'health_centre', 'time').prefetch_related('appointment_details__vaccine')
+        return self.filter_history(Appointment.objects.select_related('information', 'health_centre', 'time').prefetch_related('appointment_details__vaccine'))
+
+    def filter_history(self, queryset):
+        # Shared by the live and the archived appointments
         if self.request.user.userRole == "staff":
             return queryset
 
@@ -189,24 +404,126 @@ class AppointmentViewSet(viewsets.ViewSet,generics.ListAPIView,generics.Retrieve
 
         return queryset.filter(information__user=self.request.user)
 
+    def archived_queryset(self):
+        return self.filter_history(ArchivedAppointment.objects.select_related('information', 'health_centre', 'time')
+                                   .prefetch_related('appointment_details__vaccine'))
+
+    def history(self, serializer_class):
+        # ?from=/?to= bound the appointment date. Archived appointments are
+        # read when the range starts before the archive horizon or has no start.
+        # ?page= opts in to pages of AppointmentPagination, newest first;
+        # without it the response is the plain list in id order, as before
+        # (archived rows keep their ids).
+        try:
+            start, end = (datetime.strptime(value, '%Y-%m-%d').date() if value else None
+                          for value in (self.request.query_params.get('from'), self.request.query_params.get('to')))
+        except ValueError:
+            return Response({'error': 'from/to phải có dạng YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        querysets = [self.get_queryset()]
+        if archive.needs_archive(start):
+            querysets.append(self.archived_queryset())
+        if start:
+            querysets = [queryset.filter(date__gte=start) for queryset in querysets]
+        if end:
+            querysets = [queryset.filter(date__lte=end) for queryset in querysets]
+        context = self.get_serializer_context()
+        if self.paginator.page_query_param not in self.request.query_params:
+            appointments = sorted((row for queryset in querysets for row in queryset), key=lambda row: row.pk)
+            return Response(serializer_class(appointments, many=True, context=context).data)
+
+        # Page over (date, id, table) keys of both tables, newest first, then
+        # load only the rows of that page
+        keys = [queryset.values_list('date', 'id', Value(table, output_field=IntegerField()))
+                for table, queryset in enumerate(querysets)]
+        keys = keys[0].union(*keys[1:], all=True) if len(keys) > 1 else keys[0]
+        page = self.paginate_queryset(keys.order_by('-date', '-id'))
+        rows = {}
+        for table, queryset in enumerate(querysets):
+            ids = [pk for _, pk, source in page if source == table]
+            if ids:
+                rows.update(((table, row.pk), row) for row in queryset.filter(pk__in=ids))
+        appointments = [rows[source, pk] for _, pk, source in page]
+        return self.get_paginated_response(serializer_class(appointments, many=True, context=context).data)
+
+    def get_history_object(self):
+        # Read-only detail routes also find appointments moved to the archive
+        try:
+            return self.get_object()
+        except Http404:
+            appointment = get_object_or_404(self.archived_queryset(), pk=self.kwargs['pk'])
+            self.check_object_permissions(self.request, appointment)
+            return appointment
+
+    def list(self, request, *args, **kwargs):
+        return self.history(self.get_serializer_class())
+
+    def retrieve(self, request, *args, **kwargs):
+        appointment = self.get_history_object()
+        return Response(self.get_serializer(appointment).data)
+
     @action(methods=['get'], detail=False, url_path='all', permission_classes=[IsOwner])
     def list_appointments(self, request):
-        appointments = self.get_queryset()
-        return Response(AppointmentReadSerializer(appointments, many=True).data)
+        return self.history(AppointmentReadSerializer)
+
+    @rate_limit('booking')
+    @idempotent('appointments')
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
     @action(methods=['post'], detail=False, url_path='create-appointment', permission_classes= [IsPatient, IsOwner])
+    @rate_limit('booking')
+    @idempotent('create-appointment')
     def create_appointment(self, request):
         serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         return Response(AppointmentReadSerializer(serializer.save()).data, status=status.HTTP_201_CREATED)
 
-    @action(methods=['patch'], detail=True, url_path='update-appointment', permission_classes= [IsStaff, IsOwner])
+    @action(methods=['patch'], detail=True, url_path='update-appointment', permission_classes=[IsStaff])
     def update_appointment(self, request, pk=None):
-        appointments = self.get_object().appointment_set.filter(active=True)
-        return Response(AppointmentSerializer(appointments, many=True).data)
+        appointment = self.get_object()
+        try:
+            result = transitions.transition([appointment.pk], request.data.get('status'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if appointment.pk in result.skipped:
+            return Response({'error': result.skipped[appointment.pk]}, status=status.HTTP_400_BAD_REQUEST)
+        appointment.refresh_from_db(fields=['status'])
+        return Response(AppointmentReadSerializer(appointment).data)
+
+    @action(methods=['post'], detail=False, url_path='transition', permission_classes=[IsStaff])
+    def bulk_transition(self, request):
+        # {"status": "completed", "expected": "confirmed", "ids": [...]} or, for a
+        # whole clinic day, "date" (+ optional "health_centre") instead of ids
+        target = request.data.get('status')
+        expected = request.data.get('expected')
+        ids = request.data.get('ids')
+        if ids is None:
+            day = request.data.get('date')
+            if not day:
+                return Response({'error': 'Cần ids hoặc date'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                queryset = Appointment.objects.filter(date=datetime.strptime(day, '%Y-%m-%d').date())
+            except ValueError:
+                return Response({'error': 'date phải có dạng YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+            if request.data.get('health_centre'):
+                queryset = queryset.filter(health_centre_id=request.data['health_centre'])
+            if expected:
+                queryset = queryset.filter(status=expected)
+            ids = list(queryset.values_list('pk', flat=True))
+        else:
+            try:
+                ids = [int(pk) for pk in ids]
+            except (TypeError, ValueError):
+                return Response({'error': 'ids phải là danh sách mã lịch hẹn'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = transitions.transition(ids, target, expected=expected)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict())
 
     @action(methods=['get'], detail=True, url_path='details')
     def get_appointment_details(self, request, pk=None):
-        details = AppointmentDetail.objects.filter(appointment=self.get_object()).select_related('vaccine')
+        details = self.get_history_object().appointment_details.select_related('vaccine')
         return Response(AppointmentDetailReadSerializer(details, many=True).data)
 
 
@@ -241,7 +558,7 @@ def send_email(request):
     return JsonResponse({'error': 'Invalid method'}, status=405)
 
 
-class CommunicationVaccinationViewSet(viewsets.ViewSet,generics.ListAPIView,generics.RetrieveAPIView,generics.CreateAPIView,generics.UpdateAPIView):
+class CommunicationVaccinationViewSet(ReplicaReadMixin, viewsets.ViewSet,generics.ListAPIView,generics.RetrieveAPIView,generics.CreateAPIView,generics.UpdateAPIView):
     queryset = CommunicationVaccination.objects.filter(active=True)
     serializer_class = CommunicationVaccinationSerializer
     permission_classes = [IsAuthenticated, IsOwner]
@@ -253,10 +570,21 @@ class CommunicationVaccinationViewSet(viewsets.ViewSet,generics.ListAPIView,gene
             queryset = queryset.filter(Q(name__icontains=q) | Q(address__icontains=q))
         return queryset
 
+    @staticmethod
+    def parse_count(value):
+        # The counters are saved and published to the slot stream as they are
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return None
+        return value if value >= 0 else None
+
     @action(methods=['patch'], detail=True, permission_classes=[IsPatient])
     def update_empty_patient(self, request, pk=None):
             communication = self.get_object()
-            new_empty_patient = request.data.get('emptyPatient')
+            new_empty_patient = self.parse_count(request.data.get('emptyPatient'))
+            if new_empty_patient is None:
+                return Response({"error": "emptyPatient phải là số nguyên không âm."}, status=status.HTTP_400_BAD_REQUEST)
             communication.emptyPatient = new_empty_patient
             communication.save()
             return Response(
@@ -267,38 +595,147 @@ class CommunicationVaccinationViewSet(viewsets.ViewSet,generics.ListAPIView,gene
     @action(methods=['patch'], detail=True, url_path='update-empty-staff', permission_classes= [IsStaff])
     def update_empty_staff(self, request, pk=None):
             communication = self.get_object()
-            empty_staff = request.data.get('emptyStaff')
+            empty_staff = self.parse_count(request.data.get('emptyStaff'))
+            if empty_staff is None:
+                return Response({"error": "emptyStaff phải là số nguyên không âm."}, status=status.HTTP_400_BAD_REQUEST)
             communication.emptyStaff = empty_staff
             communication.save()
             return Response({"message": "Updated emptyStaff successfully"}, status=status.HTTP_200_OK)
 
 
 
+class CampaignSlotStreamView(View):
+    # Server-sent events with emptyPatient/emptyStaff of the given campaigns
+    # (?ids=1,2; upcoming campaigns when omitted): a snapshot first, then every
+    # change as it is saved. Each connection closes after
+    # SLOT_STREAM_MAX_SECONDS and the client reconnects.
+    async def get(self, request):
+        user = await sync_to_async(authenticate_plain_request)(request)
+        if user is None or not user.is_authenticated:
+            return JsonResponse({'error': 'Bạn cần đăng nhập để theo dõi số chỗ'}, status=401)
+        try:
+            ids = sorted({int(i) for i in request.GET.get('ids', '').split(',') if i.strip()})
+        except ValueError:
+            return JsonResponse({'error': 'ids phải là danh sách mã chiến dịch, ví dụ ids=1,2'}, status=400)
+
+        return slotstream.stream_response(slotstream.campaign_stream(ids, asynchronous=isinstance(request, ASGIRequest)))
+
+
+class CheckInViewSet(viewsets.ViewSet):
+    # Day-of-vaccination line per health center (vaccine.checkin)
+    permission_classes = [IsStaff]
+
+    def get_center(self, request, data):
+        try:
+            return int(data.get('health_centre')), None
+        except (TypeError, ValueError):
+            return None, Response({'error': 'Cần health_centre'}, status=status.HTTP_400_BAD_REQUEST)
+
+    def create(self, request):
+        appointment = Appointment.objects.filter(pk=request.data.get('appointment')).first()
+        if appointment is None:
+            return Response({'error': 'Không tìm thấy lịch hẹn'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            check_in = checkin.get_queue().check_in(appointment)
+        except checkin.CheckInError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializers.CheckInSerializer(check_in).data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['post'], detail=False, url_path='call-next')
+    def call_next(self, request):
+        center_id, error = self.get_center(request, request.data)
+        if error:
+            return error
+        time_id = request.data.get('time')
+        if time_id is not None:
+            try:
+                time_id = int(time_id)
+            except (TypeError, ValueError):
+                return Response({'error': 'time phải là id khung giờ'}, status=status.HTTP_400_BAD_REQUEST)
+        check_in = checkin.get_queue().call_next(center_id, time_id, user=request.user)
+        if check_in is None:
+            return Response({'message': 'Không còn ai trong hàng chờ'}, status=status.HTTP_204_NO_CONTENT)
+        return Response(serializers.CheckInSerializer(check_in).data)
+
+    @action(methods=['post'], detail=True)
+    def skip(self, request, pk=None):
+        check_in = CheckIn.objects.select_related('appointment__information').filter(pk=pk).first()
+        if check_in is None:
+            return Response({'error': 'Không tìm thấy lượt check-in'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            checkin.get_queue().skip(check_in)
+        except checkin.CheckInError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(serializers.CheckInSerializer(check_in).data)
+
+    @action(methods=['get'], detail=False)
+    def queue(self, request):
+        center_id, error = self.get_center(request, request.query_params)
+        if error:
+            return error
+        return Response(checkin.get_queue().summary(center_id))
+
+
+class CheckInStreamView(View):
+    # Live queue for staff screens: the summary first, then every check-in,
+    # call and skip at the center
+    async def get(self, request):
+        user = await sync_to_async(authenticate_plain_request)(request)
+        if user is None or not user.is_authenticated or user.userRole != RoleEnum.STAFF:
+            return JsonResponse({'error': 'Chỉ nhân viên mới xem được hàng chờ'}, status=403)
+        try:
+            center_id = int(request.GET['health_centre'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Cần health_centre'}, status=400)
+
+        return slotstream.stream_response(checkin.queue_stream(center_id, asynchronous=isinstance(request, ASGIRequest)))
+
+
 class AttendantCommunicationViewSet(viewsets.ViewSet, generics.ListAPIView, generics.CreateAPIView, generics.DestroyAPIView):
     queryset = AttendantCommunication.objects.all()
     serializer_class = AttendantCommunicationSerializer
     permission_classes = [IsAuthenticated, IsOwner]
 
     @action(methods=['post'], detail=False)
+    @rate_limit('campaign-register')
+    @idempotent('register')
     def register(self, request):
         user = request.user
         communication_id = request.data.get('communication')
-        quantity = request.data.get('quantity')
         registration_type = request.data.get('registration_type', 'patient')
-        communication = CommunicationVaccination.objects.get(id=communication_id)
-
-        attendant = AttendantCommunication.objects.create(
-            user=user,
-            communication=communication,
-            quantity=quantity,
-            registration_type=registration_type
-        )
-
-        if registration_type == 'patient':
-            communication.emptyPatient -= int(quantity)
-        else:
-            communication.emptyStaff -= int(quantity)
-        communication.save()
+        try:
+            quantity = int(request.data.get('quantity'))
+        except (TypeError, ValueError):
+            return Response({"error": "Số lượng không hợp lệ."}, status=status.HTTP_400_BAD_REQUEST)
+        if quantity < 1 or registration_type not in ('patient', 'staff'):
+            return Response({"error": "Số lượng hoặc loại đăng ký không hợp lệ."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The campaign row is locked so the duplicate check, the capacity check
+        # and the counter update see the same state
+        with transaction.atomic():
+            communication = CommunicationVaccination.objects.select_for_update().filter(id=communication_id).first()
+            if communication is None:
+                return Response({"error": "Không tìm thấy chiến dịch."}, status=status.HTTP_404_NOT_FOUND)
+            if AttendantCommunication.objects.filter(user=user, communication=communication,
+                                                     registration_type=registration_type).exists():
+                return Response(
+                    {"error": f"Bạn đã đăng ký chiến dịch này với vai trò {registration_type}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            field = 'emptyPatient' if registration_type == 'patient' else 'emptyStaff'
+            available = getattr(communication, field)
+            if available is not None and available < quantity:
+                return Response({"error": "Chiến dịch không còn đủ chỗ."}, status=status.HTTP_400_BAD_REQUEST)
+
+            attendant = AttendantCommunication.objects.create(
+                user=user,
+                communication=communication,
+                quantity=quantity,
+                registration_type=registration_type
+            )
+            if available is not None:
+                setattr(communication, field, available - quantity)
+                communication.save()
 
         return Response(
             AttendantCommunicationSerializer(attendant).data,
@@ -359,6 +796,7 @@ class AttendantCommunicationViewSet(viewsets.ViewSet, generics.ListAPIView, gene
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ChatView(View):
+    @rate_limit('chat')
     def post(self, request):
         try:
             if request.content_type == 'application/json':
@@ -428,7 +866,7 @@ class ChatView(View):
                 {'responses': [{'text': 'Xin lỗi, đã xảy ra lỗi không mong muốn. Vui lòng thử lại sau.'}]}, status=200)
 
 
-class StatisticsViewSet(viewsets.ViewSet):
+class StatisticsViewSet(ReplicaReadMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated, IsOwner]
 
     def filter_appointments(self, request, queryset):
@@ -447,36 +885,47 @@ class StatisticsViewSet(viewsets.ViewSet):
 
         return queryset
 
+    def period_start(self, request):
+        # First date the filters can match, None when there is no year
+        year = request.query_params.get('year')
+        if not year:
+            return None
+        month = request.query_params.get('month')
+        quarter = request.query_params.get('quarter')
+        return date(int(year), int(month) if month else (int(quarter) - 1) * 3 + 1 if quarter else 1, 1)
+
+    def count(self, request, **filters):
+        return sum(self.filter_appointments(request, model.objects.filter(**filters)).count()
+                   for model in archive.appointment_models(self.period_start(request)))
+
     @action(detail=False, methods=['get'], url_path='total-vaccinated', permission_classes= [IsPatient])
     def total_vaccinated(self, request):
-        appointments = self.filter_appointments(request, Appointment.objects.filter(status='completed'))
-        total = appointments.count()
+        total = self.count(request, status='completed')
         return Response({'total': total})
 
     @action(detail=False, methods=['get'], url_path='completion-rate', permission_classes= [IsPatient])
     def completion_rate(self, request):
-        total_appointments = self.filter_appointments(request, Appointment.objects.all())
-        completed_appointments = self.filter_appointments(request, Appointment.objects.filter(status='completed'))
-
-        total_count = total_appointments.count()
-        completed_count = completed_appointments.count()
+        total_count = self.count(request)
+        completed_count = self.count(request, status='completed')
 
         rate = (completed_count / total_count * 100) if total_count > 0 else 0
         return Response({'rate': rate})
 
     @action(detail=False, methods=['get'], url_path='popular-vaccines', permission_classes= [IsPatient])
     def popular_vaccines(self, request):
-        appointments = self.filter_appointments(request, Appointment.objects.all())
-        appointment_ids = appointments.values_list('id', flat=True)
-
-        vaccines = (
-            AppointmentDetail.objects.filter(appointment__id__in=appointment_ids)
-            .values('vaccine__name')
-            .annotate(count=Count('vaccine'))
-            .order_by('-count')
-        )
+        start = self.period_start(request)
+        counts = Counter()
+        for model, detail_model in zip(archive.appointment_models(start), archive.detail_models(start)):
+            appointment_ids = self.filter_appointments(request, model.objects.all()).values_list('id', flat=True)
+            vaccines = (
+                detail_model.objects.filter(appointment__id__in=appointment_ids)
+                .values('vaccine__name')
+                .annotate(count=Count('vaccine'))
+            )
+            for item in vaccines:
+                counts[item['vaccine__name']] += item['count']
 
         return Response([
-            {'vaccine_name': item['vaccine__name'], 'count': item['count']}
-            for item in vaccines
+            {'vaccine_name': name, 'count': count}
+            for name, count in counts.most_common()
         ])
\ No newline at end of file
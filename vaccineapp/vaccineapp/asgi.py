@@ -5,6 +5,18 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+This is the entry point to deploy: the campaign slot and check-in event
+streams wait on the event loop here instead of holding a worker thread each.
+
+    uvicorn vaccineapp.asgi:application --host 0.0.0.0 --port 8000
+
+Several workers need the Redis broker so every worker's streams see changes
+saved in the others; set the count through WEB_CONCURRENCY (uvicorn's default
+for --workers) so the check below sees it:
+
+    export SLOT_STREAM_BROKER=vaccine.slotstream.RedisBroker SLOT_STREAM_REDIS_URL=redis://...
+    WEB_CONCURRENCY=4 uvicorn vaccineapp.asgi:application --host 0.0.0.0 --port 8000
 """
 
 import os
@@ -14,3 +26,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vaccineapp.settings')
 
 application = get_asgi_application()
+
+from vaccine.slotstream import check_broker  # noqa: E402
+
+check_broker()
@@ -0,0 +1,80 @@
+# Deployment parameters read from the environment. Defaults are the local
+# development setup, so running without any variable set behaves as before.
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+def env_str(name, default=''):
+    return os.environ.get(name, default)
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def database(prefix='DB'):
+    # <prefix>_ENGINE/NAME/USER/PASSWORD/HOST/PORT, plus connection reuse:
+    # <prefix>_CONN_MAX_AGE keeps a connection open across requests of the
+    # same worker thread (0 = new connection per request, the Django default)
+    # and <prefix>_CONN_HEALTH_CHECKS pings a reused connection before the
+    # first query of a request so a server-side timeout doesn't surface as an
+    # error. <prefix>_POOL=1 switches MySQL to a process-wide pool
+    # (django-db-connection-pool), which is what to use under ASGI, where
+    # requests don't keep to one thread and persistent connections don't help.
+    config = {
+        'ENGINE': env_str(f'{prefix}_ENGINE', 'django.db.backends.mysql'),
+        'NAME': env_str(f'{prefix}_NAME', 'vaccine_db'),
+        'USER': env_str(f'{prefix}_USER', 'root'),
+        'PASSWORD': env_str(f'{prefix}_PASSWORD', '040204'),
+        'HOST': env_str(f'{prefix}_HOST', ''),
+        'PORT': env_str(f'{prefix}_PORT', ''),
+        'CONN_MAX_AGE': env_int(f'{prefix}_CONN_MAX_AGE', 60),
+        'CONN_HEALTH_CHECKS': env_bool(f'{prefix}_CONN_HEALTH_CHECKS', True),
+    }
+    if config['ENGINE'] == 'django.db.backends.mysql':
+        config['OPTIONS'] = {'connect_timeout': env_int(f'{prefix}_CONNECT_TIMEOUT', 5)}
+
+    if env_bool(f'{prefix}_POOL'):
+        if config['ENGINE'] != 'django.db.backends.mysql':
+            raise ImproperlyConfigured(f'{prefix}_POOL chỉ hỗ trợ MySQL')
+        try:
+            import dj_db_conn_pool  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured(f'{prefix}_POOL cần cài django-db-connection-pool[mysql]')
+        config['ENGINE'] = 'dj_db_conn_pool.backends.mysql'
+        # The pool owns the connections; Django hands them back after each request
+        config['CONN_MAX_AGE'] = 0
+        config['POOL_OPTIONS'] = {
+            'POOL_SIZE': env_int(f'{prefix}_POOL_SIZE', 10),
+            'MAX_OVERFLOW': env_int(f'{prefix}_POOL_MAX_OVERFLOW', 10),
+            'RECYCLE': env_int(f'{prefix}_POOL_RECYCLE', 3600),
+            'TIMEOUT': env_int(f'{prefix}_POOL_TIMEOUT', 10),
+            'PRE_PING': True,
+        }
+    return config
+
+
+def cache(prefix='CACHE'):
+    # <prefix>_URL=redis://host:6379/1 shares the cache (token pins, vaccine
+    # schedules, ...) between worker processes; without it each process has
+    # its own in-memory cache.
+    url = env_str(f'{prefix}_URL')
+    if url.startswith(('redis://', 'rediss://')):
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': url,
+            'KEY_PREFIX': env_str(f'{prefix}_KEY_PREFIX', 'vaccine'),
+            'TIMEOUT': env_int(f'{prefix}_TIMEOUT', 300),
+        }
+    if url:
+        raise ImproperlyConfigured(f'{prefix}_URL không được hỗ trợ: {url}')
+    return {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
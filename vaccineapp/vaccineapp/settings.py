@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from vaccineapp import env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,8 +49,25 @@ INSTALLED_APPS = [
     'corsheaders'
 ]
 
+# Validated OAuth2 access tokens are cached in-process for AUTH_TOKEN_CACHE_TTL seconds.
+# The cache is per worker process: logout, revocation and user changes take
+# effect at once in the process that handled them, and in the other workers
+# within AUTH_TOKEN_CACHE_TTL seconds. Set it to 0 to check every request.
+# AUTH_STATELESS_JWT also accepts simplejwt access tokens (from api/token/) without a DB lookup;
+# deactivated users are refused through CACHES, which must be shared (CACHE_URL)
+# when running several processes.
+AUTH_TOKEN_CACHE_TTL = env.env_int('AUTH_TOKEN_CACHE_TTL', 60)
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_STATELESS_JWT = env.env_bool('AUTH_STATELESS_JWT', False)
+
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('oauth2_provider.contrib.rest_framework.OAuth2Authentication',)
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        ('vaccine.authentication.StatelessJWTAuthentication',) if AUTH_STATELESS_JWT else ()
+    ) + ('vaccine.authentication.CachedOAuth2Authentication',),
+    'DEFAULT_RENDERER_CLASSES': (
+        'vaccine.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 
@@ -62,18 +82,34 @@ AUTH_USER_MODEL = 'vaccine.User'
 CKEDITOR_UPLOAD_PATH = "ckeditors/lessons/"
 
 MIDDLEWARE = [
+    'vaccine.metrics.MetricsMiddleware',
+    'vaccine.queryinspector.QueryInspectorMiddleware',
+    'vaccine.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'vaccine.dbrouter.PrimaryPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Per-view latency, SQL count/time and response size (vaccine.metrics), served in
+# Prometheus format at /metrics/ to staff users or to "Bearer <METRICS_TOKEN>".
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Development/staging: report repeated SQL shapes (N+1) and slow statements per
+# request with the originating line in views/serializers/admin (vaccine.queryinspector).
+QUERY_INSPECTOR_ENABLED = DEBUG
+QUERY_INSPECTOR_REPEAT_THRESHOLD = 5
+QUERY_INSPECTOR_SLOW_MS = 100
+QUERY_INSPECTOR_HEADER = True
+
 ROOT_URLCONF = 'vaccineapp.urls'
 
 TEMPLATES = [
@@ -93,21 +129,41 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'vaccineapp.wsgi.application'
+# Served with uvicorn (see vaccineapp/asgi.py). The WSGI application still
+# works; event streams then hold one worker thread per watcher.
+ASGI_APPLICATION = 'vaccineapp.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connection parameters, reuse (DB_CONN_MAX_AGE, DB_CONN_HEALTH_CHECKS) and the
+# optional pool (DB_POOL) come from the environment, see vaccineapp/env.py.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'vaccine_db',
-        'USER': 'root',
-        'PASSWORD': '040204',
-        'HOST': ''
-    }
+    'default': env.database('DB'),
+}
+
+CACHES = {
+    'default': env.cache('CACHE'),
 }
 
+# Read replicas (vaccine.dbrouter): aliases of DATABASES listed in
+# DATABASE_REPLICAS serve GETs of the read-only viewsets, statistics and admin
+# stats pages. After a successful write the client reads from the primary for
+# REPLICA_PIN_SECONDS. Set DB_REPLICA_HOST to enable; locally any second
+# database works, e.g. two SQLite files with the replica a copy of default.
+DATABASE_ROUTERS = ['vaccine.dbrouter.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_PIN_SECONDS = 5
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', ''),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+
 import pymysql
 
 pymysql.install_as_MySQLdb()
@@ -121,6 +177,100 @@ cloudinary.config(
     secure=True
 )
 
+# Images are uploaded by the client straight to storage with parameters signed by
+# uploads/sign/ (vaccine.uploads); resized variants are built in the background.
+# vaccine.uploads.LocalUploadBackend keeps files under IMAGE_UPLOAD_ROOT for tests.
+IMAGE_UPLOAD_BACKEND = 'vaccine.uploads.CloudinaryUploadBackend'
+IMAGE_UPLOAD_ROOT = BASE_DIR / 'media'
+IMAGE_UPLOAD_URL = '/media/'
+IMAGE_UPLOAD_EXPIRES = 600
+IMAGE_VARIANT_SIZES = {'thumb': (150, 150), 'medium': (600, 600)}
+IMAGE_VARIANT_WORKERS = 2
+
+# Vaccination schedule engine (vaccine.schedule): age ranges come from the chatbot's
+# vaccine data file; per-patient results are kept in the default cache.
+VACCINE_DATA_FILE = BASE_DIR / 'rasa-tiêm-chủng' / 'actions' / 'vaccine_data.json'
+VACCINE_SCHEDULE_GRACE_DAYS = 30
+VACCINE_SCHEDULE_UPCOMING_DAYS = 90
+VACCINE_SCHEDULE_CACHE_TTL = 86400
+
+# Live campaign slot counts at communications/slot-stream/ and the check-in queue
+# stream (vaccine.slotstream). The in-process broker only reaches watchers of the
+# same process; with several workers use 'vaccine.slotstream.RedisBroker' and
+# SLOT_STREAM_REDIS_URL (asgi.py refuses to start otherwise).
+SLOT_STREAM_BROKER = os.environ.get('SLOT_STREAM_BROKER', 'vaccine.slotstream.InProcessBroker')
+SLOT_STREAM_REDIS_URL = os.environ.get('SLOT_STREAM_REDIS_URL', 'redis://localhost:6379/0')
+SLOT_STREAM_HEARTBEAT = 15
+SLOT_STREAM_MAX_SECONDS = 300
+SLOT_STREAM_QUEUE_SIZE = 100
+
+# Completed and canceled appointments older than this many days are moved to
+# the archive tables by `manage.py archive_appointments` (vaccine.archive);
+# appointment lists and statistics only read the archive for periods that
+# start before that horizon.
+APPOINTMENT_ARCHIVE_AFTER_DAYS = 365
+
+# Most appointments one time slot takes per health center and day; slots at
+# the limit are skipped by times/next-available. None = no limit.
+TIME_SLOT_CAPACITY = None
+
+# Response compression (vaccine.compression): JSON/text responses of at least
+# COMPRESSION_MIN_SIZE bytes are sent gzip-compressed, or brotli-compressed
+# when the Brotli package is installed and the client accepts it.
+COMPRESSION_ENABLED = True
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Check-in line per health center (vaccine.checkin); each process reloads its view
+# of a center's line from the CheckIn table at most this often.
+CHECKIN_QUEUE_RESYNC_SECONDS = 30
+
+# POSTs sent with an Idempotency-Key header (booking, campaign registration)
+# keep their response this long for replays; expired keys are removed by
+# `manage.py purge_idempotency_keys`. A key whose first request has not
+# finished after IDEMPOTENCY_LOCK_SECONDS is considered abandoned.
+IDEMPOTENCY_KEY_TTL = 86400
+IDEMPOTENCY_LOCK_SECONDS = 60
+
+# Token-bucket limits per view scope (vaccine.ratelimit): "user" and "ip" are
+# per client, "global" is shared by everyone; "N/s|min|hour|day" or
+# ("N/period", burst). "concurrency" caps requests of the scope in flight per
+# worker process. Over a limit the request gets 429 with Retry-After before
+# any work is done. Use vaccine.ratelimit.RedisBackend to share buckets
+# between processes; RATE_LIMIT_PROXY_COUNT is the number of trusted proxies
+# appending to X-Forwarded-For.
+RATE_LIMIT_ENABLED = True
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'vaccine.ratelimit.MemoryBackend')
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+RATE_LIMIT_PROXY_COUNT = 0
+RATE_LIMITS = {
+    'chat': {'user': '20/min', 'ip': ('30/min', 10), 'global': '20/s', 'concurrency': 8},
+    'booking': {'user': '10/min', 'ip': '60/min', 'global': '50/s', 'concurrency': 16},
+    'campaign-register': {'user': '10/min', 'ip': '60/min', 'global': '50/s', 'concurrency': 16},
+    'signup': {'ip': '5/min', 'global': '10/s', 'concurrency': 4},
+}
+
+# The async register/ view hashes in a bounded pool of PASSWORD_HASHING_WORKERS threads
+# (vaccine.passwords), which frees the event loop under ASGI; the other sign-up paths
+# and the admin hash on their request thread, as before.
+# New passwords use the first hasher; hashes made by the others (Django's defaults) keep
+# verifying and are upgraded on the next login.
+PASSWORD_HASHING_WORKERS = 4
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+try:
+    import argon2  # noqa: F401
+    PASSWORD_HASHERS.insert(0, 'django.contrib.auth.hashers.Argon2PasswordHasher')
+except ImportError:
+    pass
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
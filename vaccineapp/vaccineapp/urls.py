@@ -14,6 +14,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include, re_path
 from rest_framework import permissions
@@ -50,3 +52,7 @@ urlpatterns = [
             name='schema-redoc'),
     path('o/', include('oauth2_provider.urls', namespace='oauth2_provider')),
 ]
+
+if settings.DEBUG:
+    # Files written by vaccine.uploads.LocalUploadBackend
+    urlpatterns += static(settings.IMAGE_UPLOAD_URL, document_root=settings.IMAGE_UPLOAD_ROOT)